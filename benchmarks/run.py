@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import urllib.request
+from os.path import abspath, dirname, join
+
+root_dir = dirname(dirname(abspath(__file__)))
+sys.path.append(root_dir)
+sys.path.append(dirname(abspath(__file__)))
+
+import stubs  # noqa: E402
+
+RESULTS_DIR = join(dirname(abspath(__file__)), 'results')
+TELEGRAM_WORKERS = 8
+
+
+def percentile(values, share):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def start_stand_ins(options):
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=stubs.serve, args=(options, sender), daemon=True
+    )
+    process.start()
+    practicum_port, telegram_port = receiver.recv()
+    return process, practicum_port, telegram_port
+
+
+def fetch_stats(practicum_port):
+    url = f'http://127.0.0.1:{practicum_port}/_stats'
+    with urllib.request.urlopen(url) as answer:
+        return json.load(answer)
+
+
+def run_benchmark(tenants=100, changes=200, duration=30, interval=1.0,
+                  api_latency=0.01, telegram_latency=0.01, error_rate=0.0,
+                  payload_size=0, max_in_flight=64, telegram_rate=1000.0):
+    """Прогон бота против подменных серверов, возвращает результаты."""
+    options = {
+        'tenants': tenants,
+        'changes': changes,
+        'duration': duration,
+        'api_latency': api_latency,
+        'telegram_latency': telegram_latency,
+        'error_rate': error_rate,
+        'payload_size': payload_size,
+    }
+    process, practicum_port, telegram_port = start_stand_ins(options)
+
+    import telegram
+    from telegram.utils.request import Request
+
+    import delivery
+    import engine
+    import homework
+    import http_client
+    import scheduler
+
+    homework.ENDPOINT = (
+        f'http://127.0.0.1:{practicum_port}{stubs.PRACTICUM_PATH}'
+    )
+    bot = telegram.Bot(
+        token='123456:benchmark',
+        base_url=f'http://127.0.0.1:{telegram_port}/bot',
+        request=Request(con_pool_size=TELEGRAM_WORKERS + 1),
+    )
+    http_client.configure(pool_size=max_in_flight)
+    accounts = [
+        engine.Tenant(index, f'token-{index}', 100000 + index)
+        for index in range(tenants)
+    ]
+    poll_scheduler = scheduler.PollScheduler(
+        interval=interval, reviewing_interval=interval,
+        idle_interval=interval, min_interval=interval / 10,
+        max_interval=interval * 4,
+    )
+    queue = delivery.DeliveryQueue(
+        bot, workers=TELEGRAM_WORKERS,
+        global_rate=telegram_rate, chat_rate=telegram_rate,
+    )
+    polling = engine.PollingEngine(
+        bot, accounts, max_in_flight=max_in_flight, retry_time=interval,
+        poll_scheduler=poll_scheduler, delivery=queue, flush_interval=2,
+    )
+
+    cpu_started = time.process_time()
+    started = time.monotonic()
+    try:
+        asyncio.run(asyncio.wait_for(polling.run(), duration + interval))
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.monotonic() - started
+    cpu = time.process_time() - cpu_started
+    stats = fetch_stats(practicum_port)
+    process.terminate()
+    http_client.close()
+
+    latencies = stats.pop('latencies')
+    return {
+        'options': dict(options, interval=interval,
+                        max_in_flight=max_in_flight),
+        'elapsed': elapsed,
+        'polls_per_second': stats['polls'] / elapsed,
+        'notifications': len(latencies),
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p99': percentile(latencies, 0.99),
+        'cpu_seconds': cpu,
+        'cpu_share': cpu / elapsed,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'stand_ins': stats,
+    }
+
+
+def save(result, name=None):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = name or time.strftime('%Y%m%d-%H%M%S')
+    path = join(RESULTS_DIR, f'{name}.json')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare(old_path, new_path):
+    """Сравнение ключевых показателей двух прогонов."""
+    with open(old_path, encoding='utf-8') as file:
+        old = json.load(file)
+    with open(new_path, encoding='utf-8') as file:
+        new = json.load(file)
+    for key in ('polls_per_second', 'latency_p50', 'latency_p99',
+                'cpu_share', 'max_rss_kb'):
+        before, after = old.get(key), new.get(key)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0
+        print(f'{key:20} {before:>12.4f} {after:>12.4f} {change:>+8.1f}%')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный прогон бота.')
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--changes', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--api-latency', type=float, default=0.01)
+    parser.add_argument('--telegram-latency', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--payload-size', type=int, default=0)
+    parser.add_argument('--max-in-flight', type=int, default=64)
+    parser.add_argument('--name')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    logging.basicConfig(level=logging.CRITICAL)
+    result = run_benchmark(
+        tenants=args.tenants,
+        changes=args.changes,
+        duration=args.duration,
+        interval=args.interval,
+        api_latency=args.api_latency,
+        telegram_latency=args.telegram_latency,
+        error_rate=args.error_rate,
+        payload_size=args.payload_size,
+        max_in_flight=args.max_in_flight,
+    )
+    path = save(result, args.name)
+    summary = {k: v for k, v in result.items() if k != 'stand_ins'}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    print(f'Результаты сохранены: {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import engine  # noqa: E402
+import homework  # noqa: E402
+
+STAGES = ('fetch', 'validate', 'diff', 'render', 'deliver')
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+class StubAnswer:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+
+
+class StubBot:
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        pass
+
+
+def make_content(homeworks):
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': index,
+                'homework_name': f'hw_{index}',
+                'status': STATUSES[index % len(STATUSES)],
+            }
+            for index in range(homeworks)
+        ],
+        'current_date': 1,
+    }).encode()
+
+
+async def measure(polling, name, jobs):
+    """Среднее время этапа name на задании, в микросекундах."""
+    prepared = [
+        await polling.pipeline.process(
+            engine.PollJob(engine.Tenant(index, 'token', index)), until=name
+        )
+        for index in range(jobs)
+    ]
+    handler = polling.pipeline.stage(name).handler
+    started = time.perf_counter()
+    for job in prepared:
+        await handler(job)
+    return (time.perf_counter() - started) / jobs * 1e6
+
+
+async def run(jobs, homeworks, names):
+    content = make_content(homeworks)
+    polling = engine.PollingEngine(StubBot(), [])
+    polling.fetch = lambda *args: StubAnswer(content)
+    polling._setup()
+    return {name: await measure(polling, name, jobs) for name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Замер отдельных этапов опроса.'
+    )
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--homeworks', type=int, default=20)
+    parser.add_argument(
+        '--stage', action='append', dest='stages',
+        choices=STAGES,
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    homework.deliver = lambda *args: None
+    result = asyncio.run(
+        run(args.jobs, args.homeworks, args.stages or STAGES)
+    )
+    for name, micros in result.items():
+        print(f'{name:10} {micros:10.1f} мкс/опрос')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import json
+import random
+import re
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PRACTICUM_PATH = '/api/user_api/homework_statuses/'
+STATUSES = ('reviewing', 'approved', 'rejected')
+NAME_RE = re.compile(r'"hw-(\d+):(\d+)"')
+
+
+class StandInState:
+    """Общее состояние подменных серверов Я.Практикум и Telegram.
+
+    Смены статусов распределены случайно по времени прогона и
+    применяются лениво, при очередном запросе. Задержка уведомления
+    считается от запланированного момента смены до получения
+    сообщения подменным Telegram.
+    """
+
+    def __init__(self, tenants, changes, duration, api_latency=0,
+                 telegram_latency=0, error_rate=0, payload_size=0, seed=0):
+        self.api_latency = api_latency
+        self.telegram_latency = telegram_latency
+        self.error_rate = error_rate
+        self.padding = 'x' * payload_size
+        self.started = time.monotonic()
+        self.wall_started = time.time()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.schedule = {}
+        for _ in range(changes):
+            tenant = self._random.randrange(tenants)
+            offset = self._random.uniform(0, duration)
+            self.schedule.setdefault(tenant, []).append(offset)
+        for offsets in self.schedule.values():
+            offsets.sort(reverse=True)
+        self.current = {}
+        self.changed_at = {}
+        self.delivered = {}
+        self.polls = 0
+        self.injected_errors = 0
+        self.messages = 0
+
+    def _apply_due(self, tenant, now):
+        offsets = self.schedule.get(tenant)
+        while offsets and offsets[-1] <= now - self.started:
+            offset = offsets.pop()
+            seq = self.current.get(tenant, (0, 0))[0] + 1
+            wall = int(self.wall_started + offset)
+            self.current[tenant] = (seq, wall)
+            self.changed_at[(tenant, seq)] = self.started + offset
+
+    def practicum_answer(self, token, from_date):
+        """Тело ответа API и HTTP-статус."""
+        with self._lock:
+            self.polls += 1
+            if self._random.random() < self.error_rate:
+                self.injected_errors += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {}
+            tenant = int(token.rsplit('-', 1)[-1])
+            self._apply_due(tenant, time.monotonic())
+            homeworks = []
+            seq, wall = self.current.get(tenant, (0, 0))
+            if seq and wall >= from_date:
+                homeworks.append({
+                    'id': tenant,
+                    'homework_name': f'hw-{tenant}:{seq}',
+                    'status': STATUSES[(seq - 1) % len(STATUSES)],
+                    'reviewer_comment': self.padding,
+                })
+        return HTTPStatus.OK, {
+            'homeworks': homeworks,
+            'current_date': int(time.time()) - 1,
+        }
+
+    def telegram_message(self, text):
+        now = time.monotonic()
+        with self._lock:
+            self.messages += 1
+            match = NAME_RE.search(text)
+            if match is None:
+                return
+            key = (int(match.group(1)), int(match.group(2)))
+            if key in self.changed_at and key not in self.delivered:
+                self.delivered[key] = now - self.changed_at[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'polls': self.polls,
+                'injected_errors': self.injected_errors,
+                'messages': self.messages,
+                'changes_applied': len(self.changed_at),
+                'latencies': sorted(self.delivered.values()),
+            }
+
+
+def _reply(handler, status, payload):
+    body = json.dumps(payload).encode()
+    handler.send_response(status)
+    handler.send_header('Content-Type', 'application/json')
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def make_practicum_handler(state):
+
+    class PracticumHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):  # noqa: N802
+            url = urlparse(self.path)
+            if url.path == '/_stats':
+                _reply(self, HTTPStatus.OK, state.stats())
+                return
+            if url.path != PRACTICUM_PATH:
+                _reply(self, HTTPStatus.NOT_FOUND, {})
+                return
+            token = self.headers.get('Authorization', '').split(' ')[-1]
+            from_date = int(float(
+                parse_qs(url.query).get('from_date', ['0'])[0]
+            ))
+            if state.api_latency:
+                time.sleep(state.api_latency)
+            status, payload = state.practicum_answer(token, from_date)
+            _reply(self, status, payload)
+
+        def log_message(self, *args):
+            pass
+
+    return PracticumHandler
+
+
+def make_telegram_handler(state):
+
+    class TelegramHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        message_id = 0
+
+        def do_POST(self):  # noqa: N802
+            length = int(self.headers.get('Content-Length', 0))
+            raw = self.rfile.read(length)
+            method = self.path.rsplit('/', 1)[-1]
+            if method == 'getUpdates':
+                _reply(self, HTTPStatus.OK, {'ok': True, 'result': []})
+                return
+            try:
+                data = json.loads(raw or b'{}')
+            except ValueError:
+                data = {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+            if state.telegram_latency:
+                time.sleep(state.telegram_latency)
+            state.telegram_message(str(data.get('text', '')))
+            TelegramHandler.message_id += 1
+            _reply(self, HTTPStatus.OK, {'ok': True, 'result': {
+                'message_id': TelegramHandler.message_id,
+                'date': int(time.time()),
+                'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+                'text': data.get('text', ''),
+            }})
+
+        def log_message(self, *args):
+            pass
+
+    return TelegramHandler
+
+
+def serve(options, ready):
+    """Запуск обоих серверов; порты передаются через ready."""
+    state = StandInState(**options)
+    practicum = ThreadingHTTPServer(
+        ('127.0.0.1', 0), make_practicum_handler(state)
+    )
+    telegram = ThreadingHTTPServer(
+        ('127.0.0.1', 0), make_telegram_handler(state)
+    )
+    practicum.daemon_threads = True
+    telegram.daemon_threads = True
+    threading.Thread(target=telegram.serve_forever, daemon=True).start()
+    ready.send((practicum.server_address[1], telegram.server_address[1]))
+    practicum.serve_forever()
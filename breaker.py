@@ -0,0 +1,122 @@
+import asyncio
+import contextlib
+import logging
+import time
+
+import exceptions
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Автомат защиты внешнего сервиса: closed, open, half-open.
+
+    После failure_threshold сбоев подряд автомат размыкается, и
+    вызовы завершаются CircuitOpenError без обращения к сервису.
+    Через reset_timeout секунд пропускается один пробный вызов:
+    успех замыкает автомат, сбой снова размыкает его.
+    Рассчитан на вызовы из одного event loop.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.opened_at = None
+        self._probing = False
+        self._clock = clock
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        metrics.CIRCUIT_TRANSITIONS.inc(self.name, state)
+        if state == OPEN:
+            logger.warning(
+                f'Сервис {self.name} недоступен: запросы приостановлены '
+                f'на {self.reset_timeout} с после {self.failures} сбоев.'
+            )
+        elif state == HALF_OPEN:
+            logger.info(f'Сервис {self.name}: пробный запрос.')
+        else:
+            logger.info(f'Сервис {self.name} снова доступен.')
+
+    def retry_in(self):
+        """Секунды до пробного запроса; 0, если вызов разрешён."""
+        if self.state != OPEN:
+            return 0
+        return max(0, self.opened_at + self.reset_timeout - self._clock())
+
+    def before_call(self):
+        """Разрешение вызова или CircuitOpenError."""
+        if self.state == OPEN and not self.retry_in():
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        raise self.reject()
+
+    def reject(self):
+        """CircuitOpenError для вызова, не пропущенного автоматом."""
+        self.rejected += 1
+        return exceptions.CircuitOpenError(
+            f'Сервис {self.name} недоступен, запросы приостановлены.',
+            self.name,
+        )
+
+    def success(self):
+        self._probing = False
+        self.failures = 0
+        self._set_state(CLOSED)
+
+    def failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+            self._set_state(OPEN)
+
+    def release(self):
+        """Завершение вызова без результата, например при отмене."""
+        self._probing = False
+
+    @contextlib.contextmanager
+    def guard(self, is_failure):
+        """Вызов под защитой автомата.
+
+        is_failure(error) отличает отказ сервиса от ошибок, которые
+        не говорят о его недоступности (например, неверный токен).
+        """
+        self.before_call()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception as error:
+            if is_failure(error):
+                self.failure()
+            else:
+                self.success()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.success()
+
+    @property
+    def value(self):
+        """Состояние числом для метрик: 0, 1 или 2."""
+        return STATE_VALUES[self.state]
@@ -0,0 +1,109 @@
+import asyncio
+import functools
+import logging
+import time
+
+import telegram
+
+import digest
+import homework
+
+logger = logging.getLogger(__name__)
+
+LONG_POLL_TIMEOUT = 30
+ERROR_DELAY = 5
+UNKNOWN_CHAT = 'Этот чат не подписан на уведомления о проверке работ.'
+NO_DATA = 'Пока нет данных о работах.'
+
+
+def format_status(tenants):
+    """Текущий статус всех известных работ."""
+    lines = []
+    for tenant in tenants:
+        for name, status in tenant.statuses.items():
+            verdict = homework.HOMEWORK_VERDICTS.get(status, status)
+            lines.append(f'"{name}": {verdict}')
+    return '\n'.join(lines) or NO_DATA
+
+
+def format_history(tenants):
+    """Последние изменения статусов, от новых к старым."""
+    events = sorted(
+        (event for tenant in tenants for event in tenant.history),
+        reverse=True,
+    )
+    lines = [
+        f'{time.strftime("%d.%m %H:%M", time.localtime(changed_at))} '
+        f'"{name}": {homework.HOMEWORK_VERDICTS.get(status, status)}'
+        for changed_at, name, status in events
+    ]
+    return '\n'.join(lines) or NO_DATA
+
+
+COMMANDS = {
+    '/status': format_status,
+    '/history': format_history,
+}
+
+
+class CommandListener:
+    """Ответы на команды из getUpdates по данным, уже собранным опросом.
+
+    Если задана функция active, команды принимаются, только пока она
+    возвращает True: getUpdates не допускает нескольких получателей.
+    """
+
+    def __init__(self, bot, polling, timeout=LONG_POLL_TIMEOUT, active=None):
+        self.bot = bot
+        self.polling = polling
+        self.timeout = timeout
+        self.active = active
+        self.offset = None
+
+    def reply_for(self, chat_id, text):
+        """Ответ на команду или None, если это не команда бота."""
+        command = text.split(maxsplit=1)[0].split('@')[0].lower()
+        formatter = COMMANDS.get(command)
+        if formatter is None:
+            return None
+        tenants = self.polling.tenants_for_chat(chat_id)
+        if not tenants:
+            return UNKNOWN_CHAT
+        return formatter(tenants)
+
+    async def handle(self, update):
+        message = update.message
+        if message is None or not message.text:
+            return
+        reply = self.reply_for(message.chat_id, message.text)
+        if reply is None:
+            return
+        for text in digest.split_text([reply]):
+            await self.polling.send(message.chat_id, text)
+
+    async def run(self):
+        """Длинный опрос getUpdates."""
+        loop = asyncio.get_event_loop()
+        while True:
+            if self.active is not None and not self.active():
+                await asyncio.sleep(ERROR_DELAY)
+                continue
+            try:
+                updates = await loop.run_in_executor(None, functools.partial(
+                    self.bot.get_updates,
+                    offset=self.offset,
+                    timeout=self.timeout,
+                    allowed_updates=['message'],
+                ))
+            except telegram.error.TelegramError as error:
+                logger.error(f'Ошибка получения команд: {error}')
+                await asyncio.sleep(ERROR_DELAY)
+                continue
+            for update in updates:
+                self.offset = update.update_id + 1
+                try:
+                    await self.handle(update)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as error:
+                    logger.error(f'Ошибка ответа на команду: {error}')
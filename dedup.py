@@ -0,0 +1,135 @@
+import collections
+import re
+import time
+
+ERROR_TTL = 6 * 3600
+MAX_ERRORS = 1024
+
+NORMALIZE_RULES = (
+    (re.compile(r'0x[0-9a-fA-F]+'), '<addr>'),
+    (re.compile(r'\d+(\.\d+)?'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def normalize(message):
+    """Текст ошибки без чисел и адресов, которые меняются от раза к разу."""
+    for pattern, replacement in NORMALIZE_RULES:
+        message = pattern.sub(replacement, message)
+    return message.strip()
+
+
+def format_duration(seconds):
+    """Длительность словами: «6 ч 5 мин», «12 мин», «40 с»."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes = rest // 60
+    if hours:
+        return f'{hours} ч {minutes} мин' if minutes else f'{hours} ч'
+    if minutes:
+        return f'{minutes} мин'
+    return f'{seconds} с'
+
+
+class ErrorEntry:
+    """Повторяющаяся ошибка в одном чате."""
+
+    __slots__ = ('message', 'first_seen', 'last_seen', 'count', 'tenants')
+
+    def __init__(self, message, now):
+        self.message = message
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 0
+        self.tenants = set()
+
+
+class ErrorDeduplicator:
+    """Ограниченный кеш уведомлений об ошибках.
+
+    Ключ — чат, класс исключения и текст ошибки без чисел, поэтому
+    чередующиеся ошибки и сбой, общий для учётных записей одного
+    чата, дают по одному уведомлению. Запись живёт ttl секунд с
+    последнего повтора; при переполнении вытесняется запись,
+    которая повторялась давнее других.
+    """
+
+    def __init__(self, ttl=ERROR_TTL, maxsize=MAX_ERRORS, clock=time.time):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._by_tenant = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(chat_id, error):
+        return str(chat_id), type(error).__name__, normalize(str(error))
+
+    def report(self, chat_id, tenant_id, error, message):
+        """Учёт ошибки; True, если о ней нужно сообщить в чат."""
+        now = self._clock()
+        self._expire(now)
+        key = self.key(chat_id, error)
+        entry = self._entries.get(key)
+        first = entry is None
+        if first:
+            entry = ErrorEntry(message, now)
+            self._entries[key] = entry
+            while len(self._entries) > self.maxsize:
+                self._pop(next(iter(self._entries)))
+        else:
+            self._entries.move_to_end(key)
+        entry.count += 1
+        entry.last_seen = now
+        entry.tenants.add(tenant_id)
+        self._by_tenant.setdefault(tenant_id, set()).add(key)
+        return first
+
+    def forget(self, chat_id, error):
+        """Отмена учёта, например если уведомление не отправилось."""
+        self._pop(self.key(chat_id, error))
+
+    def resolve(self, tenant_id):
+        """Учётная запись снова работает; итоги прекратившихся ошибок.
+
+        Возвращает пары (чат, сообщение) для ошибок, которые больше
+        не повторяются ни у одной учётной записи и были повторены.
+        """
+        summaries = []
+        now = self._clock()
+        for key in self._by_tenant.pop(tenant_id, ()):
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            entry.tenants.discard(tenant_id)
+            if entry.tenants:
+                continue
+            del self._entries[key]
+            if entry.count > 1:
+                summaries.append((key[0], (
+                    f'Ошибка больше не повторяется: {entry.message}\n'
+                    f'Повторилась {entry.count} раз за '
+                    f'{format_duration(now - entry.first_seen)}.'
+                )))
+        return summaries
+
+    def _expire(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.last_seen < self.ttl:
+                return
+            self._pop(key)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tenant_id in entry.tenants:
+            keys = self._by_tenant.get(tenant_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tenant[tenant_id]
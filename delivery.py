@@ -0,0 +1,254 @@
+import asyncio
+import collections
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import breaker
+import exceptions
+import homework
+import logs
+import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+LATENCY_SAMPLES = 1000
+BREAKER_WAIT = 1
+
+
+class TokenBucket:
+    """Ограничение частоты: rate токенов в секунду, запас capacity."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self._clock = clock
+        self.updated = clock()
+
+    def reserve(self):
+        """Резервирование токена, возвращает задержку до его появления."""
+        now = self._clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    def pause(self, seconds):
+        """Запрет выдачи токенов на указанное время."""
+        self.tokens = -seconds * self.rate
+        self.updated = self._clock()
+
+    def is_idle(self):
+        now = self._clock()
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class Outgoing:
+    """Сообщение в очереди отправки."""
+
+    __slots__ = (
+        'chat_id', 'text', 'enqueued_at', 'attempts', 'sending', 'trace',
+        'on_failure',
+    )
+
+    def __init__(self, chat_id, text, on_failure=None):
+        self.chat_id = chat_id
+        self.text = text
+        self.on_failure = on_failure
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+        self.sending = False
+        self.trace = tracing.current()
+
+
+def is_telegram_outage(error):
+    return isinstance(error, exceptions.TelegramUnavailableError)
+
+
+class DeliveryQueue:
+    """Очередь отправки в Telegram с общим и початовым лимитами.
+
+    Пока автомат защиты Telegram разомкнут, сообщения ждут в очереди.
+    """
+
+    def __init__(self, bot, workers=4, global_rate=30, chat_rate=1,
+                 maxsize=10000, telegram_breaker=None):
+        self.bot = bot
+        self.workers = workers
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.maxsize = maxsize
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        if telegram_breaker is None:
+            telegram_breaker = breaker.CircuitBreaker(
+                'telegram',
+                failure_threshold=homework.CIRCUIT_FAILURES,
+                reset_timeout=homework.CIRCUIT_RESET_TIME,
+            )
+        self.breaker = telegram_breaker
+        self._chat_buckets = {}
+        self._queue = None
+        self._tasks = []
+        self._active = set()
+        self._executor = None
+
+    def start(self):
+        """Запуск обработчиков очереди в текущем event loop."""
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._tasks = [
+            asyncio.ensure_future(self._worker())
+            for _ in range(self.workers)
+        ]
+
+    async def stop(self, timeout=None):
+        """Ожидание отправки накопленных сообщений и остановка.
+
+        Возвращает пары (чат, текст), до отправки которых очередь
+        не дошла за timeout секунд.
+        """
+        if self._queue is None:
+            return []
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f'Не отправлено сообщений: {self._queue.qsize()}.'
+            )
+        unsent = [
+            (item.chat_id, item.text)
+            for item in self._active if not item.sending
+        ]
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+        self._tasks = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            unsent.append((item.chat_id, item.text))
+        return unsent
+
+    async def enqueue(self, chat_id, text, on_failure=None):
+        """Постановка сообщения в очередь без ожидания отправки.
+
+        Пока очередь заполнена, вызывающий ждёт места в ней: опрос
+        замедляется до скорости отправки, а не теряет сообщения.
+        on_failure() вызывается, если сообщение так и не отправлено.
+        """
+        await self._queue.put(Outgoing(chat_id, text, on_failure))
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.maxsize:
+                self._prune_buckets()
+            bucket = TokenBucket(self.chat_rate, capacity=1)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_buckets(self):
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if bucket.is_idle():
+                del self._chat_buckets[chat_id]
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            self._active.add(item)
+            try:
+                with tracing.span('send_message', item.trace) as span:
+                    span.set('queue.wait', time.monotonic() - item.enqueued_at)
+                    await self._deliver(item)
+                    span.set('attempts', item.attempts)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self.failed += 1
+                metrics.count_error(error)
+                logger.error(str(error), extra=logs.fields(
+                    chat_id=item.chat_id, stage='send_message',
+                    error=type(error).__name__,
+                ))
+                if item.on_failure is not None:
+                    item.on_failure()
+            finally:
+                self._active.discard(item)
+                self._queue.task_done()
+
+    async def _deliver(self, item):
+        loop = asyncio.get_event_loop()
+        chat_bucket = self._chat_bucket(item.chat_id)
+        while True:
+            delay = max(self.global_bucket.reserve(), chat_bucket.reserve())
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                with self.breaker.guard(is_telegram_outage):
+                    with metrics.SEND_MESSAGE.time():
+                        item.sending = True
+                        try:
+                            await loop.run_in_executor(
+                                self._executor, homework.deliver,
+                                self.bot, item.chat_id, item.text,
+                            )
+                        finally:
+                            item.sending = False
+            except exceptions.CircuitOpenError:
+                await asyncio.sleep(
+                    max(self.breaker.retry_in(), BREAKER_WAIT)
+                )
+                continue
+            except exceptions.FloodLimitError as error:
+                item.attempts += 1
+                if item.attempts >= MAX_ATTEMPTS:
+                    raise
+                self.retried += 1
+                logger.warning('Лимит Telegram, повтор.', extra=logs.fields(
+                    chat_id=item.chat_id, stage='send_message',
+                    retry_after=error.retry_after,
+                ))
+                chat_bucket.pause(error.retry_after)
+                continue
+            except exceptions.TelegramUnavailableError:
+                item.attempts += 1
+                if item.attempts >= MAX_ATTEMPTS:
+                    raise
+                self.retried += 1
+                continue
+            self.delivered += 1
+            self.latencies.append(time.monotonic() - item.enqueued_at)
+            return
+
+    @property
+    def depth(self):
+        """Число сообщений в очереди."""
+        if self._queue is None:
+            return 0
+        return self._queue.qsize()
+
+    def stats(self):
+        """Глубина очереди, счётчики и задержка доставки."""
+        latencies = sorted(self.latencies)
+        stats = {
+            'depth': self.depth,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'retried': self.retried,
+        }
+        if latencies:
+            stats['latency_avg'] = sum(latencies) / len(latencies)
+            stats['latency_p99'] = latencies[
+                min(len(latencies) - 1, int(len(latencies) * 0.99))
+            ]
+        return stats
@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4096
+SEPARATOR = '\n\n'
+HEADER = 'Изменения статусов проверки ({count}):'
+
+
+def split_text(parts, limit=MESSAGE_LIMIT, separator=SEPARATOR):
+    """Склейка частей в сообщения не длиннее limit символов.
+
+    Части не разрываются, если помещаются в сообщение целиком;
+    слишком длинная часть режется по строкам, а строка — по limit.
+    """
+    return [chunk for chunk, _ in split_parts(parts, limit, separator)]
+
+
+def split_parts(parts, limit=MESSAGE_LIMIT, separator=SEPARATOR):
+    """Как split_text, но с номерами частей, вошедших в каждое сообщение.
+
+    Часть, разрезанная на несколько сообщений, числится в каждом из них.
+    """
+    chunks = []
+    current = ''
+    owners = set()
+    for index, part in enumerate(parts):
+        for piece in _pieces(part, limit):
+            candidate = current + separator + piece if current else piece
+            if len(candidate) <= limit:
+                current = candidate
+                owners.add(index)
+                continue
+            chunks.append((current, owners))
+            current = piece
+            owners = {index}
+    if current:
+        chunks.append((current, owners))
+    return chunks
+
+
+def _pieces(part, limit):
+    if len(part) <= limit:
+        yield part
+        return
+    current = ''
+    for line in part.split('\n'):
+        while len(line) > limit:
+            if current:
+                yield current
+                current = ''
+            yield line[:limit]
+            line = line[limit:]
+        candidate = current + '\n' + line if current else line
+        if len(candidate) > limit:
+            yield current
+            candidate = line
+        current = candidate
+    if current:
+        yield current
+
+
+def _fail(pending, owners):
+    """Вызов on_failure уведомлений owners, ещё не вызванных."""
+    for index in sorted(owners):
+        callback = pending.pop(index, None)
+        if callback is not None:
+            callback()
+
+
+class DigestBuffer:
+    """Сбор уведомлений по чатам в сводные сообщения.
+
+    Сообщения чата копятся до max_messages штук или window секунд
+    с первого из них и уходят через send(chat_id, text, on_failure)
+    одной сводкой, разбитой по лимиту длины сообщения Telegram.
+    Если часть сводки не отправлена, вызываются on_failure только
+    вошедших в неё сообщений, каждый не больше одного раза.
+    """
+
+    def __init__(self, send, window=60, max_messages=20,
+                 limit=MESSAGE_LIMIT, clock=time.monotonic):
+        self.send = send
+        self.window = window
+        self.max_messages = max_messages
+        self.limit = limit
+        self.received = 0
+        self.sent = 0
+        self._pending = {}
+        self._clock = clock
+
+    async def add(self, chat_id, text, on_failure=None):
+        """Добавление сообщения; сводка уходит при достижении порога."""
+        self.received += 1
+        started, messages, callbacks = self._pending.setdefault(
+            chat_id, (self._clock(), [], [])
+        )
+        messages.append(text)
+        callbacks.append(on_failure)
+        if len(messages) >= self.max_messages:
+            await self.flush(chat_id)
+
+    def format(self, messages):
+        return [text for text, _ in self._chunks(messages)]
+
+    def _chunks(self, messages):
+        """Сообщения сводки с номерами вошедших в них уведомлений."""
+        if len(messages) == 1:
+            return split_parts(messages, self.limit)
+        header = HEADER.format(count=len(messages))
+        return [
+            (text, {index - 1 for index in owners if index})
+            for text, owners in split_parts([header] + messages, self.limit)
+        ]
+
+    async def flush(self, chat_id):
+        """Отправка накопленного в чат.
+
+        Если отправка прервана ошибкой, неотправленные части сводки
+        откатываются вместе с той, на которой она произошла.
+        """
+        _, messages, callbacks = self._pending.pop(chat_id, (None, [], []))
+        pending = dict(enumerate(callbacks))
+        chunks = self._chunks(messages)
+        for position, (text, owners) in enumerate(chunks):
+            try:
+                await self.send(chat_id, text, on_failure=functools.partial(
+                    _fail, pending, owners
+                ))
+            except (Exception, asyncio.CancelledError):
+                for _, rest in chunks[position:]:
+                    _fail(pending, rest)
+                raise
+            self.sent += 1
+
+    async def flush_due(self):
+        """Отправка сводок, окно которых истекло."""
+        now = self._clock()
+        due = [
+            chat_id for chat_id, (started, _, _) in self._pending.items()
+            if now - started >= self.window
+        ]
+        for chat_id in due:
+            await self.flush(chat_id)
+
+    async def flush_all(self):
+        for chat_id in list(self._pending):
+            await self.flush(chat_id)
+
+    async def run(self):
+        """Периодическая отправка сводок."""
+        while True:
+            await asyncio.sleep(max(self.window / 4, 0.01))
+            try:
+                await self.flush_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.error(f'Ошибка отправки сводки: {error}')
+
+    def stats(self):
+        return {
+            'pending': sum(len(m) for _, m, _ in self._pending.values()),
+            'received': self.received,
+            'sent': self.sent,
+        }
@@ -0,0 +1,776 @@
+import asyncio
+import collections
+import functools
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import breaker
+import dedup
+import digest
+import exceptions
+import fingerprints
+import homework
+import logs
+import metrics
+import pipeline
+import records
+import scheduler
+import sinks
+import status_index
+import tracing
+import validation
+
+logger = logging.getLogger(__name__)
+
+HISTORY_LIMIT = 20
+
+
+class Tenant:
+    """Учётная запись: токен Я.Практикум и чат для уведомлений."""
+
+    __slots__ = (
+        'tenant_id', 'practicum_token', 'chat_id', 'timestamp',
+        'last_err_msg', 'status', 'changed_at', 'errors', 'statuses',
+        'history',
+    )
+
+    def __init__(self, tenant_id, practicum_token, chat_id, timestamp=None):
+        self.tenant_id = str(tenant_id)
+        self.practicum_token = practicum_token
+        self.chat_id = chat_id
+        if timestamp is None:
+            timestamp = int(time.time())
+        self.timestamp = timestamp
+        self.last_err_msg = ''
+        self.status = None
+        self.changed_at = time.time()
+        self.errors = 0
+        self.statuses = status_index.StatusIndex()
+        self.history = []
+
+    def remember(self, name, status):
+        """Запись смены статуса в историю последних HISTORY_LIMIT."""
+        self.history.append(
+            (self.changed_at, records.intern(name), records.intern(status))
+        )
+        if len(self.history) > HISTORY_LIMIT:
+            del self.history[0]
+
+    def snapshot(self):
+        """Состояние для сохранения между перезапусками."""
+        return {
+            'timestamp': self.timestamp,
+            'status': self.status,
+            'changed_at': self.changed_at,
+            'errors': self.errors,
+            'last_err_msg': self.last_err_msg,
+            'statuses': self.statuses.as_dict(),
+        }
+
+    def restore(self, state):
+        """Восстановление сохранённого состояния."""
+        self.timestamp = state['timestamp']
+        self.status = records.intern(state['status'])
+        self.changed_at = state['changed_at']
+        self.errors = state['errors']
+        self.last_err_msg = state['last_err_msg']
+        self.statuses = status_index.StatusIndex(state['statuses'])
+
+
+class PollJob(pipeline.Job):
+    """Опрос одной учётной записи на этапах конвейера."""
+
+    __slots__ = (
+        'tenant', 'from_date', 'answer', 'fingerprint', 'streamed',
+        'homeworks', 'current_date', 'changes', 'messages',
+    )
+
+    def __init__(self, tenant, span=tracing.NOOP):
+        super().__init__(span)
+        self.tenant = tenant
+        self.from_date = None
+        self.answer = None
+        self.fingerprint = None
+        self.streamed = None
+        self.homeworks = None
+        self.current_date = None
+        self.changes = ()
+        self.messages = ()
+
+
+def _tenant_id(record):
+    """id из файла или чат и хеш токена, если id не задан.
+
+    Идентификатор не зависит от порядка записей в файле, поэтому
+    сохранённое состояние не переходит к другой учётной записи
+    при правке файла.
+    """
+    if 'id' in record:
+        return str(record['id'])
+    token = hashlib.sha256(
+        record['practicum_token'].encode('utf-8')
+    ).hexdigest()
+    return f'{record["chat_id"]}-{token[:12]}'
+
+
+def load_tenants(path=None):
+    """Загрузка учётных записей из JSON-файла или переменных окружения.
+
+    Повторяющиеся идентификаторы — ошибка: у таких записей было бы
+    одно состояние на двоих.
+    """
+    if not path:
+        return [Tenant(
+            'default', homework.PRACTICUM_TOKEN, homework.TELEGRAM_CHAT_ID
+        )]
+    with open(path, encoding='utf-8') as file:
+        records = json.load(file)
+    if not isinstance(records, list):
+        raise exceptions.TenantConfigError(
+            f'Файл {path} должен содержать список учётных записей.'
+        )
+    tenants = {}
+    for index, record in enumerate(records):
+        try:
+            tenant = Tenant(
+                _tenant_id(record),
+                record['practicum_token'],
+                record['chat_id'],
+            )
+        except (AttributeError, KeyError, TypeError) as error:
+            raise exceptions.TenantConfigError(
+                f'Некорректная учётная запись №{index}: {error}'
+            )
+        if tenant.tenant_id in tenants:
+            raise exceptions.TenantConfigError(
+                f'Повторяющийся id учётной записи №{index}: '
+                f'{tenant.tenant_id}'
+            )
+        tenants[tenant.tenant_id] = tenant
+    return list(tenants.values())
+
+
+def _records(homeworks):
+    return [
+        records.Homework.from_dict(item) if isinstance(item, dict) else item
+        for item in homeworks
+    ]
+
+
+def is_api_outage(error):
+    """Ошибка говорит о недоступности API, а не об учётной записи."""
+    if isinstance(error, exceptions.RequestToAPIError):
+        return True
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status is not None and (
+        status >= HTTPStatus.INTERNAL_SERVER_ERROR
+        or status == HTTPStatus.TOO_MANY_REQUESTS
+    )
+
+
+class PollingEngine:
+    """Конкурентный опрос API Я.Практикум для множества учётных записей."""
+
+    def __init__(self, bot, tenants, max_in_flight=64, retry_time=None,
+                 poll_scheduler=None, store=None, flush_interval=5,
+                 delivery=None, api_breaker=None, digest_window=0,
+                 digest_size=20, retry_policy=None,
+                 queue_size=pipeline.QUEUE_SIZE):
+        self.bot = bot
+        self.delivery = delivery
+        self.digest = None
+        if digest_window:
+            self.digest = digest.DigestBuffer(
+                self.send, window=digest_window, max_messages=digest_size
+            )
+        self.tenants = list(tenants)
+        self._index()
+        self.store = store
+        self.flush_interval = flush_interval
+        if store is not None:
+            self.restore_state()
+        self.max_in_flight = max_in_flight
+        self.retry_time = retry_time or homework.RETRY_TIME
+        if poll_scheduler is None:
+            poll_scheduler = scheduler.PollScheduler(
+                interval=self.retry_time,
+                reviewing_interval=homework.REVIEWING_RETRY_TIME,
+                idle_interval=homework.IDLE_RETRY_TIME,
+                idle_after=homework.IDLE_AFTER,
+                min_interval=homework.MIN_RETRY_TIME,
+                max_interval=homework.MAX_RETRY_TIME,
+            )
+        self.scheduler = poll_scheduler
+        if api_breaker is None:
+            api_breaker = breaker.CircuitBreaker(
+                'practicum',
+                failure_threshold=homework.CIRCUIT_FAILURES,
+                reset_timeout=homework.CIRCUIT_RESET_TIME,
+            )
+        self.api_breaker = api_breaker
+        self.retry_policy = retry_policy
+        self.fingerprints = fingerprints.FingerprintCache()
+        self.error_cache = dedup.ErrorDeduplicator(
+            ttl=homework.ERROR_TTL, maxsize=homework.ERROR_CACHE_SIZE
+        )
+        self.pipeline = pipeline.Pipeline([
+            ('fetch', self._fetch_stage, max_in_flight),
+            ('validate', self._validate_stage),
+            ('diff', self._diff_stage),
+            ('render', self._render_stage),
+            ('deliver', self._deliver_stage, max_in_flight),
+        ], queue_size=queue_size)
+        self.background = []
+        self.recorder = None
+        self.fetch = None
+        self.owned = None
+        self.lease_check = None
+        self.drain_timeout = flush_interval
+        self.profiler = None
+        self.sinks = None
+        self._loops = {}
+        self._locks = {}
+        self._stopping = None
+        self._executor = None
+
+    def add_background(self, factory):
+        """Фоновая корутина, запускаемая вместе с опросом."""
+        self.background.append(factory)
+
+    def tenant_states(self):
+        """Число учётных записей по состояниям опроса."""
+        now = time.time()
+        states = collections.Counter()
+        for tenant in self.tenants:
+            if tenant.errors:
+                states['error'] += 1
+            elif tenant.status == scheduler.REVIEWING_STATUS:
+                states['reviewing'] += 1
+            elif now - tenant.changed_at >= self.scheduler.idle_after:
+                states['idle'] += 1
+            else:
+                states['active'] += 1
+        return states
+
+    def restore_state(self):
+        """Продолжение опроса с сохранённых курсоров."""
+        restored = self._restore(self.tenants, self.store.load_all())
+        logger.info(f'Восстановлено состояние учётных записей: {restored}.')
+
+    def _restore(self, tenants, states=None):
+        if states is None:
+            states = self.store.load(tenant.tenant_id for tenant in tenants)
+        restored = 0
+        for tenant in tenants:
+            state = states.get(tenant.tenant_id)
+            if state is not None:
+                tenant.restore(state)
+                restored += 1
+        return restored
+
+    def _setup(self):
+        """Пул потоков и этапы опроса запускаются в работающем event loop."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_in_flight
+            )
+        self.pipeline.start()
+
+    async def _call(self, func, *args):
+        """Выполнение блокирующего вызова в пуле потоков."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def send(self, chat_id, message, batch=False, on_failure=None):
+        """Отправка через очередь, если она запущена, иначе напрямую.
+
+        С batch=True сообщение попадает в сводку, если она включена.
+        on_failure() вызывается, если сообщение не отправлено, в том
+        числе когда очередь или сводка отказываются от него позже.
+        """
+        if batch and self.digest is not None:
+            await self.digest.add(chat_id, message, on_failure)
+            return
+        try:
+            if self.delivery is not None:
+                await self.delivery.enqueue(chat_id, message, on_failure)
+                return
+            with metrics.SEND_MESSAGE.time(), tracing.span('send_message'):
+                await self._call(homework.deliver, self.bot, chat_id, message)
+        except (Exception, asyncio.CancelledError):
+            if on_failure is not None:
+                on_failure()
+            raise
+
+    def tenants_for_chat(self, chat_id):
+        """Учётные записи, уведомления которых приходят в чат.
+
+        Состояние учётных записей, которые опрашивает другой процесс,
+        перечитывается из хранилища.
+        """
+        tenants = self._by_chat.get(str(chat_id), [])
+        if self.owned is not None and self.store is not None:
+            foreign = [t for t in tenants if t.tenant_id not in self.owned]
+            if foreign:
+                self._restore(foreign)
+        return tenants
+
+    def _start(self, tenant, delay):
+        self._locks[tenant.tenant_id] = asyncio.Lock()
+        self._loops[tenant.tenant_id] = asyncio.ensure_future(
+            self._tenant_loop(tenant, delay)
+        )
+
+    async def acquire(self, tenant_ids):
+        """Начало опроса учётных записей, полученных от другого процесса.
+
+        Состояние перечитывается из хранилища, опросы распределяются
+        по интервалу опроса.
+        """
+        self._setup()
+        tenants = [
+            self._by_id[tenant_id] for tenant_id in tenant_ids
+            if tenant_id in self._by_id and tenant_id not in self._loops
+        ]
+        if self.store is not None:
+            await self._call(self._restore, tenants)
+        step = self.retry_time / max(len(tenants), 1)
+        for index, tenant in enumerate(tenants):
+            if self.owned is not None:
+                self.owned.add(tenant.tenant_id)
+            self._start(tenant, index * step)
+
+    async def update_tenants(self, tenants):
+        """Применение нового списка учётных записей без перезапуска.
+
+        Новые учётные записи начинают опрашиваться, удалённые —
+        перестают после текущего цикла, у остальных обновляются
+        токен и чат. Возвращает число добавленных, удалённых
+        и изменённых.
+        """
+        fresh = {tenant.tenant_id: tenant for tenant in tenants}
+        removed = [tenant_id for tenant_id in self._by_id
+                   if tenant_id not in fresh]
+        added = [tenant for tenant_id, tenant in fresh.items()
+                 if tenant_id not in self._by_id]
+        updated = 0
+        for tenant_id, tenant in fresh.items():
+            current = self._by_id.get(tenant_id)
+            if current is None or (
+                current.practicum_token == tenant.practicum_token
+                and str(current.chat_id) == str(tenant.chat_id)
+            ):
+                continue
+            current.practicum_token = tenant.practicum_token
+            current.chat_id = tenant.chat_id
+            self.fingerprints.forget(tenant_id)
+            updated += 1
+        await self.release(removed)
+        self.tenants = [
+            tenant for tenant in self.tenants if tenant.tenant_id in fresh
+        ] + added
+        self._index()
+        if self.owned is None:
+            await self.acquire(tenant.tenant_id for tenant in added)
+        return len(added), len(removed), updated
+
+    def _index(self):
+        self._by_id = {tenant.tenant_id: tenant for tenant in self.tenants}
+        self._by_chat = {}
+        for tenant in self.tenants:
+            self._by_chat.setdefault(str(tenant.chat_id), []).append(tenant)
+
+    async def release(self, tenant_ids, flush=True):
+        """Остановка опроса учётных записей после текущего цикла.
+
+        При flush=False несохранённое состояние отбрасывается: его
+        уже пишет новый владелец.
+        """
+        for tenant_id in tenant_ids:
+            task = self._loops.pop(tenant_id, None)
+            if task is not None:
+                async with self._locks.pop(tenant_id):
+                    task.cancel()
+            self.fingerprints.forget(tenant_id)
+            if self.owned is not None:
+                self.owned.discard(tenant_id)
+        if self.store is None:
+            return
+        if flush:
+            await self._call(self.store.flush)
+        else:
+            self.store.discard(tenant_ids)
+
+    async def poll_once(self, tenant, lag=None):
+        """Один цикл опроса для учётной записи.
+
+        lag — отставание начала опроса от расписания, для трассы.
+        """
+        self._setup()
+        with tracing.trace('poll', tenant=tenant.tenant_id) as span:
+            if lag is not None:
+                span.set('schedule.lag', lag)
+            await self._poll_guarded(tenant, span)
+        if self.profiler is not None:
+            self.profiler.poll_done()
+
+    async def _poll_guarded(self, tenant, span):
+        try:
+            await self._poll(tenant, span)
+        except exceptions.CircuitOpenError as error:
+            logger.debug(str(error), extra=logs.fields(tenant))
+            metrics.count_error(error)
+            span.fail(error)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            tenant.errors += 1
+            span.fail(error)
+            await self._report_error(tenant, error)
+        else:
+            if tenant.errors:
+                await self._report_recovery(tenant)
+            tenant.errors = 0
+        if self.store is not None:
+            self.store.save(tenant)
+
+    async def _fetch(self, tenant):
+        """Запрос к API с записью ответа, если включена запись трафика.
+
+        Пока автомат защиты API разомкнут, запрос не выполняется.
+        Кратковременные сбои повторяются по retry_policy, если она задана;
+        тогда fetch получает deadline — остаток срока повторов, а через
+        автомат проходит каждая попытка.
+        """
+        fetch = self.fetch or homework.fetch_answer
+        from_date = tenant.timestamp
+        args = (
+            from_date,
+            tenant.practicum_token,
+            self.fingerprints.etag(tenant.tenant_id),
+        )
+
+        def attempt(timeout):
+            return self._call(functools.partial(
+                fetch, *args, deadline=timeout
+            ))
+
+        with tracing.span('get_api_answer') as span:
+            started = time.perf_counter()
+            try:
+                if self.retry_policy is None:
+                    with self.api_breaker.guard(is_api_outage):
+                        answer = await self._call(fetch, *args)
+                else:
+                    answer = await self.retry_policy.call(
+                        attempt, is_api_outage, span, self._stopping,
+                        circuit=self.api_breaker,
+                    )
+            except exceptions.CircuitOpenError:
+                raise
+            except Exception as error:
+                elapsed = time.perf_counter() - started
+                metrics.GET_API_ANSWER.observe(elapsed)
+                if self.recorder is not None:
+                    self.recorder.record_error(
+                        tenant.tenant_id, from_date, elapsed, error
+                    )
+                raise
+        elapsed = time.perf_counter() - started
+        metrics.GET_API_ANSWER.observe(elapsed)
+        span.set('http.status_code', answer.status_code)
+        logger.debug('Ответ API получен.', extra=logs.fields(
+            tenant, stage='get_api_answer', duration=elapsed,
+            status=answer.status_code,
+        ))
+        if self.recorder is not None:
+            self.recorder.record(tenant.tenant_id, from_date, elapsed, answer)
+        return answer
+
+    async def _poll(self, tenant, span=tracing.NOOP):
+        await self.pipeline.run(PollJob(tenant, span))
+
+    async def _fetch_stage(self, job):
+        """Этап fetch: запрос к API."""
+        job.from_date = job.tenant.timestamp
+        job.answer = await self._fetch(job.tenant)
+
+    async def _validate_stage(self, job):
+        """Этап validate: неизменившийся ответ завершает опрос.
+
+        Большие ответы разбираются потоково, без построения всего
+        списка работ в памяти: работы проверяются по одной на этапе diff.
+        """
+        tenant = job.tenant
+        job.fingerprint = fingerprints.Fingerprint.from_answer(job.answer)
+        if self.fingerprints.is_unchanged(tenant.tenant_id, job.fingerprint):
+            metrics.FINGERPRINT_HITS.inc()
+            if job.fingerprint.current_date is not None:
+                tenant.timestamp = job.fingerprint.current_date
+            logger.debug('Ответ API не изменился.', extra=logs.fields(
+                tenant, stage='fingerprint'
+            ))
+            job.finished = True
+            return
+        content = job.answer.content
+        with metrics.CHECK_RESPONSE.time(), tracing.span('check_response'):
+            if len(content) >= validation.STREAM_THRESHOLD:
+                job.streamed = validation.StreamedResponse(
+                    content, homework.RESPONSE_SCHEMA
+                )
+                job.homeworks = job.streamed.homeworks()
+                return
+            response = validation.decode(content)
+            job.homeworks = homework.check_response(response)
+            job.current_date = response['current_date']
+
+    async def _diff_stage(self, job):
+        """Этап diff: работы, статус которых изменился, — записи Homework."""
+        job.changes = _records(job.tenant.statuses.changes(job.homeworks))
+        job.homeworks = None
+        if job.streamed is not None:
+            job.current_date = job.streamed.fields['current_date']
+            job.streamed = None
+        job.span.set('changes', len(job.changes))
+
+    async def _render_stage(self, job):
+        """Этап render: текст уведомления для каждой изменившейся работы."""
+        with metrics.PARSE_STATUS.time(), tracing.span('parse_status'):
+            job.messages = [
+                homework.parse_status(changed) for changed in job.changes
+            ]
+
+    async def _deliver_stage(self, job):
+        """Этап deliver: отправка и сохранение новых статусов.
+
+        Статус запоминается до отправки и возвращается в _rollback,
+        если уведомление так и не доставлено. Копии уведомлений уходят
+        в дополнительные каналы sinks без ожидания доставки.
+        """
+        tenant = job.tenant
+        for changed, message in zip(job.changes, job.messages):
+            previous = tenant.statuses.commit(changed)
+            await self.send(
+                tenant.chat_id, message, batch=True,
+                on_failure=functools.partial(
+                    self._rollback, tenant, changed, previous, job.from_date
+                ),
+            )
+            tenant.status = changed['status']
+            tenant.changed_at = time.time()
+            tenant.remember(changed.get('homework_name'), tenant.status)
+            if self.sinks is not None:
+                self.sinks.dispatch(sinks.Event(
+                    tenant.tenant_id, tenant.chat_id,
+                    changed.get('homework_name'), tenant.status, message,
+                    tenant.changed_at,
+                ))
+            logger.info('Сообщение передано на отправку.', extra=logs.fields(
+                tenant, stage='send_message'
+            ))
+        if not job.changes:
+            logger.debug(
+                'Статус последней работы не изменился.',
+                extra=logs.fields(tenant, stage='check_response'),
+            )
+        if tenant.statuses.count(scheduler.REVIEWING_STATUS):
+            tenant.status = scheduler.REVIEWING_STATUS
+        tenant.timestamp = job.current_date
+        self.fingerprints.remember(tenant.tenant_id, job.fingerprint)
+
+    def _rollback(self, tenant, changed, previous, from_date):
+        """Возврат статуса работы, уведомление о которой не доставлено.
+
+        Курсор опроса откатывается к from_date, а отпечаток ответа
+        забывается, поэтому следующий опрос снова получит работу
+        и повторит уведомление.
+        """
+        tenant.statuses.rollback(changed, previous)
+        if from_date is not None:
+            tenant.timestamp = min(tenant.timestamp, from_date)
+        self.fingerprints.forget(tenant.tenant_id)
+        if self.store is not None:
+            self.store.save(tenant)
+        logger.warning(
+            'Уведомление не доставлено, статус будет отправлен повторно.',
+            extra=logs.fields(tenant, stage='send_message'),
+        )
+
+    async def _report_error(self, tenant, error):
+        """Отправка сообщения об ошибке без повторов.
+
+        Повторы отсекает error_cache; last_err_msg защищает от
+        повторного уведомления после перезапуска.
+        """
+        message = f'Сбой в работе программы: {error}'
+        logger.error(str(error), extra=logs.fields(
+            tenant, error=type(error).__name__
+        ))
+        metrics.count_error(error)
+        first = self.error_cache.report(
+            tenant.chat_id, tenant.tenant_id, error, message
+        )
+        if not first or message == tenant.last_err_msg:
+            return
+        try:
+            await self.send(tenant.chat_id, message)
+        except exceptions.SendMessageError as send_error:
+            self.error_cache.forget(tenant.chat_id, error)
+            logger.error(str(send_error), extra=logs.fields(
+                tenant, stage='send_message',
+                error=type(send_error).__name__,
+            ))
+            return
+        logger.info(
+            'Сообщение с ошибкой передано на отправку.',
+            extra=logs.fields(tenant, stage='send_message'),
+        )
+        tenant.last_err_msg = message
+
+    async def _report_recovery(self, tenant):
+        """Итог по ошибкам, которые перестали повторяться."""
+        tenant.last_err_msg = ''
+        for chat_id, summary in self.error_cache.resolve(tenant.tenant_id):
+            try:
+                await self.send(chat_id, summary)
+            except exceptions.SendMessageError as send_error:
+                logger.error(str(send_error), extra=logs.fields(
+                    tenant, stage='send_message',
+                    error=type(send_error).__name__,
+                ))
+
+    async def poll_all(self):
+        """Однократный опрос всех учётных записей."""
+        self._setup()
+        await asyncio.gather(*(
+            self.poll_once(tenant) for tenant in self.tenants
+        ))
+
+    async def _tenant_loop(self, tenant, delay):
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + delay
+        while True:
+            await asyncio.sleep(max(0, deadline - loop.time()))
+            lag = max(0, loop.time() - deadline)
+            metrics.SCHEDULE_LAG.observe(lag)
+            if self.lease_check is None or self.lease_check(tenant.tenant_id):
+                async with self._locks[tenant.tenant_id]:
+                    await self.poll_once(tenant, lag)
+            deadline = self.scheduler.next_deadline(
+                tenant, deadline, loop.time()
+            )
+            logger.debug('Следующий опрос запланирован.', extra=logs.fields(
+                tenant, stage='schedule', delay=round(deadline - loop.time())
+            ))
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._call(self.store.flush)
+
+    def stop(self):
+        """Плавная остановка опроса.
+
+        Текущие циклы опроса завершаются, очередь отправки
+        дорабатывает, состояние сохраняется.
+        """
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self):
+        """Опрос с равномерным распределением запросов до вызова stop().
+
+        Если owned не None, опрашиваются только учётные записи,
+        переданные в acquire().
+        """
+        self._setup()
+        self._stopping = asyncio.Event()
+        if self.owned is None:
+            step = self.retry_time / max(len(self.tenants), 1)
+            for index, tenant in enumerate(self.tenants):
+                self._start(tenant, index * step)
+        loops = []
+        if self.store is not None:
+            loops.append(self._flush_loop())
+        if self.digest is not None:
+            loops.append(self.digest.run())
+        loops.extend(factory() for factory in self.background)
+        if self.delivery is not None:
+            self.delivery.start()
+            await self._requeue_outbox()
+        tasks = [asyncio.ensure_future(loop) for loop in loops]
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        try:
+            done, _ = await asyncio.wait(
+                tasks + [stopping], return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                task.result()
+        finally:
+            await self._shutdown(tasks + [stopping])
+
+    async def _shutdown(self, tasks):
+        """Остановка не дольше drain_timeout секунд в сумме.
+
+        Каждый этап получает только время, оставшееся от общего срока.
+        """
+        logger.info('Остановка опроса.')
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.drain_timeout
+
+        def remaining():
+            return max(0, deadline - loop.time())
+
+        await self._stop_loops(remaining())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.pipeline.stop()
+        if self.sinks is not None:
+            await self.sinks.close(timeout=remaining())
+        if self.digest is not None:
+            try:
+                await asyncio.wait_for(self.digest.flush_all(), remaining())
+            except asyncio.TimeoutError:
+                logger.warning('Сводки не отправлены до остановки.')
+        if self.delivery is not None:
+            unsent = await self.delivery.stop(timeout=remaining())
+            if unsent and self.store is not None:
+                self.store.save_outbox(unsent)
+        if self.store is not None:
+            self.store.flush()
+        self._executor.shutdown(wait=False)
+
+    async def _stop_loops(self, timeout):
+        """Остановка циклов опроса.
+
+        Текущим опросам даётся timeout секунд на завершение,
+        затем они прерываются.
+        """
+        tenant_ids = list(self._loops)
+        loops = [self._loops[tenant_id] for tenant_id in tenant_ids]
+        try:
+            await asyncio.wait_for(self.release(tenant_ids), timeout)
+            return
+        except asyncio.TimeoutError:
+            logger.warning(
+                'Опросы не завершились за %s с и прерваны.', round(timeout, 3)
+            )
+        for task in loops:
+            task.cancel()
+        await asyncio.gather(*loops, return_exceptions=True)
+        await self.release(list(self._loops))
+
+    async def _requeue_outbox(self):
+        """Отправка сообщений, не отправленных до прошлой остановки."""
+        if self.store is None:
+            return
+        unsent = self.store.load_outbox()
+        for chat_id, message in unsent:
+            await self.delivery.enqueue(chat_id, message)
+        if unsent:
+            logger.info(f'Возвращено в очередь сообщений: {len(unsent)}.')
@@ -4,6 +4,20 @@ class SendMessageError(Exception):
     pass
 
 
+class FloodLimitError(SendMessageError):
+    """Превышен лимит Telegram на отправку сообщений."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TelegramUnavailableError(SendMessageError):
+    """Telegram недоступен: сетевая ошибка или таймаут."""
+
+    pass
+
+
 class RequestToAPIError(Exception):
     """Ошибка запроса к API."""
 
@@ -32,3 +46,25 @@ class KeyNotFoundInResponseError(Exception):
     """Отсутствует обязательный ключ."""
 
     pass
+
+
+class TenantConfigError(Exception):
+    """Некорректное описание учётной записи."""
+
+    pass
+
+
+class CircuitOpenError(Exception):
+    """Запросы к недоступному сервису приостановлены."""
+
+    def __init__(self, message, upstream):
+        super().__init__(message)
+        self.upstream = upstream
+
+
+class SinkError(SendMessageError):
+    """Ошибка отправки уведомления в дополнительный канал."""
+
+    def __init__(self, message, sink):
+        super().__init__(message)
+        self.sink = sink
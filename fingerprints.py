@@ -0,0 +1,77 @@
+import hashlib
+import re
+from http import HTTPStatus
+
+CURRENT_DATE_RE = re.compile(rb'"current_date"\s*:\s*(\d+)')
+
+
+class Fingerprint:
+    """Отпечаток ответа API: ETag или хеш тела без поля current_date."""
+
+    __slots__ = ('etag', 'digest', 'current_date', 'not_modified')
+
+    def __init__(self, etag=None, digest=None, current_date=None,
+                 not_modified=False):
+        self.etag = etag
+        self.digest = digest
+        self.current_date = current_date
+        self.not_modified = not_modified
+
+    @classmethod
+    def from_answer(cls, answer):
+        """Отпечаток по сырому ответу, без декодирования JSON."""
+        etag = answer.headers.get('ETag')
+        if answer.status_code == HTTPStatus.NOT_MODIFIED:
+            return cls(etag=etag, not_modified=True)
+        body = answer.content
+        current_date = None
+        match = CURRENT_DATE_RE.search(body)
+        if match:
+            current_date = int(match.group(1))
+        digest = hashlib.blake2b(
+            CURRENT_DATE_RE.sub(b'', body), digest_size=16
+        ).digest()
+        return cls(etag, digest, current_date)
+
+
+class FingerprintCache:
+    """Последние обработанные ответы API по учётным записям."""
+
+    def __init__(self):
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def etag(self, key):
+        """ETag последнего обработанного ответа для If-None-Match."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry.etag
+
+    def is_unchanged(self, key, fingerprint):
+        """Проверка, совпадает ли ответ с последним обработанным."""
+        entry = self._entries.get(key)
+        unchanged = fingerprint.not_modified or (
+            entry is not None and entry.digest == fingerprint.digest
+        )
+        if unchanged:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return unchanged
+
+    def remember(self, key, fingerprint):
+        """Сохранение отпечатка после успешной обработки ответа."""
+        if not fingerprint.not_modified:
+            self._entries[key] = fingerprint
+
+    def forget(self, key):
+        self._entries.pop(key, None)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return self.hits / total
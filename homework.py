@@ -4,11 +4,12 @@ import sys
 import time
 from http import HTTPStatus
 
-import requests
-import telegram
 from dotenv import load_dotenv
 
 import exceptions
+import validation
+
+STARTED = time.perf_counter()
 
 load_dotenv()
 
@@ -16,9 +17,81 @@ PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
-RETRY_TIME = 600
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+MAX_IN_FLIGHT = int(os.getenv('MAX_IN_FLIGHT', 64))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', MAX_IN_FLIGHT))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 10))
+HTTP_DEADLINE = float(os.getenv('HTTP_DEADLINE', 30))
+API_RETRY_BASE = float(os.getenv('API_RETRY_BASE', 0.5))
+API_RETRY_CAP = float(os.getenv('API_RETRY_CAP', 10))
+API_RETRY_BUDGET = float(os.getenv('API_RETRY_BUDGET', 30))
+API_HEDGE = os.getenv('API_HEDGE', '0') == '1'
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 64))
+
+SINK_TELEGRAM_CHAT_ID = os.getenv('SINK_TELEGRAM_CHAT_ID')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 25))
+SMTP_FROM = os.getenv('SMTP_FROM', 'homework-bot@localhost')
+SMTP_TO = [
+    address.strip() for address in os.getenv('SMTP_TO', '').split(',')
+    if address.strip()
+]
+AUDIT_FILE = os.getenv('AUDIT_FILE')
+SINK_TIMEOUT = float(os.getenv('SINK_TIMEOUT', 10))
+
+TELEGRAM_WORKERS = int(os.getenv('TELEGRAM_WORKERS', 4))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+DELIVERY_QUEUE_SIZE = int(os.getenv('DELIVERY_QUEUE_SIZE', 10000))
+DIGEST_WINDOW = float(os.getenv('DIGEST_WINDOW', 0))
+DIGEST_SIZE = int(os.getenv('DIGEST_SIZE', 20))
+TELEGRAM_COMMANDS = os.getenv('TELEGRAM_COMMANDS', '1') == '1'
+RECORD_FILE = os.getenv('RECORD_FILE')
+STARTUP_BUDGET = float(os.getenv('STARTUP_BUDGET', 1.0))
+CIRCUIT_FAILURES = int(os.getenv('CIRCUIT_FAILURES', 5))
+CIRCUIT_RESET_TIME = float(os.getenv('CIRCUIT_RESET_TIME', 30))
+ERROR_TTL = float(os.getenv('ERROR_TTL', 6 * 3600))
+ERROR_CACHE_SIZE = int(os.getenv('ERROR_CACHE_SIZE', 1024))
+TRACE_FILE = os.getenv('TRACE_FILE')
+TRACE_RATIO = float(os.getenv('TRACE_RATIO', 0.01))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+PROFILE_SOCKET = os.getenv('PROFILE_SOCKET')
+PROFILE_POLLS = int(os.getenv('PROFILE_POLLS', 100))
+PROFILE_SECONDS = float(os.getenv('PROFILE_SECONDS', 30))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+
+SHARD_DB = os.getenv('SHARD_DB')
+WORKER_ID = os.getenv('WORKER_ID')
+LEASE_TTL = float(os.getenv('LEASE_TTL', 60))
+REBALANCE_INTERVAL = float(os.getenv('REBALANCE_INTERVAL', 10))
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 10))
+LOG_SAMPLE_PERIOD = float(os.getenv('LOG_SAMPLE_PERIOD', 60))
+
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'sqlite')
+STATE_DB = os.getenv('STATE_DB', 'state.sqlite3')
+
+RETRY_TIME = int(os.getenv('RETRY_TIME', 600))
+REVIEWING_RETRY_TIME = int(os.getenv('REVIEWING_RETRY_TIME', 120))
+IDLE_RETRY_TIME = int(os.getenv('IDLE_RETRY_TIME', 1800))
+IDLE_AFTER = int(os.getenv('IDLE_AFTER', 3 * 24 * 3600))
+MIN_RETRY_TIME = int(os.getenv('MIN_RETRY_TIME', 60))
+MAX_RETRY_TIME = int(os.getenv('MAX_RETRY_TIME', 3600))
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 8))
+
+RELOADABLE = (
+    'PRACTICUM_TOKEN', 'TELEGRAM_CHAT_ID', 'TENANTS_FILE', 'RETRY_TIME',
+    'REVIEWING_RETRY_TIME', 'IDLE_RETRY_TIME', 'IDLE_AFTER',
+    'MIN_RETRY_TIME', 'MAX_RETRY_TIME', 'API_RETRY_BASE', 'API_RETRY_CAP',
+    'API_RETRY_BUDGET',
+)
 
 
 HOMEWORK_VERDICTS = {
@@ -27,11 +100,66 @@ HOMEWORK_VERDICTS = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
+RESPONSE_SCHEMA = {
+    'type': dict,
+    'type_error': (TypeError, 'Некорректный тип данных.'),
+    'required': ('homeworks', 'current_date'),
+    'required_error': (
+        exceptions.KeyNotFoundInResponseError,
+        'Список работ или дата недоступны.',
+    ),
+    'fields': {
+        'homeworks': {
+            'type': list,
+            'type_error': (
+                exceptions.IncorrectTypeError,
+                'Некорректный тип данных в списке домашек.',
+            ),
+        },
+    },
+}
+HOMEWORK_SCHEMA = {
+    'required': ('homework_name', 'status'),
+    'required_error': (
+        KeyError, 'Отсутствует имя или статус в домашней работе.'
+    ),
+    'fields': {
+        'status': {
+            'enum': HOMEWORK_VERDICTS,
+            'enum_error': (
+                exceptions.IncorrectStatusError, 'Неизвестный статус: {value}'
+            ),
+        },
+    },
+}
+
+validate_response = validation.compile_schema(RESPONSE_SCHEMA)
+validate_homework = validation.compile_schema(HOMEWORK_SCHEMA)
+
 
 def send_message(bot, message):
     """Отправка сообщения."""
+    deliver(bot, TELEGRAM_CHAT_ID, message)
+
+
+def deliver(bot, chat_id, message):
+    """Отправка сообщения в указанный чат."""
+    import telegram
+
     try:
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+        bot.send_message(chat_id=chat_id, text=message)
+    except telegram.error.RetryAfter as error:
+        raise exceptions.FloodLimitError(
+            f'Ошибка отправки сообщения: {error}', error.retry_after
+        )
+    except telegram.error.BadRequest as error:
+        raise exceptions.SendMessageError(
+            f'Ошибка отправки сообщения: {error}'
+        )
+    except telegram.error.NetworkError as error:
+        raise exceptions.TelegramUnavailableError(
+            f'Ошибка отправки сообщения: {error}'
+        )
     except telegram.error.TelegramError as error:
         raise exceptions.SendMessageError(
             f'Ошибка отправки сообщения: {error}'
@@ -40,64 +168,92 @@ def send_message(bot, message):
 
 def get_api_answer(current_timestamp):
     """GET-запрос к API Я.Практикум."""
+    return request_homeworks(current_timestamp, PRACTICUM_TOKEN)
+
+
+def request_homeworks(current_timestamp, token):
+    """GET-запрос к API Я.Практикум с токеном учётной записи."""
+    return fetch_answer(current_timestamp, token).json()
+
+
+def fetch_answer(current_timestamp, token, etag=None, deadline=None):
+    """GET-запрос к API Я.Практикум без разбора тела ответа.
+
+    deadline — лимит времени запроса в секундах, если он меньше общего.
+    """
     timestamp = current_timestamp
     params = {'from_date': timestamp}
+    headers = {'Authorization': f'OAuth {token}'}
+    if etag:
+        headers['If-None-Match'] = etag
+    import requests
+
+    import http_client
+
     try:
-        answer = requests.get(ENDPOINT, headers=HEADERS, params=params)
+        answer = http_client.get(
+            ENDPOINT, headers=headers, params=params, deadline=deadline
+        )
     except requests.exceptions.RequestException as error:
         raise exceptions.RequestToAPIError(
-            f'Сбой в работе программы: Эндпоинт {ENDPOINT} недоступен.'
-            f'Код ответа API: {answer.status_code}'
+            f'Сбой в работе программы: Эндпоинт {ENDPOINT} недоступен. '
             f'ERROR: {error}'
         )
-    if answer.status_code != HTTPStatus.OK:
-        raise requests.exceptions.HTTPError(
-            f'HTTP ERROR: {answer.status_code}'
-        )
-    return answer.json()
+    return check_answer_status(answer)
 
 
-def check_response(response):
-    """Проверяет ответ API на корректность и возвращает список работ."""
-    if not isinstance(response, dict):
-        raise TypeError('Некорректный тип данных.')
+def check_answer_status(answer):
+    """Проверка HTTP-статуса ответа API."""
+    if answer.status_code not in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+        import requests
 
-    if 'homeworks' not in response or 'current_date' not in response:
-        raise exceptions.KeyNotFoundInResponseError(
-            'Список работ или дата недоступны.'
+        raise requests.exceptions.HTTPError(
+            f'HTTP ERROR: {answer.status_code}', response=answer
         )
+    return answer
 
-    homeworks = response['homeworks']
 
-    if homeworks is None or not isinstance(homeworks, list):
-        raise exceptions.IncorrectTypeError(
-            'Некорректный тип данных в списке домашек.'
-        )
-    return homeworks
+def check_response(response):
+    """Проверяет ответ API на корректность и возвращает список работ."""
+    validate_response(response)
+    return response['homeworks']
 
 
 def parse_status(homework):
-    """Проверка статуса последней работы."""
-    if 'homework_name' not in homework or 'status' not in homework:
-        raise KeyError(
-            'Отсутствует имя или статус в домашней работе.'
-        )
-
+    """Проверка статуса последней работы: словаря или records.Homework."""
+    validate_homework(homework)
     homework_name = homework['homework_name']
-    homework_status = homework['status']
+    verdict = HOMEWORK_VERDICTS[homework['status']]
+    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
-    if homework_status not in HOMEWORK_VERDICTS:
-        raise exceptions.IncorrectStatusError(
-            f'Неизвестный статус: {homework_status}'
-        )
 
-    verdict = HOMEWORK_VERDICTS[homework_status]
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+def reload_settings():
+    """Повторное чтение .env для настроек из RELOADABLE.
+
+    Возвращает имена изменившихся настроек.
+    """
+    global HEADERS
+    load_dotenv(override=True)
+    settings = globals()
+    changed = []
+    for name in RELOADABLE:
+        raw = os.getenv(name)
+        if raw is None:
+            continue
+        current = settings[name]
+        value = raw if current is None else type(current)(raw)
+        if value != current:
+            settings[name] = value
+            changed.append(name)
+    HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+    return changed
 
 
 def check_tokens():
     """Проверка доступности переменных окружения."""
     env_var = [PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID]
+    if TENANTS_FILE:
+        env_var = [TELEGRAM_TOKEN]
 
     for token in env_var:
         if (len(str(token)) == 0) or (token is None):
@@ -115,42 +271,131 @@ def main():
 
     logger.debug('Токен найден, продолжаем.')
 
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    last_err_msg = ''
-
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            logger.debug('API Я.Практикум доступен.')
-            homeworks = check_response(response)
-            logger.debug('Список домашек доступен.')
-            if len(homeworks) != 0:
-                message = parse_status(homeworks[0])
-                logger.debug('Статус домашней работы изменился.')
-                send_message(bot, message)
-                logger.info('Сообщение успешно отправлено.')
-            else:
-                logger.debug('Статус последней работы не изменился.')
-        except exceptions.MainFunctionError as error:
-            message = f'Сбой в работе программы: {error}'
-            logger.error(error)
-            if message != last_err_msg:
-                send_message(bot, message)
-                logger.info('Сообщение с ошибкой отправлено.')
-                last_err_msg = message
-        finally:
-            current_timestamp = response['current_date']
-            logger.debug(f'Ожидаем {RETRY_TIME} секунд.')
-            time.sleep(RETRY_TIME)
+    import startup
+
+    startup.log_report(startup.preload(), STARTUP_BUDGET, STARTED)
+
+    import asyncio
+
+    import telegram
+    from telegram.utils.request import Request
+
+    import commands
+    import delivery
+    import engine
+    import http_client
+    import profiler
+    import reloader
+    import retry
+    import sinks
+    import storage
+    import tracing
+
+    bot = telegram.Bot(
+        token=TELEGRAM_TOKEN,
+        request=Request(con_pool_size=TELEGRAM_WORKERS + 1),
+    )
+    tracing.configure(TRACE_FILE, TRACE_RATIO)
+    http_client.configure(
+        pool_size=HTTP_POOL_SIZE,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        deadline=HTTP_DEADLINE,
+    )
+    tenants = engine.load_tenants(TENANTS_FILE)
+    logger.info(f'Загружено учётных записей: {len(tenants)}.')
+    store = storage.create_store(STATE_BACKEND, STATE_DB)
+    queue = delivery.DeliveryQueue(
+        bot,
+        workers=TELEGRAM_WORKERS,
+        global_rate=TELEGRAM_GLOBAL_RATE,
+        chat_rate=TELEGRAM_CHAT_RATE,
+        maxsize=DELIVERY_QUEUE_SIZE,
+    )
+    polling = engine.PollingEngine(
+        bot, tenants, max_in_flight=MAX_IN_FLIGHT, store=store,
+        delivery=queue, digest_window=DIGEST_WINDOW, digest_size=DIGEST_SIZE,
+        retry_policy=retry.RetryPolicy(
+            base=API_RETRY_BASE, cap=API_RETRY_CAP, budget=API_RETRY_BUDGET,
+            hedge=API_HEDGE,
+        ),
+        queue_size=PIPELINE_QUEUE_SIZE,
+    )
+    polling.drain_timeout = SHUTDOWN_TIMEOUT
+    extra_sinks = sinks.build(
+        send=polling.send,
+        telegram_chat_id=SINK_TELEGRAM_CHAT_ID,
+        webhook_url=WEBHOOK_URL,
+        smtp_host=SMTP_HOST,
+        smtp_port=SMTP_PORT,
+        smtp_sender=SMTP_FROM,
+        smtp_recipients=SMTP_TO,
+        audit_file=AUDIT_FILE,
+        timeout=SINK_TIMEOUT,
+    )
+    if extra_sinks:
+        polling.sinks = sinks.FanOut(extra_sinks)
+        logger.info(
+            f'Дополнительные каналы: '
+            f'{", ".join(sink.name for sink in extra_sinks)}.'
+        )
+    polling.add_background(reloader.Reloader(polling).run)
+    polling.profiler = profiler.Profiler(
+        PROFILE_DIR, PROFILE_SOCKET, PROFILE_POLLS, PROFILE_SECONDS
+    )
+    polling.add_background(polling.profiler.run)
+    if METRICS_PORT:
+        import metrics
+
+        metrics.TENANTS.set_function(polling.tenant_states)
+        metrics.DELIVERY_QUEUE_DEPTH.set_function(lambda: queue.depth)
+        metrics.CIRCUIT_STATE.set_function(lambda: {
+            circuit.name: circuit.value
+            for circuit in (polling.api_breaker, queue.breaker)
+        })
+        metrics.start_server(METRICS_PORT, METRICS_HOST)
+    if RECORD_FILE:
+        import recorder
+
+        polling.recorder = recorder.TrafficRecorder(RECORD_FILE)
+    active = None
+    if SHARD_DB:
+        import sharding
+
+        coordinator = sharding.ShardCoordinator(
+            sharding.LeaseStore(SHARD_DB), polling,
+            worker_id=WORKER_ID,
+            lease_ttl=LEASE_TTL,
+            interval=REBALANCE_INTERVAL,
+        )
+        polling.add_background(coordinator.run)
+        active = coordinator.is_leader
+    if TELEGRAM_COMMANDS:
+        polling.add_background(
+            commands.CommandListener(bot, polling, active=active).run
+        )
+    try:
+        asyncio.run(polling.run())
+    finally:
+        if polling.recorder is not None:
+            polling.recorder.close()
+        store.close()
+        http_client.close()
+        tracing.close()
 
 
 if __name__ == '__main__':
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    import logs
 
-    main()
+    logger = logging.getLogger(__name__)
+    listener = logs.setup(
+        level=LOG_LEVEL,
+        fmt=LOG_FORMAT,
+        stream=sys.stdout,
+        burst=LOG_SAMPLE_BURST,
+        period=LOG_SAMPLE_PERIOD,
+    )
+    try:
+        main()
+    finally:
+        listener.stop()
@@ -0,0 +1,308 @@
+import heapq
+import itertools
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import metrics
+
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+DEADLINE = 30
+POOL_SIZE = 10
+CHUNK_SIZE = 64 * 1024
+
+_local = threading.local()
+_session = None
+_settings = {
+    'timeout': (CONNECT_TIMEOUT, READ_TIMEOUT),
+    'deadline': DEADLINE,
+}
+
+
+class RequestTiming:
+    """Длительность этапов одного запроса в секундах."""
+
+    __slots__ = ('url', 'connect', 'tls', 'wait', 'transfer', 'total')
+
+    def __init__(self, url):
+        self.url = url
+        self.connect = None
+        self.tls = None
+        self.wait = None
+        self.transfer = None
+        self.total = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _current_timing():
+    return getattr(_local, 'timing', None)
+
+
+class _Deadline:
+    """Общий лимит времени одного запроса.
+
+    Таймаут чтения действует на каждое чтение из сокета отдельно,
+    поэтому медленно отдающий данные сервер может растянуть запрос
+    сколь угодно. По истечении лимита сторожевой поток закрывает
+    сокет соединения, и чтение в потоке запроса сразу завершается.
+    Соединение, возвращённое в пул, уже не принадлежит запросу
+    и не закрывается: его может взять следующий запрос.
+    """
+
+    def __init__(self, timeout):
+        self.at = time.monotonic() + timeout
+        self.expired = False
+        self.finished = False
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def watch(self, connection):
+        """Соединение, на котором выполняется запрос."""
+        with self._lock:
+            self._connection = connection
+            if self.expired:
+                self._abort()
+
+    def release(self, connection):
+        """Соединение возвращено в пул."""
+        with self._lock:
+            if self._connection is connection:
+                self._connection = None
+
+    def finish(self):
+        with self._lock:
+            self.finished = True
+            self._connection = None
+
+    def expire(self):
+        with self._lock:
+            if self.finished:
+                return
+            self.expired = True
+            self._abort()
+
+    def _abort(self):
+        sock = getattr(self._connection, 'sock', None)
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _Watchdog:
+    """Один сторожевой поток на все запросы процесса.
+
+    Лимиты хранятся в куче по времени истечения; завершённые
+    запросы снимаются с вершины кучи без ожидания.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap = []
+        self._order = itertools.count()
+        self._thread = None
+
+    def add(self, deadline):
+        with self._condition:
+            heapq.heappush(
+                self._heap, (deadline.at, next(self._order), deadline)
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='http-watchdog', daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def _next(self):
+        with self._condition:
+            while True:
+                while self._heap and self._heap[0][2].finished:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay <= 0:
+                    return heapq.heappop(self._heap)[2]
+                self._condition.wait(delay)
+
+    def _run(self):
+        while True:
+            self._next().expire()
+
+
+_watchdog = _Watchdog()
+
+
+class _TimedConnectionMixin:
+    """Замер установки TCP-соединения (с DNS) и TLS-рукопожатия."""
+
+    def _new_conn(self):
+        started = time.monotonic()
+        try:
+            return super()._new_conn()
+        finally:
+            timing = _current_timing()
+            if timing is not None:
+                timing.connect = time.monotonic() - started
+
+    def connect(self):
+        started = time.monotonic()
+        super().connect()
+        timing = _current_timing()
+        if timing is not None and isinstance(self, HTTPSConnection):
+            timing.tls = time.monotonic() - started - (timing.connect or 0)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _WatchedPoolMixin:
+    """Передача соединения лимиту времени текущего запроса.
+
+    Возвращённое в пул соединение снимается с наблюдения до того,
+    как его сможет взять другой запрос.
+    """
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        deadline = getattr(_local, 'deadline', None)
+        if deadline is not None:
+            deadline.watch(conn)
+        return conn
+
+    def _put_conn(self, conn):
+        deadline = getattr(_local, 'deadline', None)
+        if deadline is not None:
+            deadline.release(conn)
+        super()._put_conn(conn)
+
+
+class _TimedHTTPConnectionPool(_WatchedPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(_WatchedPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Адаптер с пулом keep-alive соединений и замером этапов запроса."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+def configure(pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT,
+              read_timeout=READ_TIMEOUT, deadline=DEADLINE):
+    """Создание общей сессии с пулом соединений."""
+    global _session
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    _settings['timeout'] = (connect_timeout, read_timeout)
+    _settings['deadline'] = deadline
+    if _session is not None:
+        _session.close()
+    _session = session
+    return session
+
+
+def close():
+    """Закрытие общей сессии."""
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
+
+
+def get(url, deadline=None, **kwargs):
+    """GET-запрос через общую сессию с таймаутами и общим лимитом времени.
+
+    deadline сокращает общий лимит времени для этого запроса.
+    """
+    kwargs.setdefault('timeout', _settings['timeout'])
+    limit = _settings['deadline']
+    if deadline is not None:
+        limit = min(limit, deadline)
+    if limit <= 0:
+        raise _deadline_exceeded(0)
+    connect_timeout, read_timeout = kwargs['timeout']
+    kwargs['timeout'] = (connect_timeout, min(read_timeout, limit))
+    if _session is None:
+        return requests.get(url, **kwargs)
+    return _session_get(url, limit, **kwargs)
+
+
+def _session_get(url, limit, **kwargs):
+    timing = RequestTiming(url)
+    _local.timing = timing
+    started = time.monotonic()
+    deadline = _Deadline(limit)
+    _local.deadline = deadline
+    _watchdog.add(deadline)
+    try:
+        response = _session.get(url, stream=True, **kwargs)
+        timing.wait = response.elapsed.total_seconds() - (
+            (timing.connect or 0) + (timing.tls or 0)
+        )
+        body_started = time.monotonic()
+        try:
+            content = b''.join(response.iter_content(CHUNK_SIZE))
+            if deadline.expired:
+                raise _deadline_exceeded(limit)
+        except BaseException:
+            response.close()
+            raise
+        response._content = content
+        response._content_consumed = True
+        timing.transfer = time.monotonic() - body_started
+        return response
+    except requests.exceptions.Timeout:
+        raise
+    except Exception as error:
+        if deadline.expired:
+            raise _deadline_exceeded(limit) from error
+        raise
+    finally:
+        deadline.finish()
+        _local.deadline = None
+        timing.total = time.monotonic() - started
+        _local.timing = None
+        _observe(timing)
+
+
+def _deadline_exceeded(limit):
+    return requests.exceptions.Timeout(
+        f'Превышен общий лимит времени запроса: {limit:g} с.'
+    )
+
+
+def _observe(timing):
+    for stage, histogram in metrics.HTTP_STAGES.items():
+        value = getattr(timing, stage)
+        if value is not None:
+            histogram.observe(value)
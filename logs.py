@@ -0,0 +1,173 @@
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+QUEUE_SIZE = 10000
+SAMPLE_BURST = 10
+SAMPLE_PERIOD = 60
+MAX_SAMPLE_KEYS = 10000
+
+RECORD_ATTRS = frozenset(vars(logging.LogRecord(
+    '', logging.INFO, '', 0, '', (), None
+))) | {'message', 'asctime'}
+
+
+def fields(tenant=None, stage=None, duration=None, **values):
+    """Поля записи лога для extra=.
+
+    tenant — учётная запись или её идентификатор, duration — секунды.
+    """
+    if tenant is not None:
+        values['tenant'] = getattr(tenant, 'tenant_id', tenant)
+    if stage is not None:
+        values['stage'] = stage
+    if duration is not None:
+        values['duration'] = round(duration, 6)
+    return values
+
+
+def record_fields(record):
+    """Поля, переданные в extra=, без стандартных атрибутов записи."""
+    return {
+        key: value for key, value in vars(record).items()
+        if key not in RECORD_ATTRS
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON."""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Прежний текстовый формат с идентификатором учётной записи."""
+
+    def formatMessage(self, record):  # noqa: N802
+        tenant = getattr(record, 'tenant', None)
+        if tenant is not None:
+            record = copy.copy(record)
+            record.message = f'[{tenant}] {record.message}'
+        return super().formatMessage(record)
+
+
+class SamplingFilter(logging.Filter):
+    """Ограничение частоты однотипных записей ниже уровня level.
+
+    Записи с одинаковыми логгером и шаблоном сообщения пропускаются
+    не чаще burst раз за period секунд; число пропущенных попадает
+    в поле suppressed следующей пропущенной записи. Записи уровня
+    level и выше не ограничиваются.
+    """
+
+    def __init__(self, burst=SAMPLE_BURST, period=SAMPLE_PERIOD,
+                 level=logging.INFO, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.level = level
+        self._clock = clock
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.level or not self.burst:
+            return True
+        key = (record.name, record.msg)
+        now = self._clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                if window is None and len(self._windows) >= MAX_SAMPLE_KEYS:
+                    self._windows.clear()
+                suppressed = window[2] if window else 0
+                window = [now, 0, 0]
+                self._windows[key] = window
+                if suppressed:
+                    record.suppressed = suppressed
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+        return True
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Постановка записей в ограниченную очередь без ожидания.
+
+    При переполнении отбрасываются только записи ниже WARNING;
+    предупреждения и ошибки ждут места в очереди.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """Копия записи для очереди с трассировкой в exc_text.
+
+        Стандартный prepare() вклеивает трассировку в текст сообщения,
+        и форматтер слушателя не может вывести её отдельным полем.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.WARNING:
+                self.dropped += 1
+                return
+            self.queue.put(record)
+
+
+def setup(level=logging.INFO, fmt='json', stream=None,
+          queue_size=QUEUE_SIZE, burst=SAMPLE_BURST, period=SAMPLE_PERIOD):
+    """Настройка корневого логгера, возвращает запущенный QueueListener.
+
+    Отладочные записи, в том числе сторонних библиотек, выводятся
+    только при явном level='DEBUG'. Запись в поток выполняется
+    в отдельном потоке слушателя; перед выходом из программы его
+    нужно остановить методом stop().
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter(TEXT_FORMAT))
+    queue_handler = LogQueueHandler(queue.Queue(queue_size))
+    queue_handler.addFilter(SamplingFilter(burst, period))
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, handler, respect_handler_level=True
+    )
+    listener.start()
+    return listener
@@ -0,0 +1,247 @@
+import bisect
+import contextlib
+import logging
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10, 30,
+)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{str(value)}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextlib.contextmanager
+    def time(self):
+        """Замер длительности блока."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    @property
+    def count(self):
+        return sum(self._counts)
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{bound}"}}', cumulative
+        cumulative += counts[-1]
+        yield f'{self.name}_bucket{{le="+Inf"}}', cumulative
+        yield f'{self.name}_sum', total
+        yield f'{self.name}_count', cumulative
+
+
+class Counter:
+    """Счётчик с необязательными метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name + _labels(self.labelnames, labels), value
+
+
+class Gauge:
+    """Значение, вычисляемое функцией в момент запроса метрик.
+
+    Функция возвращает число или словарь {метка: число}.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelname=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelname = labelname
+        self._function = None
+
+    def set_function(self, function):
+        self._function = function
+
+    def samples(self):
+        if self._function is None:
+            return
+        value = self._function()
+        if self.labelname is None:
+            yield self.name, value
+            return
+        for label, item in sorted(value.items()):
+            yield self.name + _labels((self.labelname,), (label,)), item
+
+
+class Registry:
+    """Набор метрик для вывода в формате Prometheus."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, value in metric.samples():
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+GET_API_ANSWER = REGISTRY.register(Histogram(
+    'homework_get_api_answer_seconds', 'Длительность запроса к API.'
+))
+CHECK_RESPONSE = REGISTRY.register(Histogram(
+    'homework_check_response_seconds', 'Длительность проверки ответа API.'
+))
+PARSE_STATUS = REGISTRY.register(Histogram(
+    'homework_parse_status_seconds', 'Длительность разбора статуса работы.'
+))
+SEND_MESSAGE = REGISTRY.register(Histogram(
+    'homework_send_message_seconds', 'Длительность отправки в Telegram.'
+))
+SCHEDULE_LAG = REGISTRY.register(Histogram(
+    'homework_schedule_lag_seconds',
+    'Отставание начала опроса от запланированного срока.',
+    buckets=LAG_BUCKETS,
+))
+ERRORS = REGISTRY.register(Counter(
+    'homework_errors_total', 'Ошибки по классам исключений.',
+    labelnames=('exception',),
+))
+TENANTS = REGISTRY.register(Gauge(
+    'homework_tenants', 'Учётные записи по состояниям.', labelname='state',
+))
+FINGERPRINT_HITS = REGISTRY.register(Counter(
+    'homework_unchanged_answers_total',
+    'Ответы API, совпавшие с предыдущим.',
+))
+DELIVERY_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'homework_delivery_queue_depth', 'Сообщений в очереди отправки.',
+))
+CIRCUIT_STATE = REGISTRY.register(Gauge(
+    'homework_circuit_state',
+    'Состояние автоматов защиты: 0 — closed, 1 — half-open, 2 — open.',
+    labelname='upstream',
+))
+CIRCUIT_TRANSITIONS = REGISTRY.register(Counter(
+    'homework_circuit_transitions_total',
+    'Переключения автоматов защиты по новому состоянию.',
+    labelnames=('upstream', 'state'),
+))
+API_RETRIES = REGISTRY.register(Counter(
+    'homework_api_retries_total', 'Повторные запросы к API.',
+))
+API_HEDGES = REGISTRY.register(Counter(
+    'homework_api_hedged_requests_total',
+    'Параллельные запросы к API вместо медленного.',
+))
+HTTP_STAGES = {
+    stage: REGISTRY.register(Histogram(
+        f'homework_http_{stage}_seconds', documentation
+    ))
+    for stage, documentation in (
+        ('connect', 'Установка TCP-соединения с API, включая DNS.'),
+        ('tls', 'TLS-рукопожатие с API.'),
+        ('wait', 'Ожидание ответа API после отправки запроса.'),
+        ('transfer', 'Получение тела ответа API.'),
+    )
+}
+SINK_SENT = REGISTRY.register(Counter(
+    'homework_sink_sent_total', 'Уведомления, доставленные по каналам.',
+    labelnames=('sink',),
+))
+SINK_ERRORS = REGISTRY.register(Counter(
+    'homework_sink_errors_total', 'Ошибки доставки по каналам.',
+    labelnames=('sink',),
+))
+
+
+def count_error(error):
+    """Учёт исключения по имени его класса."""
+    ERRORS.inc(type(error).__name__)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):  # noqa: N802
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(port, host='127.0.0.1'):
+    """Запуск HTTP-сервера /metrics в фоновом потоке."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f'Метрики доступны на http://{host}:{port}/metrics')
+    return server
@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+import tracing
+
+QUEUE_SIZE = 64
+
+
+class Job:
+    """Задание, проходящее этапы конвейера.
+
+    finished — этап завершил обработку досрочно, остальные этапы
+    пропускаются; future — результат для того, кто отправил задание.
+    """
+
+    __slots__ = ('span', 'finished', 'future')
+
+    def __init__(self, span=tracing.NOOP):
+        self.span = span
+        self.finished = False
+        self.future = None
+
+
+class Stage:
+    """Этап конвейера: корутина handler(job) и число её обработчиков."""
+
+    __slots__ = ('name', 'handler', 'workers', 'processed', 'busy')
+
+    def __init__(self, name, handler, workers=1):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.processed = 0
+        self.busy = 0.0
+
+
+class Pipeline:
+    """Этапы, соединённые ограниченными очередями.
+
+    Перед каждым этапом — очередь не длиннее queue_size: если
+    последний этап не успевает, очереди заполняются, и предыдущие
+    этапы, а за ними и run(), ждут места вместо накопления заданий
+    в памяти. Ошибка этапа завершает задание и возвращается из run().
+    """
+
+    def __init__(self, stages, queue_size=QUEUE_SIZE):
+        self.stages = [
+            stage if isinstance(stage, Stage) else Stage(*stage)
+            for stage in stages
+        ]
+        self.queue_size = queue_size
+        self._queues = []
+        self._workers = []
+        self._loop = None
+
+    def stage(self, name):
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+    def replace(self, name, handler):
+        """Замена обработчика этапа, например альтернативной реализацией."""
+        self.stage(name).handler = handler
+
+    def start(self):
+        """Запуск обработчиков в текущем event loop, если ещё не запущены."""
+        loop = asyncio.get_event_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queues = [
+            asyncio.Queue(maxsize=self.queue_size) for _ in self.stages
+        ]
+        self._workers = [
+            asyncio.ensure_future(self._work(index))
+            for index, stage in enumerate(self.stages)
+            for _ in range(stage.workers)
+        ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._loop = None
+
+    async def run(self, job):
+        """Обработка задания всеми этапами; ждёт места в первой очереди."""
+        self.start()
+        job.future = self._loop.create_future()
+        await self._queues[0].put((time.perf_counter(), job))
+        return await job.future
+
+    async def process(self, job, until=None):
+        """Последовательная обработка без очередей до этапа until.
+
+        Подходит для замеров отдельного этапа: задания готовятся
+        предыдущими этапами, затем замеряется нужный.
+        """
+        for stage in self.stages:
+            if job.finished or stage.name == until:
+                break
+            with tracing.activate(job.span):
+                await stage.handler(job)
+        return job
+
+    async def _work(self, index):
+        stage = self.stages[index]
+        queue = self._queues[index]
+        last = index == len(self.stages) - 1
+        while True:
+            queued, job = await queue.get()
+            if job.future.done():
+                continue
+            try:
+                await self._handle(stage, job, queued)
+                if job.future.done():
+                    continue
+                if last or job.finished:
+                    job.future.set_result(job)
+                    continue
+                await self._queues[index + 1].put((time.perf_counter(), job))
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+
+    @staticmethod
+    async def _handle(stage, job, queued):
+        started = time.perf_counter()
+        job.span.set(f'{stage.name}.wait', started - queued)
+        try:
+            with tracing.activate(job.span):
+                await stage.handler(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            job.future.set_exception(error)
+        finally:
+            stage.processed += 1
+            stage.busy += time.perf_counter() - started
+
+    def stats(self):
+        """Длина очереди, число обработанных заданий и занятость этапов."""
+        queued = [queue.qsize() for queue in self._queues]
+        return {
+            stage.name: {
+                'queued': size,
+                'processed': stage.processed,
+                'busy': stage.busy,
+            }
+            for stage, size in zip(
+                self.stages, queued or [0] * len(self.stages)
+            )
+        }
@@ -0,0 +1,268 @@
+import asyncio
+import collections
+import cProfile
+import io
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_POLLS = 100
+SAMPLE_SECONDS = 30
+SAMPLE_INTERVAL = 0.005
+STAGES = {
+    'get_api_answer': ('fetch_answer', '_fetch_stage'),
+    'check_response': ('_validate_stage', '_diff_stage'),
+    'parse_status': ('_render_stage',),
+    'send_message': ('deliver', '_deliver_stage', '_deliver'),
+}
+STAGE_BY_FUNCTION = {
+    function: stage
+    for stage, functions in STAGES.items() for function in functions
+}
+
+
+def _stage_summary(times, total):
+    lines = [f'{"этап":16} {"секунд":>10} {"доля":>7}']
+    for stage in STAGES:
+        seconds = times.get(stage, 0)
+        share = seconds / total * 100 if total else 0
+        lines.append(f'{stage:16} {seconds:10.4f} {share:6.1f}%')
+    return '\n'.join(lines)
+
+
+class Sampler:
+    """Периодический снимок стеков всех потоков.
+
+    Стеки копятся в свёрнутом виде («a;b;c» — число снимков),
+    который принимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = collections.Counter()
+        self.stages = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._sample(names.get(ident, str(ident)), frame)
+            self.samples += 1
+            if len(names) != threading.active_count():
+                names = {
+                    thread.ident: thread.name
+                    for thread in threading.enumerate()
+                }
+
+    def _sample(self, thread_name, frame):
+        stack = []
+        stage = None
+        while frame is not None:
+            code = frame.f_code
+            stack.append(
+                f'{os.path.basename(code.co_filename)}:{code.co_name}'
+            )
+            stage = STAGE_BY_FUNCTION.get(code.co_name, stage)
+            frame = frame.f_back
+        stack.append(thread_name)
+        self.stacks[';'.join(reversed(stack))] += 1
+        if stage is not None:
+            self.stages[stage] += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+    def summary(self):
+        times = {
+            stage: count * self.interval
+            for stage, count in self.stages.items()
+        }
+        return _stage_summary(times, sum(times.values()))
+
+
+class Profiler:
+    """Профилирование работающего бота по запросу.
+
+    cProfile включается на следующие N опросов и видит код
+    event loop; выборочный режим снимает стеки всех потоков,
+    включая запросы к API и Telegram в пуле потоков.
+    Запуск и остановка вызываются из event loop и из потока
+    таймера, поэтому mode меняется только под _lock.
+    """
+
+    def __init__(self, directory='.', socket_path=None,
+                 polls=PROFILE_POLLS, seconds=SAMPLE_SECONDS):
+        self.directory = directory
+        self.socket_path = socket_path
+        self.polls = polls
+        self.seconds = seconds
+        self.mode = None
+        self.last_path = None
+        self._profile = None
+        self._polls_left = 0
+        self._sampler = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def status(self):
+        if self.mode == 'cprofile':
+            return f'cprofile: осталось опросов {self._polls_left}'
+        if self.mode == 'sample':
+            return f'sample: снимков {self._sampler.samples}'
+        return f'выключено; последний отчёт: {self.last_path or "—"}'
+
+    def _path(self, suffix):
+        os.makedirs(self.directory, exist_ok=True)
+        name = time.strftime('profile-%Y%m%d-%H%M%S') + suffix
+        return os.path.join(self.directory, name)
+
+    def start_cprofile(self, polls=None):
+        """cProfile на следующие polls опросов."""
+        polls = polls or self.polls
+        with self._lock:
+            if self.mode is not None:
+                return f'Уже идёт профилирование: {self.status()}'
+            self._profile = cProfile.Profile()
+            self._polls_left = polls
+            self.mode = 'cprofile'
+            self._profile.enable()
+        logger.info(f'Профилирование cProfile на {polls} опросов.')
+        return self.status()
+
+    def poll_done(self):
+        """Отметка об окончании опроса для режима cProfile."""
+        with self._lock:
+            if self.mode != 'cprofile':
+                return
+            self._polls_left -= 1
+            if self._polls_left > 0:
+                return
+        self.stop()
+
+    def start_sampling(self, seconds=None, interval=SAMPLE_INTERVAL):
+        """Снимки стеков в течение seconds секунд."""
+        seconds = seconds or self.seconds
+        with self._lock:
+            if self.mode is not None:
+                return f'Уже идёт профилирование: {self.status()}'
+            self._sampler = Sampler(interval)
+            self._sampler.start()
+            self.mode = 'sample'
+            self._timer = threading.Timer(seconds, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+        logger.info(f'Выборочное профилирование на {seconds} с.')
+        return self.status()
+
+    def stop(self):
+        """Остановка и запись отчёта; возвращает путь к нему."""
+        with self._lock:
+            mode, self.mode = self.mode, None
+            if mode == 'cprofile':
+                self._profile.disable()
+                path = self._path('.pstats')
+                self._profile.dump_stats(path)
+                summary = self._cprofile_summary()
+            elif mode == 'sample':
+                self._timer.cancel()
+                self._sampler.stop()
+                path = self._path('.folded')
+                self._sampler.write(path)
+                summary = self._sampler.summary()
+            else:
+                return 'Профилирование не запущено.'
+            self.last_path = path
+            with open(path + '.txt', 'w', encoding='utf-8') as file:
+                file.write(summary + '\n')
+        logger.info(f'Отчёт профилирования: {path}\n{summary}')
+        return path
+
+    def _cprofile_summary(self):
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        times = collections.Counter()
+        for (_, _, function), row in stats.stats.items():
+            stage = STAGE_BY_FUNCTION.get(function)
+            if stage is not None:
+                times[stage] = max(times[stage], row[3])
+        stats.sort_stats('cumulative').print_stats(30)
+        return (
+            _stage_summary(times, stats.total_tt) + '\n\n' + stream.getvalue()
+        )
+
+    def command(self, line):
+        """Выполнение команды управления: cprofile [N], sample [секунд],
+        stop, status."""
+        parts = line.split()
+        if not parts:
+            return self.status()
+        name, args = parts[0].lower(), parts[1:]
+        try:
+            if name == 'cprofile':
+                return self.start_cprofile(*map(int, args))
+            if name == 'sample':
+                return self.start_sampling(*map(float, args))
+        except (TypeError, ValueError):
+            return f'Некорректные параметры: {line}'
+        if name == 'stop':
+            return self.stop()
+        if name == 'status':
+            return self.status()
+        return f'Неизвестная команда: {name}'
+
+    async def _handle(self, reader, writer):
+        line = (await reader.readline()).decode('utf-8', 'replace')
+        writer.write((self.command(line) + '\n').encode('utf-8'))
+        await writer.drain()
+        writer.close()
+
+    def _install(self):
+        loop = asyncio.get_event_loop()
+        handlers = (
+            ('SIGUSR1', self.start_cprofile),
+            ('SIGUSR2', self.start_sampling),
+        )
+        for name, handler in handlers:
+            signum = getattr(signal, name, None)
+            if signum is None:
+                continue
+            try:
+                loop.add_signal_handler(signum, handler)
+            except (NotImplementedError, RuntimeError):
+                logger.debug(f'Сигнал {name} не поддерживается.')
+
+    async def run(self):
+        """Ожидание сигналов и команд через сокет управления."""
+        self._install()
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            server = await asyncio.start_unix_server(
+                self._handle, self.socket_path
+            )
+            logger.info(f'Сокет профилирования: {self.socket_path}')
+            async with server:
+                await server.serve_forever()
+        else:
+            await asyncio.Event().wait()
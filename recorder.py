@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import math
+import threading
+import time
+
+import breaker
+import engine
+import exceptions
+import homework
+
+logger = logging.getLogger(__name__)
+
+FLUSH_EVERY = 100
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class TrafficRecorder:
+    """Запись сырых ответов API в файл NDJSON, только дописыванием.
+
+    Файл с расширением .gz пишется сжатым.
+    """
+
+    def __init__(self, path, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self.records = 0
+        self._file = _open(path, 'a')
+        self._lock = threading.Lock()
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self.records += 1
+            if self.records % self.flush_every == 0:
+                self._file.flush()
+
+    def record(self, tenant_id, from_date, elapsed, answer):
+        """Запись ответа API с HTTP-статусом и длительностью запроса."""
+        self._write({
+            'ts': time.time(),
+            'tenant': tenant_id,
+            'from_date': from_date,
+            'status': answer.status_code,
+            'elapsed': round(elapsed, 6),
+            'etag': answer.headers.get('ETag'),
+            'body': answer.content.decode('utf-8', 'replace'),
+        })
+
+    def record_error(self, tenant_id, from_date, elapsed, error):
+        """Запись неудачного запроса; ответ с ошибкой HTTP пишется целиком."""
+        response = getattr(error, 'response', None)
+        if response is not None:
+            self.record(tenant_id, from_date, elapsed, response)
+            return
+        self._write({
+            'ts': time.time(),
+            'tenant': tenant_id,
+            'from_date': from_date,
+            'status': None,
+            'elapsed': round(elapsed, 6),
+            'error': str(error),
+        })
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_records(path):
+    """Записи из файла в порядке записи."""
+    with _open(path, 'r') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ReplayedAnswer:
+    """Записанный ответ API с интерфейсом ответа requests."""
+
+    def __init__(self, record):
+        self.status_code = record['status']
+        self.headers = {}
+        if record.get('etag'):
+            self.headers['ETag'] = record['etag']
+        self.content = record.get('body', '').encode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class DryRunBot:
+    """Бот, который не отправляет сообщения, а только считает их."""
+
+    def __init__(self, echo=False):
+        self.echo = echo
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+        if self.echo:
+            print(f'[{chat_id}] {text}')
+
+
+class Replayer:
+    """Проигрывание записанного трафика через движок опроса."""
+
+    def __init__(self, path, speed=0, bot=None):
+        self.path = path
+        self.speed = speed
+        self.bot = bot or DryRunBot()
+        self._pending = {}
+
+    def _fetch(self, current_timestamp, token, etag=None, deadline=None):
+        record = self._pending.pop(token)
+        if record['status'] is None:
+            raise exceptions.RequestToAPIError(record['error'])
+        return homework.check_answer_status(ReplayedAnswer(record))
+
+    async def run(self):
+        """Проигрывание с ускорением speed; 0 — без пауз.
+
+        Автомат защиты API не размыкается: в записи есть только
+        выполненные запросы, и каждый из них должен дойти до движка.
+        """
+        polling = engine.PollingEngine(
+            self.bot, [],
+            api_breaker=breaker.CircuitBreaker(
+                'replay', failure_threshold=math.inf
+            ),
+        )
+        polling.fetch = self._fetch
+        tenants = {}
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        first_ts = None
+        polls = 0
+        for record in read_records(self.path):
+            if first_ts is None:
+                first_ts = record['ts']
+            if self.speed:
+                due = started + (record['ts'] - first_ts) / self.speed
+                await asyncio.sleep(max(0, due - loop.time()))
+            tenant = tenants.get(record['tenant'])
+            if tenant is None:
+                tenant = engine.Tenant(
+                    record['tenant'], record['tenant'], record['tenant'],
+                    timestamp=record['from_date'],
+                )
+                tenants[record['tenant']] = tenant
+            self._pending[tenant.practicum_token] = record
+            await polling.poll_once(tenant)
+            polls += 1
+        return {
+            'polls': polls,
+            'tenants': len(tenants),
+            'messages': len(getattr(self.bot, 'sent', ())),
+            'unchanged': polling.fingerprints.hits,
+            'seconds': loop.time() - started,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Проигрывание записанных ответов API Я.Практикум.'
+    )
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='ускорение относительно записи, 0 — без пауз')
+    parser.add_argument('--echo', action='store_true',
+                        help='печатать сообщения вместо подсчёта')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    replayer = Replayer(args.path, args.speed, DryRunBot(echo=args.echo))
+    print(json.dumps(asyncio.run(replayer.run()), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import sys
+import tracemalloc
+
+HOMEWORK_BUDGET = 128
+TENANT_SHARE = 0.75
+
+
+def intern(value):
+    """Общий экземпляр строки для повторяющихся значений."""
+    return sys.intern(value) if type(value) is str else value
+
+
+class Homework:
+    """Работа из ответа API без словаря на каждый экземпляр.
+
+    Статус, имя работы и урока интернируются: у тысяч учётных записей
+    это одни и те же строки. Доступ по ключу, как у словаря из ответа,
+    поэтому запись проходит те же проверки и parse_status.
+    """
+
+    __slots__ = (
+        'id', 'homework_name', 'status', 'lesson_name', 'reviewer_comment',
+        'date_updated',
+    )
+
+    def __init__(self, homework_id=None, homework_name=None, status=None,
+                 lesson_name=None, reviewer_comment=None, date_updated=None):
+        self.id = homework_id
+        self.homework_name = intern(homework_name)
+        self.status = intern(status)
+        self.lesson_name = intern(lesson_name)
+        self.reviewer_comment = reviewer_comment
+        self.date_updated = date_updated
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get('id'),
+            data.get('homework_name'),
+            data.get('status'),
+            data.get('lesson_name'),
+            data.get('reviewer_comment'),
+            data.get('date_updated'),
+        )
+
+    def __contains__(self, key):
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self else default
+
+    def __eq__(self, other):
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def as_dict(self):
+        return {
+            key: getattr(self, key)
+            for key in self.__slots__ if getattr(self, key) is not None
+        }
+
+    def __repr__(self):
+        return f'Homework({self.as_dict()!r})'
+
+
+class PlainRecord:
+    """Обычный объект с __dict__: база для сравнения в замерах памяти."""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def as_plain(record):
+    """Та же запись на объектах с __dict__ вместо __slots__.
+
+    Объём такой записи зависит от версии интерпретатора так же,
+    как объём исходной, поэтому бюджет задаётся долей от неё.
+    """
+    slots = getattr(type(record), '__slots__', None)
+    if slots is None:
+        return record
+    return PlainRecord(**{
+        name: as_plain(getattr(record, name)) for name in slots
+    })
+
+
+def measure(factory, count=1000):
+    """Средний объём памяти одной записи factory(i), в байтах."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [factory(index) for index in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        if started:
+            tracemalloc.stop()
+    overhead = sys.getsizeof(kept)
+    return (after - before - overhead) / len(kept)
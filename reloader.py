@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import signal
+
+import engine
+import homework
+
+logger = logging.getLogger(__name__)
+
+
+class Reloader:
+    """Перечитывание настроек по SIGHUP и плавная остановка по SIGTERM.
+
+    Новые настройки опроса и список учётных записей применяются
+    к работающему движку; остальные учётные записи продолжают
+    опрашиваться без перерыва.
+    """
+
+    def __init__(self, polling):
+        self.polling = polling
+        self.reloads = 0
+        self._requested = None
+
+    def request(self):
+        """Запрос перечитывания из обработчика сигнала."""
+        if self._requested is not None:
+            self._requested.set()
+
+    def _install(self):
+        loop = asyncio.get_event_loop()
+        handlers = (
+            ('SIGHUP', self.request),
+            ('SIGTERM', self.polling.stop),
+        )
+        for name, handler in handlers:
+            signum = getattr(signal, name, None)
+            if signum is None:
+                continue
+            try:
+                loop.add_signal_handler(signum, handler)
+            except (NotImplementedError, RuntimeError):
+                logger.debug(f'Сигнал {name} не поддерживается.')
+
+    def apply_settings(self):
+        """Интервалы опроса из перечитанных настроек."""
+        scheduler = self.polling.scheduler
+        scheduler.interval = homework.RETRY_TIME
+        scheduler.reviewing_interval = homework.REVIEWING_RETRY_TIME
+        scheduler.idle_interval = homework.IDLE_RETRY_TIME
+        scheduler.idle_after = homework.IDLE_AFTER
+        scheduler.min_interval = homework.MIN_RETRY_TIME
+        scheduler.max_interval = homework.MAX_RETRY_TIME
+        self.polling.retry_time = homework.RETRY_TIME
+        policy = self.polling.retry_policy
+        if policy is not None:
+            policy.base = homework.API_RETRY_BASE
+            policy.cap = homework.API_RETRY_CAP
+            policy.budget = homework.API_RETRY_BUDGET
+
+    async def reload(self):
+        """Перечитывание .env и файла учётных записей."""
+        loop = asyncio.get_event_loop()
+        changed = await loop.run_in_executor(None, homework.reload_settings)
+        self.apply_settings()
+        tenants = await loop.run_in_executor(
+            None, engine.load_tenants, homework.TENANTS_FILE
+        )
+        added, removed, updated = await self.polling.update_tenants(tenants)
+        self.reloads += 1
+        logger.info(
+            f'Настройки перечитаны: изменено {", ".join(changed) or "—"}; '
+            f'учётных записей добавлено {added}, удалено {removed}, '
+            f'изменено {updated}.'
+        )
+
+    async def run(self):
+        """Ожидание сигналов до остановки движка."""
+        self._requested = asyncio.Event()
+        self._install()
+        while True:
+            await self._requested.wait()
+            self._requested.clear()
+            try:
+                await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.error(f'Ошибка перечитывания настроек: {error}')
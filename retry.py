@@ -0,0 +1,198 @@
+import asyncio
+import collections
+import contextlib
+import email.utils
+import logging
+import random
+import time
+from http import HTTPStatus
+
+import breaker
+import logs
+import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE = 0.5
+RETRY_CAP = 10
+RETRY_BUDGET = 30
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_LIMIT = 4
+LATENCY_WINDOW = 200
+
+
+def decorrelated_jitter(previous, base=RETRY_BASE, cap=RETRY_CAP,
+                        uniform=random.uniform):
+    """Пауза перед повтором: случайная от base до утроенной прошлой."""
+    return min(cap, uniform(base, max(base, previous * 3)))
+
+
+def retry_after(error):
+    """Пауза из заголовка Retry-After ответа 429 в секундах, иначе 0."""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) != (
+        HTTPStatus.TOO_MANY_REQUESTS
+    ):
+        return 0
+    value = response.headers.get('Retry-After')
+    if not value:
+        return 0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0
+    return max(0.0, moment.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Повторы идемпотентного запроса в пределах срока одного опроса.
+
+    Паузы между попытками растут с decorrelated jitter, но не короче
+    Retry-After ответа 429, и не выводят опрос за budget секунд
+    от начала. Попытка вызывается как attempt(timeout) и сама
+    не длится дольше timeout — остатка этого срока. При hedge, если
+    попытка дольше quantile наблюдаемых длительностей, параллельно
+    уходит вторая, но не больше max_hedges одновременно;
+    берётся первый успешный ответ.
+
+    Если передан автомат защиты circuit, каждая попытка и каждый
+    второй запрос проходят через него: исход попытки записывается
+    в автомат, а пока он разомкнут, повторы прекращаются
+    с CircuitOpenError и второй запрос не отправляется.
+    """
+
+    def __init__(self, base=RETRY_BASE, cap=RETRY_CAP, budget=RETRY_BUDGET,
+                 hedge=False, quantile=HEDGE_QUANTILE,
+                 min_samples=HEDGE_MIN_SAMPLES, max_hedges=HEDGE_LIMIT,
+                 uniform=random.uniform, clock=time.monotonic):
+        self.base = base
+        self.cap = cap
+        self.budget = budget
+        self.hedge = hedge
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.hedging = 0
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._uniform = uniform
+        self._clock = clock
+
+    def hedge_delay(self):
+        """Длительность, после которой отправляется второй запрос."""
+        if not self.hedge or len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.quantile))
+        return ordered[index]
+
+    async def call(self, attempt, retryable, span=None, stopping=None,
+                   circuit=None):
+        """Вызов attempt() с повторами, пока retryable(ошибка) истинно.
+
+        Если задано событие stopping, его установка прерывает паузу
+        перед повтором: последняя ошибка возвращается сразу.
+        retryable(ошибка) же отличает для circuit отказ сервиса.
+        """
+        deadline = self._clock() + self.budget
+        delay = self.base
+        attempts = 0
+        while True:
+            attempts += 1
+            if span is not None:
+                span.set('retry.attempts', attempts)
+            try:
+                return await self._attempt(
+                    attempt, deadline - self._clock(), retryable, circuit
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                if not retryable(error):
+                    raise
+                if circuit is not None and circuit.retry_in():
+                    raise circuit.reject() from error
+                delay = decorrelated_jitter(
+                    delay, self.base, self.cap, self._uniform
+                )
+                pause = max(delay, retry_after(error))
+                if self._clock() + pause >= deadline:
+                    raise
+                metrics.API_RETRIES.inc()
+                logger.debug('Повтор запроса к API.', extra=logs.fields(
+                    stage='retry', delay=round(pause, 3),
+                    error=type(error).__name__,
+                ))
+                if await self._sleep(pause, stopping):
+                    raise
+
+    @staticmethod
+    async def _sleep(delay, stopping):
+        """Пауза; истинно, если её прервала установка stopping."""
+        if stopping is None:
+            await asyncio.sleep(delay)
+            return False
+        try:
+            await asyncio.wait_for(stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    @contextlib.contextmanager
+    def _latency(self):
+        """Запись длительности успешной попытки."""
+        started = self._clock()
+        yield
+        self.latencies.append(self._clock() - started)
+
+    async def _timed(self, attempt, timeout, retryable, circuit):
+        if circuit is None:
+            with self._latency():
+                return await attempt(timeout)
+        with circuit.guard(retryable), self._latency():
+            return await attempt(timeout)
+
+    async def _attempt(self, attempt, timeout, retryable, circuit):
+        delay = self.hedge_delay()
+        first = asyncio.ensure_future(
+            self._timed(attempt, timeout, retryable, circuit)
+        )
+        if delay is None:
+            return await first
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or self.hedging >= self.max_hedges or (
+                circuit is not None and circuit.state != breaker.CLOSED
+            ):
+                return await self._first_success(pending)
+            metrics.API_HEDGES.inc()
+            self.hedging += 1
+            try:
+                pending.add(asyncio.ensure_future(
+                    self._timed(attempt, timeout - delay, retryable, circuit)
+                ))
+                return await self._first_success(pending)
+            finally:
+                self.hedging -= 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    async def _first_success(pending):
+        error = None
+        while pending:
+            done, rest = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            pending.intersection_update(rest)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
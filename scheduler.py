@@ -0,0 +1,53 @@
+import random
+import time
+
+REVIEWING_STATUS = 'reviewing'
+
+
+class PollScheduler:
+    """Интервал опроса по состоянию учётной записи.
+
+    Во время проверки работы опрос учащается, при долгом простое —
+    замедляется, после ошибок интервал растёт экспоненциально
+    со случайным разбросом. Итог всегда ограничен min/max.
+    """
+
+    def __init__(self, interval=600, reviewing_interval=120,
+                 idle_interval=1800, idle_after=3 * 24 * 3600,
+                 min_interval=60, max_interval=3600, jitter=0.2,
+                 rng=random.random):
+        self.interval = interval
+        self.reviewing_interval = reviewing_interval
+        self.idle_interval = idle_interval
+        self.idle_after = idle_after
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self._rng = rng
+
+    def _clamp(self, value):
+        return min(self.max_interval, max(self.min_interval, value))
+
+    def interval_for(self, tenant, now=None):
+        """Интервал до следующего опроса, в секундах."""
+        if tenant.errors:
+            backoff = self.interval * 2 ** min(tenant.errors, 16)
+            spread = 1 - self.jitter + 2 * self.jitter * self._rng()
+            return self._clamp(min(backoff, self.max_interval) * spread)
+        if tenant.status == REVIEWING_STATUS:
+            return self._clamp(self.reviewing_interval)
+        if now is None:
+            now = time.time()
+        if now - tenant.changed_at >= self.idle_after:
+            return self._clamp(self.idle_interval)
+        return self._clamp(self.interval)
+
+    def next_deadline(self, tenant, deadline, now):
+        """Следующий срок опроса по монотонным часам без накопления сдвига.
+
+        Срок отсчитывается от предыдущего срока, а не от окончания опроса.
+        Если опрос затянулся дольше интервала, пропущенные сроки
+        не наверстываются.
+        """
+        deadline += self.interval_for(tenant)
+        return max(deadline, now)
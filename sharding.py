@@ -0,0 +1,240 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+VIRTUAL_NODES = 64
+COMMANDS_KEY = '__commands__'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS shard_worker (
+    worker_id TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tenant_lease (
+    tenant_id TEXT PRIMARY KEY,
+    worker_id TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+'''
+
+HEARTBEAT = 'INSERT OR REPLACE INTO shard_worker VALUES (?, ?)'
+CLAIM = (
+    'INSERT INTO tenant_lease (tenant_id, worker_id, expires) '
+    'VALUES (?, ?, ?) ON CONFLICT (tenant_id) DO UPDATE SET '
+    'worker_id = excluded.worker_id, expires = excluded.expires '
+    'WHERE tenant_lease.worker_id = excluded.worker_id '
+    'OR tenant_lease.expires <= ?'
+)
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def _hash(key):
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Консистентное хеширование ключей по участникам.
+
+    У каждого участника replicas точек на кольце, поэтому при
+    появлении или уходе участника переезжает около 1/N ключей.
+    """
+
+    def __init__(self, members, replicas=VIRTUAL_NODES):
+        points = sorted(
+            (_hash(f'{member}#{index}'), member)
+            for member in members for index in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._members = [member for _, member in points]
+
+    def owner(self, key):
+        """Участник, которому принадлежит ключ, или None."""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._members[index]
+
+
+class LeaseStore:
+    """Аренда учётных записей процессами в общей базе SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+
+    def heartbeat(self, worker_id, now):
+        with self._lock:
+            self._connection.execute(HEARTBEAT, (worker_id, now))
+
+    def live_workers(self, now, ttl):
+        """Процессы, отметившиеся за последние ttl секунд."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT worker_id FROM shard_worker WHERE heartbeat > ?',
+                (now - ttl,),
+            ).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def renew(self, worker_id, tenant_ids, now, ttl):
+        """Продление своей аренды и захват свободной или просроченной.
+
+        Возвращает учётные записи, арендованные процессом.
+        """
+        tenant_ids = set(tenant_ids)
+        rows = [
+            (tenant_id, worker_id, now + ttl, now) for tenant_id in tenant_ids
+        ]
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._connection.executemany(CLAIM, rows)
+                held = self._connection.execute(
+                    'SELECT tenant_id FROM tenant_lease '
+                    'WHERE worker_id = ? AND expires > ?',
+                    (worker_id, now),
+                ).fetchall()
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+        return {row[0] for row in held} & tenant_ids
+
+    def release(self, worker_id, tenant_ids):
+        with self._lock:
+            self._connection.executemany(
+                'DELETE FROM tenant_lease WHERE tenant_id = ? '
+                'AND worker_id = ?',
+                [(tenant_id, worker_id) for tenant_id in tenant_ids],
+            )
+
+    def leave(self, worker_id):
+        """Освобождение всей аренды процесса при остановке."""
+        with self._lock:
+            self._connection.execute(
+                'DELETE FROM tenant_lease WHERE worker_id = ?', (worker_id,)
+            )
+            self._connection.execute(
+                'DELETE FROM shard_worker WHERE worker_id = ?', (worker_id,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ShardCoordinator:
+    """Распределение учётных записей между процессами бота.
+
+    Каждые interval секунд процесс отмечается в общей базе, строит
+    кольцо из живых процессов и арендует свою часть учётных записей
+    на lease_ttl секунд. Чужую учётную запись процесс начинает
+    опрашивать, только когда прежний владелец отпустил её или его
+    аренда истекла, поэтому одна учётная запись не опрашивается
+    двумя процессами сразу. Учётная запись COMMANDS_KEY определяет
+    процесс, который принимает команды бота.
+    """
+
+    def __init__(self, leases, polling, worker_id=None, lease_ttl=60,
+                 interval=10, clock=time.time):
+        if lease_ttl <= 2 * interval:
+            raise ValueError('Аренда должна быть больше двух интервалов.')
+        self.leases = leases
+        self.polling = polling
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_ttl = lease_ttl
+        self.interval = interval
+        self.held = set()
+        self.expires = 0
+        self.leader = False
+        self._clock = clock
+        polling.owned = set()
+        polling.lease_check = self.holds
+
+    def holds(self, tenant_id):
+        """Аренда учётной записи действует ещё хотя бы один интервал."""
+        return (
+            tenant_id in self.held
+            and self._clock() < self.expires - self.interval
+        )
+
+    def is_leader(self):
+        """Процесс принимает команды бота."""
+        return self.leader
+
+    def _plan(self, now):
+        self.leases.heartbeat(self.worker_id, now)
+        workers = self.leases.live_workers(now, self.lease_ttl)
+        ring = HashRing(workers)
+        wanted = {
+            tenant.tenant_id for tenant in self.polling.tenants
+            if ring.owner(tenant.tenant_id) == self.worker_id
+        }
+        return wanted, ring.owner(COMMANDS_KEY) == self.worker_id, workers
+
+    async def rebalance(self):
+        """Один шаг: отдать лишние учётные записи и взять свои."""
+        loop = asyncio.get_event_loop()
+        now = self._clock()
+        wanted, leader, workers = await loop.run_in_executor(
+            None, self._plan, now
+        )
+        dropped = self.held - wanted
+        if dropped:
+            await self.polling.release(dropped)
+            await loop.run_in_executor(
+                None, self.leases.release, self.worker_id, dropped
+            )
+        granted = await loop.run_in_executor(
+            None, self.leases.renew,
+            self.worker_id, wanted, now, self.lease_ttl,
+        )
+        lost = self.held - dropped - granted
+        if lost:
+            logger.warning(f'Истекла аренда учётных записей: {len(lost)}.')
+            await self.polling.release(lost, flush=False)
+        acquired = granted - self.held
+        self.held = granted
+        self.expires = now + self.lease_ttl
+        self.leader = leader
+        if acquired:
+            await self.polling.acquire(acquired)
+        if dropped or acquired or lost:
+            logger.info(
+                f'Процесс {self.worker_id} из {len(workers)}: '
+                f'учётных записей {len(granted)}, передано {len(dropped)}, '
+                f'получено {len(acquired)}.'
+            )
+
+    async def run(self):
+        """Периодическая перебалансировка до остановки процесса."""
+        try:
+            while True:
+                try:
+                    await self.rebalance()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as error:
+                    logger.error(f'Ошибка распределения учётных записей: '
+                                 f'{error}')
+                await asyncio.sleep(self.interval)
+        finally:
+            if self.polling.store is not None:
+                self.polling.store.flush()
+            self.leases.leave(self.worker_id)
@@ -0,0 +1,260 @@
+import asyncio
+import collections
+import json
+import logging
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+import exceptions
+import logs
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SINK_TIMEOUT = 10
+MAX_PENDING = 100
+EMAIL_SUBJECT = 'Изменился статус проверки работы'
+
+
+class Event:
+    """Изменение статуса работы для отправки по каналам."""
+
+    __slots__ = (
+        'tenant_id', 'chat_id', 'homework_name', 'status', 'text', 'time',
+    )
+
+    def __init__(self, tenant_id, chat_id, homework_name, status, text,
+                 timestamp=None):
+        self.tenant_id = tenant_id
+        self.chat_id = chat_id
+        self.homework_name = homework_name
+        self.status = status
+        self.text = text
+        self.time = time.time() if timestamp is None else timestamp
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Sink:
+    """Канал доставки уведомлений.
+
+    Наследники реализуют deliver(event) — блокирующую отправку,
+    которая при сбое поднимает SinkError. У каждого канала свой
+    пул потоков, поэтому медленный канал не занимает чужие потоки.
+    """
+
+    name = 'sink'
+
+    def __init__(self, timeout=SINK_TIMEOUT, workers=1):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f'sink-{self.name}'
+        )
+
+    def error(self, message):
+        return exceptions.SinkError(
+            f'Ошибка отправки в {self.name}: {message}', self.name
+        )
+
+    async def send(self, event):
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self._executor, self.deliver, event)
+
+    def deliver(self, event):
+        raise NotImplementedError
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class TelegramSink(Sink):
+    """Копия уведомлений в Telegram, например в общий чат кураторов.
+
+    Сообщения уходят через send(chat_id, text) движка опроса, то есть
+    через общую очередь отправки с её лимитами частоты, автоматом
+    защиты Telegram и сохранением неотправленного при остановке.
+    """
+
+    name = 'telegram'
+
+    def __init__(self, send, chat_id=None, **kwargs):
+        super().__init__(**kwargs)
+        self.send_message = send
+        self.chat_id = chat_id
+
+    async def send(self, event):
+        try:
+            await self.send_message(self.chat_id or event.chat_id, event.text)
+        except exceptions.SendMessageError as error:
+            raise self.error(error)
+
+
+class WebhookSink(Sink):
+    """POST события в формате JSON на указанный адрес."""
+
+    name = 'webhook'
+
+    def __init__(self, url, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+
+    def deliver(self, event):
+        import requests
+
+        try:
+            answer = requests.post(
+                self.url, json=event.as_dict(), timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as error:
+            raise self.error(error)
+        if not 200 <= answer.status_code < 300:
+            raise self.error(f'HTTP {answer.status_code}')
+
+
+class SmtpSink(Sink):
+    """Письмо через SMTP-сервер, например локальный relay."""
+
+    name = 'smtp'
+
+    def __init__(self, host, sender, recipients, port=25, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = list(recipients)
+
+    def deliver(self, event):
+        message = EmailMessage()
+        message['Subject'] = EMAIL_SUBJECT
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message.set_content(event.text)
+        try:
+            with smtplib.SMTP(
+                self.host, self.port, timeout=self.timeout
+            ) as smtp:
+                smtp.send_message(message)
+        except (smtplib.SMTPException, OSError) as error:
+            raise self.error(error)
+
+
+class FileSink(Sink):
+    """Журнал событий в файле, по объекту JSON в строке."""
+
+    name = 'file'
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def deliver(self, event):
+        try:
+            self._file.write(
+                json.dumps(event.as_dict(), ensure_ascii=False) + '\n'
+            )
+            self._file.flush()
+        except (OSError, ValueError) as error:
+            raise self.error(error)
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class FanOut:
+    """Параллельная отправка события во все каналы.
+
+    dispatch() не ждёт доставки: у каждого канала свой лимит
+    времени timeout и не больше max_pending неотправленных событий,
+    поэтому медленный канал не задерживает ни другие каналы, ни опрос.
+    Ошибки каждого канала логируются и считаются отдельно.
+    """
+
+    def __init__(self, sinks, max_pending=MAX_PENDING):
+        self.sinks = list(sinks)
+        self.max_pending = max_pending
+        self.dropped = collections.Counter()
+        self._pending = collections.defaultdict(set)
+
+    def dispatch(self, event):
+        for sink in self.sinks:
+            pending = self._pending[sink.name]
+            if len(pending) >= self.max_pending:
+                self._failed(sink, sink.error(
+                    f'не отправлено {self.max_pending} событий, '
+                    f'новое пропущено'
+                ), event)
+                self.dropped[sink.name] += 1
+                continue
+            task = asyncio.ensure_future(self._send(sink, event))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    async def deliver(self, event):
+        """Отправка во все каналы с ожиданием; ошибки по каналам."""
+        results = await asyncio.gather(*(
+            self._send(sink, event) for sink in self.sinks
+        ))
+        return {
+            sink.name: error
+            for sink, error in zip(self.sinks, results) if error is not None
+        }
+
+    async def _send(self, sink, event):
+        try:
+            await asyncio.wait_for(sink.send(event), sink.timeout)
+        except asyncio.TimeoutError:
+            error = sink.error(f'превышен лимит времени {sink.timeout} с')
+        except exceptions.SinkError as sink_error:
+            error = sink_error
+        except asyncio.CancelledError:
+            raise
+        except Exception as unexpected:
+            error = sink.error(unexpected)
+        else:
+            metrics.SINK_SENT.inc(sink.name)
+            return None
+        self._failed(sink, error, event)
+        return error
+
+    @staticmethod
+    def _failed(sink, error, event):
+        metrics.SINK_ERRORS.inc(sink.name)
+        logger.error(str(error), extra=logs.fields(
+            event.tenant_id, stage='sink', sink=sink.name,
+            error=type(error).__name__,
+        ))
+
+    async def close(self, timeout=None):
+        """Ожидание неотправленных событий и закрытие каналов."""
+        pending = set().union(*self._pending.values())
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        for sink in self.sinks:
+            sink.close()
+
+
+def build(send=None, telegram_chat_id=None, webhook_url=None, smtp_host=None,
+          smtp_port=25, smtp_sender=None, smtp_recipients=(),
+          audit_file=None, timeout=SINK_TIMEOUT):
+    """Каналы по настройкам; пустые настройки канал не включают.
+
+    send — отправка в Telegram через движок опроса, PollingEngine.send.
+    """
+    sinks = []
+    if telegram_chat_id and send is not None:
+        sinks.append(TelegramSink(send, telegram_chat_id, timeout=timeout))
+    if webhook_url:
+        sinks.append(WebhookSink(webhook_url, timeout=timeout))
+    if smtp_host and smtp_recipients:
+        sinks.append(SmtpSink(
+            smtp_host, smtp_sender, smtp_recipients, port=smtp_port,
+            timeout=timeout,
+        ))
+    if audit_file:
+        sinks.append(FileSink(audit_file, timeout=timeout))
+    return sinks
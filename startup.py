@@ -0,0 +1,66 @@
+import importlib
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+HEAVY_MODULES = (
+    'requests',
+    'telegram',
+    'telegram.utils.request',
+    'http_client',
+    'storage',
+    'metrics',
+    'engine',
+    'delivery',
+    'commands',
+)
+
+
+def preload(modules=HEAVY_MODULES):
+    """Импорт модулей по очереди с замером времени каждого.
+
+    Время вложенных импортов относится к модулю, который
+    импортировал их первым; уже загруженные модули стоят ноль.
+    """
+    report = []
+    for name in modules:
+        cached = name in sys.modules
+        started = time.perf_counter()
+        importlib.import_module(name)
+        report.append((name, time.perf_counter() - started, cached))
+    return report
+
+
+def log_report(report, budget=None, started=None):
+    """Вывод отчёта о времени запуска в лог.
+
+    Возвращает False, если общее время превысило бюджет.
+    """
+    total = sum(seconds for _, seconds, _ in report)
+    for name, seconds, cached in report:
+        note = ' (уже загружен)' if cached else ''
+        logger.debug(f'Импорт {name}: {seconds * 1000:.1f} мс{note}')
+    if started is not None:
+        total = time.perf_counter() - started
+    logger.info(f'Время запуска: {total * 1000:.1f} мс.')
+    if budget and total > budget:
+        logger.warning(
+            f'Время запуска {total * 1000:.0f} мс превышает бюджет '
+            f'{budget * 1000:.0f} мс.'
+        )
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    started = time.perf_counter()
+    report = preload(('homework',) + HEAVY_MODULES)
+    total = time.perf_counter() - started
+    for name, seconds, _ in sorted(report, key=lambda item: -item[1]):
+        print(f'{name:25} {seconds * 1000:8.1f} мс')
+    print(f'{"итого":25} {total * 1000:8.1f} мс')
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    if budget and total > budget:
+        sys.exit(1)
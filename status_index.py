@@ -0,0 +1,103 @@
+import collections
+
+import records
+
+
+def homework_key(homework):
+    """Ключ работы в индексе: id, а при его отсутствии — имя."""
+    if 'id' in homework:
+        return str(homework['id'])
+    return str(homework.get('homework_name'))
+
+
+class StatusIndex:
+    """Последний известный статус каждой работы учётной записи.
+
+    Статусы и имена работ интернируются: после загрузки состояния
+    из хранилища одинаковые строки разных учётных записей не дублируются.
+    """
+
+    __slots__ = ('_statuses', '_names', '_counts')
+
+    def __init__(self, statuses=None):
+        self._statuses = {}
+        self._names = {}
+        for key, value in (statuses or {}).items():
+            if isinstance(value, str):
+                self._statuses[key] = records.intern(value)
+            else:
+                status, name = value
+                self._statuses[key] = records.intern(status)
+                self._names[key] = records.intern(name)
+        self._counts = collections.Counter(self._statuses.values())
+
+    def __len__(self):
+        return len(self._statuses)
+
+    def __contains__(self, key):
+        return key in self._statuses
+
+    def get(self, key, default=None):
+        return self._statuses.get(key, default)
+
+    def count(self, status):
+        """Число работ с указанным статусом."""
+        return self._counts[status]
+
+    def changes(self, homeworks):
+        """Работы, статус которых отличается от известного.
+
+        Работы перебираются один раз, в порядке ответа API (от новых
+        к старым), поэтому подходит и итератор. Повтор работы в ответе
+        не даёт второго изменения. Результат — от старых к новым.
+        """
+        seen = set()
+        changed = []
+        for homework in homeworks:
+            key = homework_key(homework)
+            if key in seen:
+                continue
+            seen.add(key)
+            if self._statuses.get(key) != homework.get('status'):
+                changed.append(homework)
+        changed.reverse()
+        return changed
+
+    def commit(self, homework):
+        """Запоминание статуса работы, возвращает прежний статус."""
+        key = homework_key(homework)
+        self._names[key] = records.intern(homework.get('homework_name'))
+        return self._set(key, records.intern(homework['status']))
+
+    def rollback(self, homework, previous):
+        """Возврат прежнего статуса, если уведомление не доставлено.
+
+        Статус, записанный позже commit(), не трогается.
+        """
+        key = homework_key(homework)
+        if self._statuses.get(key) != homework['status']:
+            return
+        if previous is None:
+            self._counts[self._statuses.pop(key)] -= 1
+            self._names.pop(key, None)
+            return
+        self._set(key, records.intern(previous))
+
+    def _set(self, key, status):
+        previous = self._statuses.get(key)
+        if previous is not None:
+            self._counts[previous] -= 1
+        self._statuses[key] = status
+        self._counts[status] += 1
+        return previous
+
+    def items(self):
+        """Пары (имя работы, статус) в порядке первого появления."""
+        for key, status in self._statuses.items():
+            yield self._names.get(key) or key, status
+
+    def as_dict(self):
+        return {
+            key: [status, self._names.get(key)]
+            for key, status in self._statuses.items()
+        }
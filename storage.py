@@ -0,0 +1,216 @@
+import json
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+FIELDS = (
+    'timestamp', 'status', 'changed_at', 'errors', 'last_err_msg',
+    'statuses',
+)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tenant_state (
+    tenant_id TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    status TEXT,
+    changed_at REAL NOT NULL,
+    errors INTEGER NOT NULL DEFAULT 0,
+    last_err_msg TEXT NOT NULL DEFAULT '',
+    statuses TEXT NOT NULL DEFAULT '{}'
+)
+'''
+
+OUTBOX_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL,
+    text TEXT NOT NULL
+)
+'''
+
+LOAD_CHUNK = 500
+
+UPSERT = (
+    'INSERT OR REPLACE INTO tenant_state '
+    '(tenant_id, timestamp, status, changed_at, errors, last_err_msg, '
+    'statuses) VALUES (?, ?, ?, ?, ?, ?, ?)'
+)
+
+
+class StateStore:
+    """Хранилище состояния учётных записей.
+
+    Изменения копятся в памяти методом save() и записываются
+    одной пачкой в flush().
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def load_all(self):
+        """Состояние всех учётных записей: {tenant_id: {поле: значение}}."""
+        raise NotImplementedError
+
+    def load(self, tenant_ids):
+        """Состояние указанных учётных записей."""
+        raise NotImplementedError
+
+    def save(self, tenant):
+        """Отложенное сохранение состояния учётной записи."""
+        state = tenant.snapshot()
+        with self._lock:
+            self._pending[tenant.tenant_id] = state
+
+    def flush(self):
+        """Запись накопленных изменений, возвращает число записей."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            self._write(pending)
+        return len(pending)
+
+    def save_outbox(self, messages):
+        """Сохранение неотправленных сообщений (чат, текст)."""
+        raise NotImplementedError
+
+    def load_outbox(self):
+        """Неотправленные сообщения; после чтения хранилище их забывает."""
+        raise NotImplementedError
+
+    def discard(self, tenant_ids):
+        """Отказ от несохранённых изменений учётных записей."""
+        with self._lock:
+            for tenant_id in tenant_ids:
+                self._pending.pop(tenant_id, None)
+
+    def _write(self, states):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+
+class MemoryStateStore(StateStore):
+    """Хранилище в памяти процесса, для тестов и разовых запусков."""
+
+    def __init__(self, path=None):
+        super().__init__()
+        self._states = {}
+        self._outbox = []
+
+    def save_outbox(self, messages):
+        self._outbox.extend(messages)
+
+    def load_outbox(self):
+        messages = self._outbox[:]
+        del self._outbox[:len(messages)]
+        return messages
+
+    def load_all(self):
+        return {key: dict(state) for key, state in self._states.items()}
+
+    def load(self, tenant_ids):
+        return {
+            key: dict(self._states[key])
+            for key in tenant_ids if key in self._states
+        }
+
+    def _write(self, states):
+        self._states.update(states)
+
+
+class SQLiteStateStore(StateStore):
+    """Хранилище в SQLite в режиме WAL."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._db_lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(SCHEMA)
+        self._connection.execute(OUTBOX_SCHEMA)
+        self._connection.commit()
+
+    def load_all(self):
+        return self._select('')
+
+    def load(self, tenant_ids):
+        tenant_ids = list(tenant_ids)
+        states = {}
+        for start in range(0, len(tenant_ids), LOAD_CHUNK):
+            chunk = tenant_ids[start:start + LOAD_CHUNK]
+            states.update(self._select(
+                ' WHERE tenant_id IN (' + ', '.join('?' * len(chunk)) + ')',
+                chunk,
+            ))
+        return states
+
+    def _select(self, where, params=()):
+        with self._db_lock:
+            rows = self._connection.execute(
+                'SELECT tenant_id, ' + ', '.join(FIELDS)
+                + ' FROM tenant_state' + where,
+                params,
+            ).fetchall()
+        states = {}
+        for row in rows:
+            state = dict(zip(FIELDS, row[1:]))
+            state['statuses'] = json.loads(state['statuses'])
+            states[row[0]] = state
+        return states
+
+    def _write(self, states):
+        rows = [
+            (
+                tenant_id, state['timestamp'], state['status'],
+                state['changed_at'], state['errors'], state['last_err_msg'],
+                json.dumps(state['statuses'], ensure_ascii=False),
+            )
+            for tenant_id, state in states.items()
+        ]
+        with self._db_lock, self._connection:
+            self._connection.executemany(UPSERT, rows)
+
+    def save_outbox(self, messages):
+        with self._db_lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO outbox (chat_id, text) VALUES (?, ?)',
+                [(str(chat_id), text) for chat_id, text in messages],
+            )
+
+    def load_outbox(self):
+        with self._db_lock, self._connection:
+            rows = self._connection.execute(
+                'SELECT id, chat_id, text FROM outbox ORDER BY id'
+            ).fetchall()
+            if rows:
+                self._connection.execute(
+                    'DELETE FROM outbox WHERE id <= ?', (rows[-1][0],)
+                )
+        return [(chat_id, text) for _, chat_id, text in rows]
+
+    def close(self):
+        super().close()
+        with self._db_lock:
+            self._connection.close()
+
+
+BACKENDS = {
+    'sqlite': SQLiteStateStore,
+    'memory': MemoryStateStore,
+}
+
+
+def create_store(backend='sqlite', path='state.sqlite3'):
+    """Создание хранилища по имени бэкенда."""
+    try:
+        store_class = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f'Неизвестное хранилище состояния: {backend}')
+    logger.debug(f'Хранилище состояния: {backend} {path or ""}'.strip())
+    return store_class(path)
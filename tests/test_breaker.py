@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+import breaker
+import engine
+import exceptions
+import homework
+import utils
+
+
+def make_breaker(clock):
+    return breaker.CircuitBreaker(
+        'api', failure_threshold=2, reset_timeout=10, clock=clock
+    )
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self):
+        circuit = make_breaker(utils.FakeClock())
+        circuit.before_call()
+        circuit.failure()
+        assert circuit.state == breaker.CLOSED
+        circuit.before_call()
+        circuit.failure()
+        assert circuit.state == breaker.OPEN
+        with pytest.raises(exceptions.CircuitOpenError):
+            circuit.before_call()
+        assert circuit.rejected == 1
+
+    def test_single_probe_when_half_open(self):
+        clock = utils.FakeClock()
+        circuit = make_breaker(clock)
+        for _ in range(2):
+            circuit.failure()
+        clock.now = 10
+        circuit.before_call()
+        assert circuit.state == breaker.HALF_OPEN
+        with pytest.raises(exceptions.CircuitOpenError):
+            circuit.before_call()
+        circuit.success()
+        assert circuit.state == breaker.CLOSED
+        circuit.before_call()
+
+    def test_failed_probe_reopens(self):
+        clock = utils.FakeClock()
+        circuit = make_breaker(clock)
+        for _ in range(2):
+            circuit.failure()
+        clock.now = 10
+        circuit.before_call()
+        circuit.failure()
+        assert circuit.state == breaker.OPEN
+        assert circuit.retry_in() == 10
+
+    def test_guard_ignores_other_errors(self):
+        circuit = make_breaker(utils.FakeClock())
+        for _ in range(3):
+            with pytest.raises(KeyError):
+                with circuit.guard(lambda error: False):
+                    raise KeyError('token')
+        assert circuit.state == breaker.CLOSED
+
+
+class TestEngineBreaker:
+
+    def test_outage_fails_fast(self, monkeypatch):
+        calls = []
+
+        def fake_fetch(timestamp, token, etag=None):
+            calls.append(token)
+            raise exceptions.RequestToAPIError('недоступен')
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        tenants = [engine.Tenant(i, f'token{i}', i) for i in range(10)]
+        polling = engine.PollingEngine(
+            None, tenants, max_in_flight=1,
+            api_breaker=breaker.CircuitBreaker('practicum', 3, 60),
+        )
+        polling.send = lambda chat_id, message: asyncio.sleep(0)
+        asyncio.run(polling.poll_all())
+
+        assert len(calls) == 3, (
+            'После размыкания автомата запросы к API не выполняются'
+        )
+        assert polling.api_breaker.state == breaker.OPEN
+        assert sum(tenant.errors for tenant in tenants) == 3, (
+            'Отказ без запроса не увеличивает паузу между опросами'
+        )
@@ -0,0 +1,85 @@
+import asyncio
+
+import commands
+import digest
+import engine
+import utils
+
+
+class FakeMessage:
+
+    def __init__(self, chat_id, text):
+        self.chat_id = chat_id
+        self.text = text
+
+
+class FakeUpdate:
+
+    def __init__(self, update_id, chat_id, text):
+        self.update_id = update_id
+        self.message = FakeMessage(chat_id, text)
+
+
+def make_polling(bot):
+    tenant = engine.Tenant('t', 'token', 42)
+    tenant.statuses.commit(
+        {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+    )
+    tenant.history.append((0, 'hw1', 'approved'))
+    return engine.PollingEngine(bot, [tenant])
+
+
+class TestCommands:
+
+    def test_status_from_cache(self, monkeypatch):
+        import homework
+
+        def fail_request(*args, **kwargs):
+            assert False, 'Команда не должна обращаться к API Я.Практикум'
+
+        monkeypatch.setattr(homework, 'fetch_answer', fail_request)
+        bot = utils.FakeBot([])
+        listener = commands.CommandListener(bot, make_polling(bot))
+        reply = listener.reply_for(42, '/status')
+        assert 'hw1' in reply
+        assert homework.HOMEWORK_VERDICTS['approved'] in reply
+        assert 'hw1' in listener.reply_for(42, '/history@homework_bot')
+
+    def test_unknown_chat_and_text(self):
+        bot = utils.FakeBot([])
+        listener = commands.CommandListener(bot, make_polling(bot))
+        assert listener.reply_for(7, '/status') == commands.UNKNOWN_CHAT
+        assert listener.reply_for(42, 'привет') is None
+
+    def test_handle_sends_reply(self):
+        bot = utils.FakeBot([])
+        polling = make_polling(bot)
+        listener = commands.CommandListener(bot, polling)
+
+        async def scenario():
+            polling._setup()
+            await listener.handle(FakeUpdate(1, 42, '/status'))
+
+        asyncio.run(scenario())
+        assert bot.sent and bot.sent[0][0] == 42
+
+    def test_long_reply_split(self):
+        bot = utils.FakeBot([])
+        polling = make_polling(bot)
+        for index in range(300):
+            polling.tenants[0].statuses.commit({
+                'id': index + 2, 'homework_name': f'homework_{index}',
+                'status': 'reviewing',
+            })
+        listener = commands.CommandListener(bot, polling)
+
+        async def scenario():
+            polling._setup()
+            await listener.handle(FakeUpdate(1, 42, '/status'))
+
+        asyncio.run(scenario())
+        assert len(bot.sent) > 1
+        assert all(
+            len(text) <= digest.MESSAGE_LIMIT for _, text in bot.sent
+        ), 'Длинный ответ делится на сообщения по лимиту Telegram'
+        assert sum(text.count('homework_') for _, text in bot.sent) == 300
@@ -0,0 +1,45 @@
+import dedup
+import exceptions
+import utils
+
+
+def api_error(code):
+    return exceptions.RequestToAPIError(f'HTTP ERROR: {code}, попытка {code}')
+
+
+class TestErrorDeduplicator:
+
+    def test_alternating_errors_notify_once(self):
+        cache = dedup.ErrorDeduplicator()
+        first, second = api_error(500), KeyError('homeworks')
+        notified = [
+            cache.report(1, 't', error, str(error))
+            for error in (first, second, api_error(502), second, first)
+        ]
+        assert notified == [True, True, False, False, False], (
+            'Ошибки, отличающиеся только числами, считаются одной'
+        )
+
+    def test_shared_outage_summary(self):
+        clock = utils.FakeClock()
+        cache = dedup.ErrorDeduplicator(clock=clock)
+        for tenant_id in ('a', 'b', 'c'):
+            cache.report(1, tenant_id, api_error(500), 'Сбой')
+        clock.now = 6 * 3600
+        assert cache.resolve('a') == []
+        assert cache.resolve('b') == []
+        (chat_id, summary), = cache.resolve('c')
+        assert chat_id == '1'
+        assert 'Повторилась 3 раз за 6 ч' in summary
+        assert len(cache) == 0
+
+    def test_memory_is_bounded(self):
+        clock = utils.FakeClock()
+        cache = dedup.ErrorDeduplicator(ttl=10, maxsize=5, clock=clock)
+        for chat_id in range(100):
+            cache.report(chat_id, chat_id, api_error(500), 'Сбой')
+        assert len(cache) == 5
+        clock.now = 10
+        cache.report('new', 'new', api_error(500), 'Сбой')
+        assert len(cache) == 1, 'Устаревшие записи удаляются'
+        assert cache.report(0, 0, api_error(500), 'Сбой')
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+
+import telegram
+
+import breaker
+import delivery
+import engine
+import homework
+import metrics
+import utils
+
+
+class FloodingBot:
+
+    def __init__(self, floods=1):
+        self.floods = floods
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.floods:
+            self.floods -= 1
+            raise telegram.error.RetryAfter(0.01)
+        self.sent.append((chat_id, text))
+
+
+class FailingBot:
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise telegram.error.NetworkError('connection reset')
+        self.sent.append((chat_id, text))
+
+
+class RejectingBot(utils.FakeBot):
+
+    def __init__(self, rejects=1):
+        super().__init__()
+        self.rejects = rejects
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.rejects:
+            self.rejects -= 1
+            raise telegram.error.BadRequest('chat not found')
+        super().send_message(chat_id, text)
+
+
+class BlockedBot(utils.FakeBot):
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.released.wait(5)
+        super().send_message(chat_id, text)
+
+
+class TestTokenBucket:
+
+    def test_rate_limit(self):
+        clock = utils.FakeClock()
+        bucket = delivery.TokenBucket(2, capacity=2, clock=clock)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0.5, (
+            'После исчерпания запаса токен появляется через 1/rate секунд'
+        )
+        clock.now = 10
+        assert bucket.reserve() == 0
+
+    def test_pause(self):
+        clock = utils.FakeClock()
+        bucket = delivery.TokenBucket(1, capacity=1, clock=clock)
+        bucket.pause(5)
+        assert bucket.reserve() == 6
+
+
+class TestDeliveryQueue:
+
+    def test_delivery_with_retry_after(self):
+        bot = FloodingBot()
+        queue = delivery.DeliveryQueue(bot, workers=2, chat_rate=100)
+
+        async def scenario():
+            queue.start()
+            await queue.enqueue(1, 'a')
+            await queue.enqueue(2, 'b')
+            await queue.stop(timeout=5)
+
+        asyncio.run(scenario())
+        assert sorted(bot.sent) == [(1, 'a'), (2, 'b')]
+        stats = queue.stats()
+        assert stats['delivered'] == 2
+        assert stats['retried'] == 1, (
+            'Ответ 429 с retry_after должен приводить к повторной отправке'
+        )
+        assert stats['depth'] == 0
+
+    def test_messages_wait_while_breaker_open(self):
+        bot = FailingBot(failures=2)
+        circuit = breaker.CircuitBreaker(
+            'telegram-test', failure_threshold=2, reset_timeout=0.05
+        )
+        queue = delivery.DeliveryQueue(
+            bot, workers=1, chat_rate=100, telegram_breaker=circuit
+        )
+
+        async def scenario():
+            queue.start()
+            await queue.enqueue(1, 'a')
+            await queue.stop(timeout=5)
+
+        asyncio.run(scenario())
+        assert metrics.CIRCUIT_TRANSITIONS.value('telegram-test', 'open') == 1
+        assert bot.sent == [(1, 'a')], (
+            'Сообщение отправляется после восстановления Telegram'
+        )
+        assert circuit.state == breaker.CLOSED
+
+    def test_enqueue_waits_for_room(self):
+        bot = BlockedBot()
+        queue = delivery.DeliveryQueue(
+            bot, workers=1, chat_rate=100, maxsize=1
+        )
+
+        async def scenario():
+            queue.start()
+            await queue.enqueue(1, 'a')
+            await queue.enqueue(1, 'b')
+            waiting = asyncio.ensure_future(queue.enqueue(1, 'c'))
+            done, _ = await asyncio.wait([waiting], timeout=0.05)
+            bot.released.set()
+            await waiting
+            await queue.stop(timeout=5)
+            return done
+
+        assert not asyncio.run(scenario()), (
+            'При заполненной очереди enqueue() ждёт места в ней'
+        )
+        assert [text for _, text in bot.sent] == ['a', 'b', 'c'], (
+            'Сообщения не теряются при переполнении очереди'
+        )
+
+
+class TestEngineDelivery:
+
+    def test_rejected_message_resent_next_poll(self, monkeypatch):
+        requested = []
+
+        def fetch_answer(timestamp, *args):
+            requested.append(timestamp)
+            return utils.FakeAnswer()
+
+        monkeypatch.setattr(homework, 'fetch_answer', fetch_answer)
+        bot = RejectingBot()
+        queue = delivery.DeliveryQueue(bot, workers=1, chat_rate=100)
+        polling = engine.PollingEngine(
+            bot, [engine.Tenant('t', 'token', 1, timestamp=0)],
+            delivery=queue,
+        )
+        tenant = polling.tenants[0]
+
+        async def scenario():
+            queue.start()
+            await polling.poll_all()
+            await queue._queue.join()
+            assert tenant.statuses.get('1') is None, (
+                'Статус неотправленного уведомления не запоминается'
+            )
+            await polling.poll_all()
+            await queue.stop(timeout=5)
+
+        asyncio.run(scenario())
+        assert requested == [0, 0], 'Курсор опроса откатывается'
+        assert bot.sent == [(1, bot.sent[0][1])] and 'hw' in bot.sent[0][1]
+        assert tenant.statuses.get('1') == 'approved'
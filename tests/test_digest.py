@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+import digest
+import engine
+import homework
+import utils
+
+
+class TestDigest:
+
+    def test_split_respects_limit(self):
+        parts = ['a' * 30, 'b' * 30, 'c' * 30, 'd\n' * 40]
+        chunks = digest.split_text(parts, limit=70)
+        assert all(len(chunk) <= 70 for chunk in chunks)
+        assert chunks[0] == 'a' * 30 + '\n\n' + 'b' * 30, (
+            'Сообщения, помещающиеся целиком, не разрываются'
+        )
+        assert ''.join(chunks).count('d') == 40
+
+    def test_buffer_flushes_by_count_and_window(self):
+        sent = []
+        clock = utils.FakeClock()
+
+        async def send(chat_id, text, on_failure=None):
+            sent.append((chat_id, text))
+
+        buffer = digest.DigestBuffer(
+            send, window=60, max_messages=3, clock=clock
+        )
+
+        async def scenario():
+            for index in range(3):
+                await buffer.add(1, f'hw{index}')
+            await buffer.add(2, 'single')
+            await buffer.flush_due()
+            assert len(sent) == 1
+            clock.now = 60
+            await buffer.flush_due()
+
+        asyncio.run(scenario())
+        assert sent[0][1].startswith('Изменения статусов проверки (3):')
+        assert sent[1] == (2, 'single')
+
+    def test_failed_chunk_rolls_back_its_messages(self):
+        failures = []
+        sent = []
+
+        async def send(chat_id, text, on_failure=None):
+            if len(sent) == 1:
+                on_failure()
+            sent.append(text)
+
+        buffer = digest.DigestBuffer(send, max_messages=10, limit=70)
+
+        async def scenario():
+            for name in 'abcd':
+                await buffer.add(1, name * 30, lambda name=name: (
+                    failures.append(name)
+                ))
+            await buffer.flush_all()
+
+        asyncio.run(scenario())
+        assert len(sent) == 3
+        assert failures == ['b', 'c'], (
+            'Откатываются только уведомления неотправленной части сводки'
+        )
+
+    def test_send_error_rolls_back_remaining_chunks(self):
+        failures = []
+
+        async def send(chat_id, text, on_failure=None):
+            raise RuntimeError('Telegram недоступен')
+
+        buffer = digest.DigestBuffer(send, max_messages=10, limit=70)
+
+        async def scenario():
+            for name in 'abcd':
+                await buffer.add(1, name * 30, lambda name=name: (
+                    failures.append(name)
+                ))
+            await buffer.flush_all()
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(scenario())
+        assert failures == ['a', 'b', 'c', 'd']
+
+    def test_engine_batches_status_changes(self, monkeypatch):
+        answer = utils.FakeAnswer({
+            'homeworks': [
+                {'id': i, 'homework_name': f'hw{i}', 'status': 'approved'}
+                for i in range(40)
+            ],
+            'current_date': 1,
+        })
+        monkeypatch.setattr(homework, 'fetch_answer', lambda *args: answer)
+        bot = utils.FakeBot()
+        polling = engine.PollingEngine(
+            bot, [engine.Tenant('t', 'token', 1)],
+            digest_window=60, digest_size=20,
+        )
+        asyncio.run(polling.poll_all())
+        assert len(bot.sent) == 2, '40 уведомлений уходят двумя сводками'
+        assert all(len(text) <= digest.MESSAGE_LIMIT for _, text in bot.sent)
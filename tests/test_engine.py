@@ -0,0 +1,232 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+import engine
+import exceptions
+import homework
+import metrics
+import retry
+import utils
+
+
+class StalledSinks:
+    """Каналы, которые ждут неотправленного до конца лимита."""
+
+    async def close(self, timeout=None):
+        await asyncio.sleep(timeout)
+
+
+class TestEngine:
+
+    def test_load_tenants_from_file(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'id': 'a', 'practicum_token': 't1', 'chat_id': 1},
+            {'practicum_token': 't2', 'chat_id': 2},
+        ]))
+        tenants = engine.load_tenants(str(path))
+        assert tenants[0].tenant_id == 'a'
+        assert tenants[1].tenant_id.startswith('2-')
+        assert tenants[1].practicum_token == 't2'
+        path.write_text(json.dumps([
+            {'practicum_token': 't0', 'chat_id': 3},
+            {'practicum_token': 't2', 'chat_id': 2},
+        ]))
+        assert engine.load_tenants(str(path))[1].tenant_id == (
+            tenants[1].tenant_id
+        ), 'Идентификатор без id не зависит от порядка записей в файле'
+
+    @pytest.mark.parametrize('records', [
+        [{'chat_id': 1}],
+        [
+            {'id': 'a', 'practicum_token': 't1', 'chat_id': 1},
+            {'id': 'a', 'practicum_token': 't2', 'chat_id': 2},
+        ],
+        [
+            {'practicum_token': 't1', 'chat_id': 1},
+            {'practicum_token': 't1', 'chat_id': 1},
+        ],
+    ])
+    def test_load_tenants_invalid(self, tmp_path, records):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps(records))
+        with pytest.raises(exceptions.TenantConfigError):
+            engine.load_tenants(str(path))
+
+    def test_poll_all_tenants(self, monkeypatch, random_timestamp):
+        calls = []
+
+        def fake_fetch(timestamp, token, etag=None):
+            calls.append(token)
+            return utils.FakeAnswer({
+                'homeworks': [{'homework_name': token, 'status': 'approved'}],
+                'current_date': random_timestamp,
+            })
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        bot = utils.FakeBot()
+        tenants = [engine.Tenant(i, f'token{i}', i) for i in range(20)]
+        polling = engine.PollingEngine(bot, tenants, max_in_flight=4)
+        asyncio.run(polling.poll_all())
+
+        assert sorted(calls) == sorted(f'token{i}' for i in range(20))
+        assert sorted(chat for chat, _ in bot.sent) == list(range(20)), (
+            'Каждая учётная запись получает уведомление в свой чат'
+        )
+        assert all(t.timestamp == random_timestamp for t in tenants)
+
+    def test_error_does_not_stop_other_tenants(self, monkeypatch,
+                                               random_timestamp):
+        def fake_fetch(timestamp, token, etag=None):
+            if token == 'bad':
+                raise exceptions.RequestToAPIError('недоступен')
+            return utils.FakeAnswer(
+                {'homeworks': [], 'current_date': random_timestamp}
+            )
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        bot = utils.FakeBot()
+        bad = engine.Tenant('bad', 'bad', 1, timestamp=0)
+        good = engine.Tenant('good', 'good', 2, timestamp=0)
+        polling = engine.PollingEngine(bot, [bad, good])
+
+        async def poll_twice():
+            await polling.poll_all()
+            await polling.poll_all()
+
+        asyncio.run(poll_twice())
+
+        assert bad.timestamp == 0
+        assert good.timestamp == random_timestamp
+        assert len(bot.sent) == 1, (
+            'Повторная одинаковая ошибка не отправляется в чат'
+        )
+
+    def test_unchanged_answer_skips_parsing(self, monkeypatch):
+        dates = iter(range(100, 110))
+
+        def fake_fetch(timestamp, token, etag=None):
+            return utils.FakeAnswer({
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': next(dates),
+            })
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        bot = utils.FakeBot()
+        tenant = engine.Tenant('t', 'token', 1)
+        polling = engine.PollingEngine(bot, [tenant])
+        before = metrics.FINGERPRINT_HITS.value()
+
+        async def poll_three_times():
+            for _ in range(3):
+                await polling.poll_all()
+
+        asyncio.run(poll_three_times())
+
+        assert len(bot.sent) == 1, (
+            'Повторный одинаковый ответ API не должен порождать уведомление'
+        )
+        assert polling.fingerprints.hits == 2
+        assert metrics.FINGERPRINT_HITS.value() == before + 2
+        assert tenant.timestamp == 102, (
+            'При совпадении ответа курсор сдвигается на current_date'
+        )
+
+    def test_all_homeworks_processed(self, monkeypatch):
+        def fake_fetch(timestamp, token, etag=None):
+            return utils.FakeAnswer({
+                'homeworks': [
+                    {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+                    {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+                ],
+                'current_date': 10,
+            })
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        bot = utils.FakeBot()
+        tenant = engine.Tenant('t', 'token', 1)
+        asyncio.run(engine.PollingEngine(bot, [tenant]).poll_all())
+
+        assert [text for _, text in bot.sent] == [
+            homework.parse_status({'homework_name': 'hw1',
+                                   'status': 'approved'}),
+            homework.parse_status({'homework_name': 'hw2',
+                                   'status': 'reviewing'}),
+        ]
+        assert tenant.status == 'reviewing'
+
+    def test_large_answer_streamed(self, monkeypatch):
+        import validation
+
+        def fake_fetch(timestamp, token, etag=None):
+            return utils.FakeAnswer({
+                'homeworks': [
+                    {'id': i, 'homework_name': f'hw{i}', 'status': 'approved'}
+                    for i in range(50)
+                ],
+                'current_date': 77,
+            })
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        monkeypatch.setattr(validation, 'STREAM_THRESHOLD', 0)
+        bot = utils.FakeBot()
+        tenant = engine.Tenant('t', 'token', 1)
+        asyncio.run(engine.PollingEngine(bot, [tenant]).poll_all())
+        assert len(bot.sent) == 50
+        assert tenant.timestamp == 77
+
+    def test_recovery_summary(self, monkeypatch):
+        answers = iter([500, 502, 500, 200])
+
+        def fake_fetch(timestamp, token, etag=None):
+            code = next(answers)
+            if code != 200:
+                raise exceptions.RequestToAPIError(f'HTTP ERROR: {code}')
+            return utils.FakeAnswer({'homeworks': [], 'current_date': 1})
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        bot = utils.FakeBot()
+        tenant = engine.Tenant('t', 'token', 1)
+        polling = engine.PollingEngine(bot, [tenant])
+
+        async def poll_four_times():
+            for _ in range(4):
+                await polling.poll_all()
+
+        asyncio.run(poll_four_times())
+        assert len(bot.sent) == 2
+        assert 'Повторилась 3 раз' in bot.sent[1][1], (
+            'После восстановления отправляется итог по ошибке'
+        )
+        assert tenant.last_err_msg == ''
+
+    @pytest.mark.parametrize('blocking', [False, True])
+    def test_stop_respects_drain_timeout(self, monkeypatch, blocking):
+        def fake_fetch(timestamp, token, etag=None, deadline=None):
+            if blocking:
+                time.sleep(1)
+            raise exceptions.RequestToAPIError('недоступен')
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        polling = engine.PollingEngine(
+            utils.FakeBot(), [engine.Tenant('t', 'token', 1)],
+            retry_policy=retry.RetryPolicy(base=5, cap=5, budget=60),
+        )
+        polling.drain_timeout = 0.3
+        polling.sinks = StalledSinks()
+
+        async def scenario():
+            task = asyncio.ensure_future(polling.run())
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            polling.stop()
+            await task
+            return time.monotonic() - started
+
+        assert asyncio.run(scenario()) < 0.5, (
+            'Остановка не ждёт повторов, зависших опросов и каналов '
+            'дольше drain_timeout в сумме'
+        )
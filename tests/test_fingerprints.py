@@ -0,0 +1,40 @@
+from http import HTTPStatus
+
+import fingerprints
+import utils
+
+
+class TestFingerprints:
+
+    def test_current_date_ignored(self):
+        first = fingerprints.Fingerprint.from_answer(
+            utils.FakeAnswer(b'{"homeworks": [], "current_date": 100}')
+        )
+        second = fingerprints.Fingerprint.from_answer(
+            utils.FakeAnswer(b'{"homeworks": [], "current_date": 200}')
+        )
+        assert first.digest == second.digest
+        assert second.current_date == 200
+
+    def test_cache_hits_after_remember(self):
+        cache = fingerprints.FingerprintCache()
+        fingerprint = fingerprints.Fingerprint.from_answer(
+            utils.FakeAnswer(b'{"homeworks": [], "current_date": 1}')
+        )
+        assert not cache.is_unchanged('t', fingerprint), (
+            'Пока ответ не обработан, он не считается известным'
+        )
+        cache.remember('t', fingerprint)
+        assert cache.is_unchanged('t', fingerprint)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_etag_and_not_modified(self):
+        cache = fingerprints.FingerprintCache()
+        cache.remember('t', fingerprints.Fingerprint.from_answer(
+            utils.FakeAnswer(b'{}', headers={'ETag': '"v1"'})
+        ))
+        assert cache.etag('t') == '"v1"'
+        not_modified = fingerprints.Fingerprint.from_answer(
+            utils.FakeAnswer(b'', status_code=HTTPStatus.NOT_MODIFIED)
+        )
+        assert cache.is_unchanged('t', not_modified)
@@ -0,0 +1,111 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_client
+import metrics
+
+
+class SlowBodyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body_delay = 0
+    drip_delay = 0
+
+    def do_GET(self):
+        body = b'{"homeworks": [], "current_date": 1}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body) * 2))
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+        time.sleep(self.body_delay)
+        for _ in range(len(body)):
+            time.sleep(self.drip_delay)
+            self.wfile.write(b' ')
+            self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), SlowBodyHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}/'
+    httpd.shutdown()
+    httpd.server_close()
+    SlowBodyHandler.body_delay = 0
+    SlowBodyHandler.drip_delay = 0
+    http_client.close()
+
+
+class TestHttpClient:
+
+    def test_connection_reused(self, server):
+        connects = metrics.HTTP_STAGES['connect'].count
+        transfers = metrics.HTTP_STAGES['transfer'].count
+        http_client.configure(pool_size=2)
+        for _ in range(3):
+            answer = http_client.get(server)
+            assert answer.json()['current_date'] == 1
+        assert metrics.HTTP_STAGES['connect'].count == connects + 1, (
+            'Повторные запросы должны использовать keep-alive соединение'
+        )
+        assert metrics.HTTP_STAGES['transfer'].count == transfers + 3
+
+    def test_total_deadline(self, server):
+        SlowBodyHandler.body_delay = 1
+        http_client.configure(deadline=0.2, read_timeout=5)
+        started = time.monotonic()
+        with pytest.raises(requests.exceptions.RequestException):
+            http_client.get(server)
+        assert time.monotonic() - started < 1, (
+            'Запрос должен прерываться по общему лимиту времени'
+        )
+
+    def test_deadline_with_slow_drip(self, server):
+        SlowBodyHandler.drip_delay = 0.05
+        http_client.configure(deadline=0.3, read_timeout=5)
+        started = time.monotonic()
+        with pytest.raises(requests.exceptions.Timeout):
+            http_client.get(server)
+        assert time.monotonic() - started < 1, (
+            'Лимит действует на весь запрос, а не на каждое чтение'
+        )
+
+    def test_single_watchdog_thread(self, server):
+        http_client.configure(pool_size=2)
+        for _ in range(5):
+            http_client.get(server)
+        watchdogs = [
+            thread for thread in threading.enumerate()
+            if thread.name == 'http-watchdog'
+        ]
+        assert len(watchdogs) == 1, 'Один сторожевой поток на все запросы'
+
+    def test_released_connection_is_not_aborted(self):
+        class FakeSocket:
+            closed = False
+
+            def shutdown(self, how):
+                self.closed = True
+
+        class FakeConnection:
+            sock = FakeSocket()
+
+        connection = FakeConnection()
+        deadline = http_client._Deadline(0)
+        deadline.watch(connection)
+        deadline.release(connection)
+        deadline.expire()
+        assert deadline.expired
+        assert not connection.sock.closed, (
+            'Соединение, возвращённое в пул, не закрывается по лимиту '
+            'прежнего запроса'
+        )
@@ -0,0 +1,95 @@
+import io
+import json
+import logging
+import queue
+
+import logs
+import utils
+
+
+def make_record(level=logging.DEBUG, msg='Статус не изменился.'):
+    return logging.LogRecord('engine', level, '', 0, msg, (), None)
+
+
+class TestLogs:
+
+    def test_json_lines_with_fields(self):
+        stream = io.StringIO()
+        root_logger = logging.getLogger()
+        handlers, level = list(root_logger.handlers), root_logger.level
+        listener = logs.setup(stream=stream)
+        try:
+            logging.getLogger('engine').info(
+                'Ответ API получен.', extra=logs.fields(
+                    'tenant-1', stage='get_api_answer', duration=0.25
+                )
+            )
+        finally:
+            listener.stop()
+            root_logger.handlers = handlers
+            root_logger.setLevel(level)
+        entry = json.loads(stream.getvalue())
+        assert entry['message'] == 'Ответ API получен.'
+        assert entry['tenant'] == 'tenant-1'
+        assert entry['stage'] == 'get_api_answer'
+        assert entry['duration'] == 0.25
+
+    def test_default_level_is_info(self):
+        root_logger = logging.getLogger()
+        handlers, level = list(root_logger.handlers), root_logger.level
+        listener = logs.setup(stream=io.StringIO())
+        try:
+            assert root_logger.level == logging.INFO, (
+                'Корневой логгер не пишет DEBUG без LOG_LEVEL'
+            )
+        finally:
+            listener.stop()
+            root_logger.handlers = handlers
+            root_logger.setLevel(level)
+
+    def test_exception_field_through_listener(self):
+        stream = io.StringIO()
+        root_logger = logging.getLogger()
+        handlers, level = list(root_logger.handlers), root_logger.level
+        listener = logs.setup(stream=stream)
+        try:
+            try:
+                raise ValueError('плохой ответ')
+            except ValueError:
+                logging.getLogger('engine').exception(
+                    'Сбой опроса %s.', 't', extra=logs.fields('t')
+                )
+        finally:
+            listener.stop()
+            root_logger.handlers = handlers
+            root_logger.setLevel(level)
+        entry = json.loads(stream.getvalue())
+        assert entry['message'] == 'Сбой опроса t.', (
+            'Трассировка не попадает в текст сообщения'
+        )
+        assert 'ValueError: плохой ответ' in entry['exception']
+        assert entry['tenant'] == 't'
+
+    def test_sampling_never_drops_errors(self):
+        clock = utils.FakeClock()
+        sampler = logs.SamplingFilter(burst=2, period=60, clock=clock)
+        passed = [sampler.filter(make_record()) for _ in range(5)]
+        assert passed == [True, True, False, False, False]
+        assert all(
+            sampler.filter(make_record(logging.ERROR)) for _ in range(5)
+        ), 'Ошибки не должны отбрасываться'
+        clock.now = 60
+        record = make_record()
+        assert sampler.filter(record)
+        assert record.suppressed == 3, (
+            'Число пропущенных записей попадает в следующую запись'
+        )
+
+    def test_full_queue_keeps_warnings(self):
+        handler = logs.LogQueueHandler(queue.Queue(1))
+        handler.enqueue(make_record())
+        handler.enqueue(make_record())
+        assert handler.dropped == 1
+        handler.queue.get_nowait()
+        handler.enqueue(make_record(logging.ERROR))
+        assert handler.queue.get_nowait().levelno == logging.ERROR
@@ -0,0 +1,49 @@
+import urllib.request
+
+import metrics
+
+
+class TestMetrics:
+
+    def test_histogram_render(self):
+        registry = metrics.Registry()
+        histogram = registry.register(
+            metrics.Histogram('stage_seconds', 'Этап.', buckets=(0.1, 1))
+        )
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        text = registry.render()
+        assert '# TYPE stage_seconds histogram' in text
+        assert 'stage_seconds_bucket{le="0.1"} 1' in text
+        assert 'stage_seconds_bucket{le="1"} 2' in text
+        assert 'stage_seconds_bucket{le="+Inf"} 3' in text
+        assert 'stage_seconds_count 3' in text
+
+    def test_counter_and_gauge_labels(self):
+        registry = metrics.Registry()
+        counter = registry.register(
+            metrics.Counter('errors_total', 'Ошибки.', ('exception',))
+        )
+        gauge = registry.register(
+            metrics.Gauge('tenants', 'Учётные записи.', labelname='state')
+        )
+        counter.inc('HTTPError')
+        counter.inc('HTTPError')
+        gauge.set_function(lambda: {'idle': 3})
+        text = registry.render()
+        assert 'errors_total{exception="HTTPError"} 2' in text
+        assert 'tenants{state="idle"} 3' in text
+
+    def test_endpoint(self):
+        server = metrics.start_server(0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(
+                f'http://127.0.0.1:{port}/metrics'
+            ) as answer:
+                body = answer.read().decode()
+            assert 'homework_get_api_answer_seconds_count' in body
+        finally:
+            server.shutdown()
+            server.server_close()
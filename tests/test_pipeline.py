@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+import engine
+import homework
+import pipeline
+import utils
+
+
+class CountJob(pipeline.Job):
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+async def increment(job):
+    job.value += 1
+
+
+class TestPipeline:
+
+    def test_stages_in_order(self):
+        async def double(job):
+            job.value *= 2
+
+        stages = pipeline.Pipeline([('inc', increment), ('double', double)])
+        job = asyncio.run(stages.run(CountJob(1)))
+        assert job.value == 4
+        assert stages.stats()['double']['processed'] == 1
+
+    def test_error_and_finished(self):
+        async def fail(job):
+            raise ValueError('bad')
+
+        async def finish(job):
+            job.finished = True
+
+        stages = pipeline.Pipeline([('finish', finish), ('fail', fail)])
+        job = asyncio.run(stages.run(CountJob(0)))
+        assert job.finished, 'Досрочно завершённое задание минует этапы'
+        stages.replace('finish', increment)
+        with pytest.raises(ValueError):
+            asyncio.run(stages.run(CountJob(0)))
+
+    def test_backpressure(self):
+        release = None
+
+        async def slow(job):
+            await release.wait()
+
+        stages = pipeline.Pipeline(
+            [('fast', increment), ('slow', slow)], queue_size=2
+        )
+
+        async def scenario():
+            nonlocal release
+            release = asyncio.Event()
+            tasks = [
+                asyncio.ensure_future(stages.run(CountJob(index)))
+                for index in range(20)
+            ]
+            await asyncio.sleep(0.05)
+            stats = stages.stats()
+            release.set()
+            await asyncio.gather(*tasks)
+            await stages.stop()
+            return stats
+
+        stats = asyncio.run(scenario())
+        assert stats['fast']['queued'] + stats['slow']['queued'] <= 4
+        assert stats['fast']['processed'] < 20, (
+            'Медленный этап задерживает предыдущие вместо накопления заданий'
+        )
+
+
+class TestEnginePipeline:
+
+    def test_swapped_render_stage(self, monkeypatch):
+        monkeypatch.setattr(
+            homework, 'fetch_answer', lambda *args: utils.FakeAnswer()
+        )
+        bot = utils.FakeBot()
+        polling = engine.PollingEngine(bot, [engine.Tenant('t', 'token', 1)])
+
+        async def render(job):
+            job.messages = [
+                f'{changed.homework_name}: {changed.status}'
+                for changed in job.changes
+            ]
+
+        polling.pipeline.replace('render', render)
+        asyncio.run(polling.poll_all())
+        assert bot.sent == [(1, 'hw: approved')]
+        assert polling.tenants[0].timestamp == 1
+
+    def test_process_until_stage(self, monkeypatch):
+        polling = engine.PollingEngine(utils.FakeBot(), [])
+        polling.fetch = lambda *args: utils.FakeAnswer()
+
+        async def scenario():
+            polling._setup()
+            job = engine.PollJob(engine.Tenant('t', 'token', 1))
+            return await polling.pipeline.process(job, until='render')
+
+        job = asyncio.run(scenario())
+        assert [changed.homework_name for changed in job.changes] == ['hw']
+        assert job.messages == (), 'Этапы после until не выполняются'
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import engine
+import homework
+import profiler
+import utils
+
+
+def fetch_answer(*args):
+    time.sleep(0.02)
+    return utils.FakeAnswer()
+
+
+class TestProfiler:
+
+    def test_cprofile_polls(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(homework, 'fetch_answer', fetch_answer)
+        polling = engine.PollingEngine(
+            utils.FakeBot(), [engine.Tenant('t', 'token', 1)]
+        )
+        polling.profiler = profiler.Profiler(str(tmp_path))
+        assert polling.profiler.command('cprofile 2').startswith('cprofile')
+
+        async def poll():
+            for _ in range(3):
+                await polling.poll_all()
+
+        asyncio.run(poll())
+        result = polling.profiler
+        assert result.mode is None, (
+            'cProfile выключается после заданного числа опросов'
+        )
+        assert result.last_path.endswith('.pstats')
+        summary = open(result.last_path + '.txt', encoding='utf-8').read()
+        for stage in profiler.STAGES:
+            assert stage in summary, (
+                'В отчёте есть разбивка по этапам опроса'
+            )
+
+    def test_sampling(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(homework, 'fetch_answer', fetch_answer)
+        polling = engine.PollingEngine(
+            utils.FakeBot(), [engine.Tenant('t', 'token', 1)]
+        )
+        sampling = profiler.Profiler(str(tmp_path))
+        sampling.start_sampling(seconds=60, interval=0.001)
+        asyncio.run(polling.poll_all())
+        path = sampling.command('stop')
+        assert path.endswith('.folded')
+        lines = open(path, encoding='utf-8').read().splitlines()
+        assert lines and all(line.rsplit(' ', 1)[1].isdigit()
+                             for line in lines), (
+            'Свёрнутые стеки: «кадр;кадр;кадр число»'
+        )
+        assert any('homework' in line or 'fetch_answer' in line
+                   for line in lines)
+        assert sampling.status().startswith('выключено')
+
+    def test_commands(self, tmp_path):
+        control = profiler.Profiler(str(tmp_path))
+        assert control.command('stop') == 'Профилирование не запущено.'
+        assert control.command('cprofile x').startswith('Некорректные')
+        assert control.command('flame').startswith('Неизвестная')
+
+    def test_stop_races_with_timer(self, tmp_path):
+        sampling = profiler.Profiler(str(tmp_path))
+        for _ in range(20):
+            sampling.start_sampling(seconds=0.001, interval=0.001)
+            time.sleep(0.001)
+            sampling.stop()
+            time.sleep(0.005)
+            assert sampling.mode is None
+        assert sampling.last_path is not None, (
+            'Остановка из таймера и вручную не мешают друг другу'
+        )
@@ -0,0 +1,81 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+import engine
+import exceptions
+import homework
+import recorder
+import utils
+
+
+@pytest.fixture(params=['traffic.ndjson', 'traffic.ndjson.gz'])
+def record_path(request, tmp_path):
+    return str(tmp_path / request.param)
+
+
+class TestRecorder:
+
+    def test_record_and_replay(self, monkeypatch, record_path):
+        answers = iter([
+            utils.FakeAnswer({'homeworks': [], 'current_date': 1}),
+            utils.FakeAnswer({}, HTTPStatus.INTERNAL_SERVER_ERROR),
+            utils.FakeAnswer({'homeworks': [
+                {'id': 1, 'homework_name': 'hw', 'status': 'approved'}
+            ], 'current_date': 2}),
+        ])
+
+        def fake_fetch(timestamp, token, etag=None):
+            return homework.check_answer_status(next(answers))
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        bot = recorder.DryRunBot()
+        polling = engine.PollingEngine(bot, [engine.Tenant('t', 'x', 1)])
+        polling.recorder = recorder.TrafficRecorder(record_path)
+
+        async def poll_three_times():
+            for _ in range(3):
+                await polling.poll_all()
+
+        asyncio.run(poll_three_times())
+        polling.recorder.close()
+
+        records = list(recorder.read_records(record_path))
+        assert [r['status'] for r in records] == [200, 500, 200], (
+            'Записываются все ответы, включая ответы с ошибкой HTTP'
+        )
+        assert 'x' not in {r['tenant'] for r in records}, (
+            'В файл записи не должен попадать токен'
+        )
+
+        replay_bot = recorder.DryRunBot()
+        result = asyncio.run(
+            recorder.Replayer(record_path, speed=1000, bot=replay_bot).run()
+        )
+        assert result['polls'] == 3
+        assert [t for _, t in replay_bot.sent] == [t for _, t in bot.sent], (
+            'Проигрывание должно давать те же сообщения, что и запись'
+        )
+
+    def test_replay_outage_then_recovery(self, record_path):
+        writer = recorder.TrafficRecorder(record_path)
+        for _ in range(6):
+            writer.record_error(
+                't', 0, 0.1, exceptions.RequestToAPIError('нет связи')
+            )
+        writer.record('t', 0, 0.1, utils.FakeAnswer())
+        writer.close()
+
+        bot = recorder.DryRunBot()
+        result = asyncio.run(recorder.Replayer(record_path, bot=bot).run())
+        assert result['polls'] == 7
+        assert any('"hw"' in text for _, text in bot.sent), (
+            'Ответ после сбоя API проигрывается, а не отсекается автоматом'
+        )
+
+    def test_replayed_network_error(self):
+        replayer = recorder.Replayer('unused')
+        replayer._pending['t'] = {'status': None, 'error': 'таймаут'}
+        with pytest.raises(exceptions.RequestToAPIError):
+            replayer._fetch(0, 't')
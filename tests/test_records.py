@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import engine
+import exceptions
+import homework
+import records
+import status_index
+
+HOMEWORK = {
+    'id': 123,
+    'homework_name': 'hw_python_oop',
+    'status': 'approved',
+    'lesson_name': 'Итоговый проект',
+    'reviewer_comment': 'Всё нравится',
+    'date_updated': '2022-01-01T00:00:00Z',
+}
+
+
+class TestHomework:
+
+    def test_mapping_access(self):
+        record = records.Homework.from_dict(HOMEWORK)
+        assert record['status'] == 'approved'
+        assert record.get('id') == 123
+        assert 'lesson_name' in record
+        assert record.as_dict() == HOMEWORK
+        partial = records.Homework.from_dict({'homework_name': 'hw'})
+        assert 'id' not in partial
+        assert partial.get('status', 'нет') == 'нет'
+        with pytest.raises(KeyError):
+            partial['status']
+
+    def test_parse_status(self):
+        record = records.Homework.from_dict(HOMEWORK)
+        assert homework.parse_status(record) == homework.parse_status(
+            HOMEWORK
+        ), 'parse_status одинаково разбирает запись и словарь'
+        with pytest.raises(exceptions.IncorrectStatusError):
+            homework.parse_status(records.Homework(
+                homework_name='hw', status='unknown'
+            ))
+        with pytest.raises(KeyError):
+            homework.parse_status(records.Homework(homework_name='hw'))
+
+    def test_interned_strings(self):
+        first, second = (
+            records.Homework.from_dict(json.loads(json.dumps(HOMEWORK)))
+            for _ in range(2)
+        )
+        assert first.status is second.status
+        assert first.homework_name is second.homework_name
+        index = status_index.StatusIndex(
+            json.loads(json.dumps({'1': ['approved', 'hw']}))
+        )
+        assert index.get('1') is second.status
+
+    def test_memory_budget(self):
+        per_record = records.measure(
+            lambda index: records.Homework.from_dict(dict(HOMEWORK, id=index))
+        )
+        per_dict = records.measure(lambda index: dict(HOMEWORK, id=index))
+        assert per_record <= records.HOMEWORK_BUDGET, (
+            f'Запись о работе занимает {per_record:.0f} байт'
+        )
+        assert per_record < per_dict / 2
+
+    def test_tenant_budget(self):
+        per_tenant = records.measure(
+            lambda index: engine.Tenant(index, 'token', 1)
+        )
+        per_plain = records.measure(
+            lambda index: records.as_plain(engine.Tenant(index, 'token', 1))
+        )
+        assert per_tenant <= per_plain * records.TENANT_SHARE, (
+            f'Учётная запись занимает {per_tenant:.0f} байт, '
+            f'такая же запись с __dict__ — {per_plain:.0f} байт'
+        )
+
+    def test_tenant_history_limit(self):
+        tenant = engine.Tenant('t', 'token', 1)
+        for index in range(engine.HISTORY_LIMIT + 5):
+            tenant.remember(f'hw{index}', 'approved')
+        assert len(tenant.history) == engine.HISTORY_LIMIT
+        assert tenant.history[0][1] == 'hw5'
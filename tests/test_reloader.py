@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import delivery
+import engine
+import homework
+import reloader
+import storage
+import utils
+
+
+class TestReloader:
+
+    def test_reload_settings(self, monkeypatch):
+        monkeypatch.setattr(homework, 'RETRY_TIME', 600)
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'old')
+        monkeypatch.setattr(homework, 'HEADERS', homework.HEADERS)
+        monkeypatch.setenv('RETRY_TIME', '300')
+        monkeypatch.setenv('PRACTICUM_TOKEN', 'new')
+        changed = homework.reload_settings()
+        assert {'RETRY_TIME', 'PRACTICUM_TOKEN'} <= set(changed)
+        assert homework.RETRY_TIME == 300
+        assert homework.HEADERS == {'Authorization': 'OAuth new'}
+
+    def test_tenants_updated_without_restart(self, monkeypatch, tmp_path):
+        polled = []
+
+        def fake_fetch(timestamp, token, etag=None):
+            polled.append(token)
+            return utils.FakeAnswer({
+                'homeworks': [{'homework_name': token, 'status': 'approved'}],
+                'current_date': 1,
+            })
+
+        monkeypatch.setattr(homework, 'fetch_answer', fake_fetch)
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'id': 'a', 'practicum_token': 'a', 'chat_id': 1},
+            {'id': 'b', 'practicum_token': 'b', 'chat_id': 2},
+        ]))
+        monkeypatch.setattr(homework, 'TENANTS_FILE', str(path))
+        monkeypatch.setattr(homework, 'reload_settings', lambda: [])
+        monkeypatch.setattr(homework, 'RETRY_TIME', 0.01)
+        monkeypatch.setattr(homework, 'MIN_RETRY_TIME', 0.01)
+        bot = utils.FakeBot()
+        polling = engine.PollingEngine(bot, engine.load_tenants(str(path)))
+        watcher = reloader.Reloader(polling)
+
+        async def scenario():
+            task = asyncio.ensure_future(polling.run())
+            await watcher.reload()
+            await asyncio.sleep(0.05)
+            path.write_text(json.dumps([
+                {'id': 'a', 'practicum_token': 'a2', 'chat_id': 1},
+                {'id': 'c', 'practicum_token': 'c', 'chat_id': 3},
+            ]))
+            await watcher.reload()
+            polled.clear()
+            await asyncio.sleep(0.05)
+            polling.stop()
+            await task
+
+        asyncio.run(scenario())
+        assert set(polled) == {'a2', 'c'}, (
+            'Удалённая учётная запись не опрашивается, новая опрашивается'
+        )
+        assert [tenant.tenant_id for tenant in polling.tenants] == ['a', 'c']
+
+    def test_unsent_messages_survive_restart(self):
+        store = storage.create_store('memory', None)
+        bot = utils.FakeBot()
+        queue = delivery.DeliveryQueue(bot, workers=1, chat_rate=0.001)
+        polling = engine.PollingEngine(bot, [], store=store, delivery=queue)
+        polling.drain_timeout = 0.01
+
+        async def scenario():
+            task = asyncio.ensure_future(polling.run())
+            await asyncio.sleep(0)
+            for text in ('a', 'b', 'c'):
+                await queue.enqueue(1, text)
+            await asyncio.sleep(0.01)
+            polling.stop()
+            await task
+
+        asyncio.run(scenario())
+        assert bot.sent == [(1, 'a')]
+        assert store.load_outbox() == [(1, 'b'), (1, 'c')], (
+            'Неотправленные при остановке сообщения сохраняются'
+        )
@@ -0,0 +1,219 @@
+import asyncio
+import time
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import breaker
+import engine
+import exceptions
+import homework
+import retry
+import utils
+
+
+def is_transient(error):
+    return isinstance(error, exceptions.RequestToAPIError)
+
+
+class TestRetryPolicy:
+
+    def test_decorrelated_jitter(self):
+        assert retry.decorrelated_jitter(
+            1, base=0.5, cap=10, uniform=max
+        ) == 3, 'Пауза не больше утроенной предыдущей'
+        assert retry.decorrelated_jitter(
+            5, base=0.5, cap=10, uniform=max
+        ) == 10, 'Пауза не больше cap'
+        assert retry.decorrelated_jitter(
+            5, base=0.5, cap=10, uniform=min
+        ) == 0.5, 'Пауза не меньше base'
+
+    def test_retries_transient_errors(self):
+        calls = []
+
+        async def attempt(timeout):
+            calls.append(1)
+            if len(calls) < 3:
+                raise exceptions.RequestToAPIError('blip')
+            return 'ok'
+
+        policy = retry.RetryPolicy(base=0.001, cap=0.01, budget=5)
+        assert asyncio.run(policy.call(attempt, is_transient)) == 'ok'
+        assert len(calls) == 3
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        async def attempt(timeout):
+            calls.append(1)
+            raise ValueError('bad')
+
+        policy = retry.RetryPolicy(base=0.001, cap=0.01, budget=5)
+        with pytest.raises(ValueError):
+            asyncio.run(policy.call(attempt, is_transient))
+        assert len(calls) == 1, 'Постоянные ошибки не повторяются'
+
+    def test_budget(self):
+        calls = []
+
+        async def attempt(timeout):
+            calls.append(1)
+            raise exceptions.RequestToAPIError('down')
+
+        policy = retry.RetryPolicy(base=0.02, cap=0.02, budget=0.05)
+        started = time.monotonic()
+        with pytest.raises(exceptions.RequestToAPIError):
+            asyncio.run(policy.call(attempt, is_transient))
+        assert time.monotonic() - started < 0.5
+        assert 1 < len(calls) <= 3, (
+            'Повторы прекращаются, когда пауза выходит за срок опроса'
+        )
+
+    def test_hedged_request(self):
+        delays = [0.5, 0.01]
+
+        async def attempt(timeout):
+            await asyncio.sleep(delays.pop(0))
+            return 'ok'
+
+        policy = retry.RetryPolicy(hedge=True, min_samples=3)
+        policy.latencies.extend([0.01, 0.01, 0.02])
+        started = time.monotonic()
+        assert asyncio.run(policy.call(attempt, is_transient)) == 'ok'
+        assert time.monotonic() - started < 0.3, (
+            'Медленный запрос дублируется после p95 длительности'
+        )
+        assert policy.hedge_delay() is not None
+
+    def test_hedges_are_limited(self):
+        started = []
+
+        async def attempt(timeout):
+            started.append(timeout)
+            await asyncio.sleep(0.1)
+            return 'ok'
+
+        policy = retry.RetryPolicy(hedge=True, min_samples=1, max_hedges=1)
+        policy.latencies.append(0.01)
+
+        async def scenario():
+            return await asyncio.gather(*(
+                policy.call(attempt, is_transient) for _ in range(3)
+            ))
+
+        assert asyncio.run(scenario()) == ['ok'] * 3
+        assert len(started) == 4, 'Одновременно не больше max_hedges дублей'
+        assert policy.hedging == 0
+
+    def test_open_circuit_stops_retries(self):
+        calls = []
+
+        async def attempt(timeout):
+            calls.append(1)
+            raise exceptions.RequestToAPIError('down')
+
+        circuit = breaker.CircuitBreaker('api', failure_threshold=2)
+        policy = retry.RetryPolicy(base=0.001, cap=0.01, budget=5)
+        with pytest.raises(exceptions.CircuitOpenError):
+            asyncio.run(policy.call(attempt, is_transient, circuit=circuit))
+        assert len(calls) == 2, 'Каждая попытка записывается в автомат'
+        assert circuit.state == breaker.OPEN
+        with pytest.raises(exceptions.CircuitOpenError):
+            asyncio.run(policy.call(attempt, is_transient, circuit=circuit))
+        assert len(calls) == 2, 'Разомкнутый автомат не пропускает попытки'
+
+    def test_no_hedge_while_circuit_is_not_closed(self):
+        calls = []
+
+        async def attempt(timeout):
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'ok'
+
+        circuit = breaker.CircuitBreaker(
+            'api', failure_threshold=1, reset_timeout=0
+        )
+        circuit.failure()
+        policy = retry.RetryPolicy(hedge=True, min_samples=1)
+        policy.latencies.append(0.01)
+        assert asyncio.run(
+            policy.call(attempt, is_transient, circuit=circuit)
+        ) == 'ok'
+        assert len(calls) == 1, 'Пробный запрос не дублируется'
+        assert circuit.state == breaker.CLOSED
+
+    def test_attempt_gets_remaining_budget(self):
+        timeouts = []
+        clock = utils.FakeClock()
+
+        async def attempt(timeout):
+            timeouts.append(timeout)
+            clock.now += 2
+            raise exceptions.RequestToAPIError('timeout')
+
+        async def sleep(delay, stopping):
+            clock.now += delay
+
+        policy = retry.RetryPolicy(
+            base=1, cap=1, budget=10, uniform=min, clock=clock
+        )
+        policy._sleep = sleep
+        with pytest.raises(exceptions.RequestToAPIError):
+            asyncio.run(policy.call(attempt, is_transient))
+        assert timeouts == [10, 7, 4, 1], (
+            'Попытка ограничена остатком срока повторов'
+        )
+
+    def test_retry_after_is_minimum_delay(self):
+        response = utils.FakeAnswer(
+            {}, HTTPStatus.TOO_MANY_REQUESTS, {'Retry-After': '7'}
+        )
+        error = requests.exceptions.HTTPError('429', response=response)
+        assert retry.retry_after(error) == 7
+        assert retry.retry_after(ValueError()) == 0
+        clock = utils.FakeClock()
+        delays = []
+
+        async def attempt(timeout):
+            raise error
+
+        async def sleep(delay, stopping):
+            delays.append(delay)
+            clock.now += delay
+
+        policy = retry.RetryPolicy(
+            base=0.1, cap=1, budget=20, uniform=max, clock=clock
+        )
+        policy._sleep = sleep
+        with pytest.raises(requests.exceptions.HTTPError):
+            asyncio.run(policy.call(attempt, lambda error: True))
+        assert delays == [7, 7], 'Пауза не короче Retry-After'
+
+    def test_no_hedge_without_samples(self):
+        policy = retry.RetryPolicy(hedge=True, min_samples=3)
+        assert policy.hedge_delay() is None
+
+
+class TestEngineRetry:
+
+    def test_transient_error_costs_no_interval(self, monkeypatch):
+        calls = []
+
+        def fetch_answer(*args, deadline=None):
+            calls.append(1)
+            if len(calls) == 1:
+                raise exceptions.RequestToAPIError('blip')
+            return utils.FakeAnswer()
+
+        monkeypatch.setattr(homework, 'fetch_answer', fetch_answer)
+        bot = utils.FakeBot()
+        polling = engine.PollingEngine(
+            bot, [engine.Tenant('t', 'token', 1)],
+            retry_policy=retry.RetryPolicy(base=0.001, cap=0.01),
+        )
+        asyncio.run(polling.poll_all())
+        tenant = polling.tenants[0]
+        assert tenant.errors == 0, 'Сбой, прошедший при повторе, не ошибка'
+        assert len(bot.sent) == 1 and 'hw' in bot.sent[0][1]
@@ -0,0 +1,46 @@
+import time
+
+import engine
+import scheduler
+
+
+def make_scheduler():
+    return scheduler.PollScheduler(
+        interval=600, reviewing_interval=120, idle_interval=1800,
+        idle_after=1000, min_interval=60, max_interval=3600,
+        rng=lambda: 0.5,
+    )
+
+
+class TestPollScheduler:
+
+    def test_reviewing_polls_faster(self):
+        tenant = engine.Tenant('t', 'token', 1)
+        tenant.status = 'reviewing'
+        assert make_scheduler().interval_for(tenant) == 120
+
+    def test_idle_polls_slower(self):
+        tenant = engine.Tenant('t', 'token', 1)
+        now = time.time()
+        tenant.changed_at = now - 5000
+        assert make_scheduler().interval_for(tenant, now) == 1800
+        tenant.changed_at = now
+        assert make_scheduler().interval_for(tenant, now) == 600
+
+    def test_error_backoff_is_bounded(self):
+        tenant = engine.Tenant('t', 'token', 1)
+        poll_scheduler = make_scheduler()
+        tenant.errors = 1
+        assert poll_scheduler.interval_for(tenant) == 1200
+        tenant.errors = 50
+        assert poll_scheduler.interval_for(tenant) == 3600, (
+            'Интервал после ошибок не превышает max_interval'
+        )
+
+    def test_next_deadline_does_not_drift(self):
+        tenant = engine.Tenant('t', 'token', 1)
+        poll_scheduler = make_scheduler()
+        assert poll_scheduler.next_deadline(tenant, 1000, 1030) == 1600, (
+            'Следующий срок отсчитывается от предыдущего срока'
+        )
+        assert poll_scheduler.next_deadline(tenant, 1000, 2000) == 2000
@@ -0,0 +1,71 @@
+import asyncio
+
+import engine
+import sharding
+import storage
+import utils
+
+
+class TestHashRing:
+
+    def test_adding_worker_moves_small_share(self):
+        keys = [str(i) for i in range(2000)]
+        before = sharding.HashRing(['a', 'b', 'c'])
+        after = sharding.HashRing(['a', 'b', 'c', 'd'])
+        moved = [key for key in keys if before.owner(key) != after.owner(key)]
+        assert all(after.owner(key) == 'd' for key in moved), (
+            'Ключи переезжают только к новому участнику'
+        )
+        assert len(moved) < len(keys) * 0.4
+
+
+class TestLeaseStore:
+
+    def test_lease_is_exclusive_until_expired(self, tmp_path):
+        leases = sharding.LeaseStore(str(tmp_path / 'shards.sqlite3'))
+        assert leases.renew('a', ['1', '2'], now=0, ttl=30) == {'1', '2'}
+        assert leases.renew('b', ['1', '2'], now=10, ttl=30) == set()
+        leases.release('a', ['1'])
+        assert leases.renew('b', ['1', '2'], now=20, ttl=30) == {'1'}
+        assert leases.renew('b', ['2'], now=31, ttl=30) == {'2'}, (
+            'Просроченную аренду может взять другой процесс'
+        )
+        leases.close()
+
+
+class TestShardCoordinator:
+
+    def test_rebalance_never_overlaps(self, tmp_path):
+        path = str(tmp_path / 'shards.sqlite3')
+        store = storage.create_store('memory', None)
+        clock = utils.FakeClock()
+        ids = {str(i) for i in range(50)}
+
+        def make(worker_id):
+            polling = engine.PollingEngine(
+                None, [engine.Tenant(i, 'token', i) for i in ids],
+                store=store,
+            )
+            return sharding.ShardCoordinator(
+                sharding.LeaseStore(path), polling, worker_id=worker_id,
+                lease_ttl=30, interval=5, clock=clock,
+            )
+
+        first, second = make('a'), make('b')
+
+        async def scenario():
+            await first.rebalance()
+            assert first.held == ids
+            for coordinator in (second, first, second):
+                clock.now += 5
+                await coordinator.rebalance()
+                assert not first.held & second.held, (
+                    'Учётная запись не опрашивается двумя процессами'
+                )
+            assert first.held | second.held == ids
+            assert first.held and second.held
+            assert set(second.polling.owned) == second.held
+            for coordinator in (first, second):
+                await coordinator.polling.release(set(coordinator.held))
+
+        asyncio.run(scenario())
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import delivery
+import engine
+import exceptions
+import homework
+import metrics
+import sinks
+import utils
+
+
+class SlowSink(sinks.Sink):
+
+    name = 'slow'
+
+    def deliver(self, event):
+        time.sleep(0.5)
+
+
+class BrokenSink(sinks.Sink):
+
+    name = 'broken'
+
+    def deliver(self, event):
+        raise self.error('нет связи')
+
+
+class ListSink(sinks.Sink):
+
+    name = 'list'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.events = []
+
+    def deliver(self, event):
+        self.events.append(event)
+
+
+def make_event(text='Статус изменился'):
+    return sinks.Event('t', 1, 'hw', 'approved', text)
+
+
+class TestSinks:
+
+    def test_file_sink(self, tmp_path):
+        path = tmp_path / 'audit.ndjson'
+        sink = sinks.FileSink(str(path))
+        asyncio.run(sinks.FanOut([sink]).deliver(make_event('Ура!')))
+        sink.close()
+        record = json.loads(path.read_text(encoding='utf-8'))
+        assert record['text'] == 'Ура!'
+        assert record['homework_name'] == 'hw'
+
+    def test_webhook_sink(self):
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):  # noqa: N802
+                length = int(self.headers['Content-Length'])
+                received.append(json.loads(self.rfile.read(length)))
+                self.send_response(204 if len(received) == 1 else 500)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            sink = sinks.WebhookSink(
+                f'http://127.0.0.1:{server.server_port}/hook', timeout=2
+            )
+            fan_out = sinks.FanOut([sink])
+            assert asyncio.run(fan_out.deliver(make_event())) == {}
+            errors = asyncio.run(fan_out.deliver(make_event()))
+        finally:
+            server.shutdown()
+        assert received[0]['status'] == 'approved'
+        assert 'HTTP 500' in str(errors['webhook'])
+
+    def test_smtp_sink(self, monkeypatch):
+        sent = []
+
+        class FakeSMTP:
+
+            def __init__(self, host, port, timeout=None):
+                self.address = (host, port)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def send_message(self, message):
+                sent.append(message)
+
+        monkeypatch.setattr(sinks.smtplib, 'SMTP', FakeSMTP)
+        sink = sinks.SmtpSink('relay', 'bot@localhost', ['a@example.com'])
+        assert asyncio.run(sinks.FanOut([sink]).deliver(make_event())) == {}
+        assert sent[0]['To'] == 'a@example.com'
+        assert 'Статус изменился' in sent[0].get_content()
+
+    def test_failures_are_per_sink(self):
+        fast = ListSink()
+        fan_out = sinks.FanOut([
+            SlowSink(timeout=0.05), BrokenSink(), fast,
+        ])
+        before = metrics.SINK_ERRORS.value('broken')
+
+        async def scenario():
+            started = time.monotonic()
+            fan_out.dispatch(make_event())
+            dispatched = time.monotonic() - started
+            errors = await fan_out.deliver(make_event())
+            await fan_out.close(timeout=1)
+            return dispatched, errors
+
+        dispatched, errors = asyncio.run(scenario())
+        assert dispatched < 0.05, 'dispatch() не ждёт доставки'
+        assert set(errors) == {'slow', 'broken'}
+        for name, error in errors.items():
+            assert isinstance(error, exceptions.SinkError)
+            assert isinstance(error, exceptions.SendMessageError)
+            assert error.sink == name
+        assert len(fast.events) == 2, (
+            'Сбой и задержка одного канала не мешают другим'
+        )
+        assert metrics.SINK_ERRORS.value('broken') == before + 2
+
+    def test_pending_limit(self):
+        sink = SlowSink(timeout=1)
+        fan_out = sinks.FanOut([sink], max_pending=1)
+
+        async def scenario():
+            fan_out.dispatch(make_event())
+            fan_out.dispatch(make_event())
+            await fan_out.close(timeout=0)
+
+        asyncio.run(scenario())
+        assert fan_out.dropped['slow'] == 1
+
+
+class TestEngineSinks:
+
+    def test_status_change_fans_out(self, monkeypatch):
+        monkeypatch.setattr(
+            homework, 'fetch_answer', lambda *args: utils.FakeAnswer()
+        )
+        bot = utils.FakeBot()
+        polling = engine.PollingEngine(bot, [engine.Tenant('t', 'token', 7)])
+        extra = ListSink()
+        polling.sinks = sinks.FanOut([extra])
+
+        async def scenario():
+            await polling.poll_all()
+            await polling.sinks.close(timeout=1)
+
+        asyncio.run(scenario())
+        assert len(bot.sent) == 1
+        event = extra.events[0]
+        assert (event.tenant_id, event.chat_id, event.status) == (
+            't', 7, 'approved'
+        )
+        assert event.text == bot.sent[0][1]
+
+    def test_telegram_copy_goes_through_delivery_queue(self, monkeypatch):
+        monkeypatch.setattr(
+            homework, 'fetch_answer', lambda *args: utils.FakeAnswer()
+        )
+        bot = utils.FakeBot()
+        queue = delivery.DeliveryQueue(bot, workers=1, chat_rate=100)
+        polling = engine.PollingEngine(
+            bot, [engine.Tenant('t', 'token', 7)], delivery=queue
+        )
+        polling.sinks = sinks.FanOut(sinks.build(polling.send, 99))
+
+        async def scenario():
+            queue.start()
+            await polling.poll_all()
+            await polling.sinks.close(timeout=1)
+            await queue.stop(timeout=1)
+
+        asyncio.run(scenario())
+        assert sorted(chat_id for chat_id, _ in bot.sent) == [7, 99]
+        assert queue.stats()['delivered'] == 2, (
+            'Копия в Telegram идёт через очередь отправки с её лимитами'
+        )
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+import startup
+
+ROOT_DIR = dirname(dirname(abspath(__file__)))
+
+
+class TestStartup:
+
+    def test_homework_import_is_light(self):
+        code = (
+            'import sys, homework; '
+            'print(sorted({"telegram", "requests"} & set(sys.modules)))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == '[]', (
+            'Импорт homework не должен загружать сетевые библиотеки'
+        )
+
+    def test_missing_tokens_exit_before_heavy_imports(self):
+        env = {
+            key: value for key, value in os.environ.items()
+            if key not in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN',
+                           'TELEGRAM_CHAT_ID', 'TENANTS_FILE')
+        }
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', 'homework.py'],
+            cwd=ROOT_DIR, capture_output=True, text=True, env=env,
+        )
+        assert result.returncode != 0
+        assert '| telegram' not in result.stderr, (
+            'При неверной конфигурации бот завершается до импорта telegram'
+        )
+
+    def test_preload_report(self):
+        report = startup.preload(('json', 'validation'))
+        assert [name for name, _, _ in report] == ['json', 'validation']
+        assert all(seconds >= 0 for _, seconds, _ in report)
+        assert startup.log_report(report, budget=60)
@@ -0,0 +1,55 @@
+import status_index
+
+
+class TestStatusIndex:
+
+    def test_every_transition_reported_once(self):
+        index = status_index.StatusIndex()
+        homeworks = [
+            {'id': i, 'homework_name': f'hw{i}', 'status': 'reviewing'}
+            for i in range(1000)
+        ]
+        changes = index.changes(homeworks)
+        assert len(changes) == 1000, (
+            'Должны обрабатываться все работы из ответа, а не только первая'
+        )
+        for changed in changes:
+            index.commit(changed)
+        assert index.changes(homeworks) == []
+        assert index.count('reviewing') == 1000
+
+        homeworks[5]['status'] = 'approved'
+        assert index.changes(homeworks) == [homeworks[5]]
+        index.commit(homeworks[5])
+        assert index.count('reviewing') == 999
+
+    def test_duplicate_in_response_uses_newest(self):
+        index = status_index.StatusIndex({'1': 'reviewing'})
+        homeworks = [
+            {'id': 1, 'status': 'approved'},
+            {'id': 1, 'status': 'reviewing'},
+        ]
+        assert index.changes(homeworks) == [homeworks[0]]
+
+    def test_key_falls_back_to_name(self):
+        assert status_index.homework_key({'homework_name': 'hw'}) == 'hw'
+        assert status_index.homework_key({'id': 3, 'homework_name': 'hw'}) == '3'
+
+    def test_rollback(self):
+        index = status_index.StatusIndex({'1': 'reviewing'})
+        approved = {'id': 1, 'homework_name': 'hw', 'status': 'approved'}
+        previous = index.commit(approved)
+        assert previous == 'reviewing'
+        index.rollback(approved, previous)
+        assert index.changes([approved]) == [approved]
+        assert index.count('approved') == 0
+
+        new = {'id': 2, 'homework_name': 'new', 'status': 'reviewing'}
+        index.rollback(new, index.commit(new))
+        assert '2' not in index, 'Новая работа забывается целиком'
+        previous = index.commit(approved)
+        index.commit({'id': 1, 'status': 'rejected'})
+        index.rollback(approved, previous)
+        assert index.get('1') == 'rejected', (
+            'Статус, записанный после отправки, не откатывается'
+        )
@@ -0,0 +1,40 @@
+import engine
+import storage
+
+
+class TestStorage:
+
+    def test_sqlite_round_trip(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = storage.create_store('sqlite', path)
+        tenants = [engine.Tenant(i, 'token', i, timestamp=i) for i in range(3)]
+        tenants[1].statuses.commit({'id': 7, 'status': 'reviewing'})
+        tenants[1].last_err_msg = 'Сбой'
+        for tenant in tenants:
+            store.save(tenant)
+        assert store.load_all() == {}, (
+            'До flush() изменения не записываются в базу'
+        )
+        assert store.flush() == 3
+        store.close()
+
+        store = storage.create_store('sqlite', path)
+        states = store.load_all()
+        assert states['1']['statuses'] == {'7': ['reviewing', None]}
+        assert states['1']['last_err_msg'] == 'Сбой'
+        assert states['2']['timestamp'] == 2
+        store.close()
+
+    def test_engine_resumes_from_store(self):
+        store = storage.create_store('memory', None)
+        tenant = engine.Tenant('t', 'token', 1, timestamp=100)
+        tenant.status = 'reviewing'
+        store.save(tenant)
+        store.flush()
+
+        restored = engine.Tenant('t', 'token', 1)
+        engine.PollingEngine(None, [restored], store=store)
+        assert restored.timestamp == 100, (
+            'После перезапуска опрос продолжается с сохранённого курсора'
+        )
+        assert restored.status == 'reviewing'
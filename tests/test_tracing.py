@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import engine
+import homework
+import tracing
+import utils
+
+
+def read_spans(path):
+    spans = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            for resource in json.loads(line)['resourceSpans']:
+                for scope in resource['scopeSpans']:
+                    spans.extend(scope['spans'])
+    return spans
+
+
+class TestTracing:
+
+    def test_poll_trace(self, monkeypatch, tmp_path):
+        path = str(tmp_path / 'spans.json')
+        monkeypatch.setattr(
+            homework, 'fetch_answer', lambda *args: utils.FakeAnswer()
+        )
+        tracing.configure(path, ratio=1.0)
+        try:
+            polling = engine.PollingEngine(
+                utils.FakeBot(), [engine.Tenant('t', 'token', 1)]
+            )
+            asyncio.run(polling.poll_all())
+        finally:
+            tracing.close()
+            tracing.configure()
+
+        spans = {span['name']: span for span in read_spans(path)}
+        assert set(spans) == {
+            'poll', 'get_api_answer', 'check_response', 'parse_status',
+            'send_message',
+        }
+        root = spans['poll']
+        assert 'parentSpanId' not in root
+        for name, span in spans.items():
+            assert span['traceId'] == root['traceId']
+            if name != 'poll':
+                assert span['parentSpanId'] == root['spanId'], (
+                    'Этапы опроса — дочерние участки трассы опроса'
+                )
+        assert int(root['endTimeUnixNano']) >= int(root['startTimeUnixNano'])
+
+    def test_sampling(self, tmp_path):
+        exporter = tracing.FileSpanExporter(str(tmp_path / 'spans.json'))
+        samples = iter([0.05, 0.5, 0.09, 0.95])
+        tracer = tracing.Tracer(exporter, ratio=0.1, rng=lambda: next(samples))
+        for _ in range(4):
+            with tracer.trace('poll'):
+                with tracer.span('get_api_answer'):
+                    pass
+        exporter.close()
+        assert exporter.exported == 4, (
+            'В файл попадают только трассы из выборки, целиком'
+        )
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+import exceptions
+import homework
+import validation
+
+
+def streamed_homeworks(data):
+    streamed = validation.StreamedResponse(
+        json.dumps(data).encode(), homework.RESPONSE_SCHEMA
+    )
+    return list(streamed.homeworks()), streamed
+
+
+class TestValidation:
+
+    def test_decode_matches_stdlib(self):
+        body = '{"homeworks": [{"homework_name": "Проект"}], "current_date": 1}'
+        assert validation.decode(body.encode()) == json.loads(body)
+
+    @pytest.mark.parametrize('response, error', [
+        ([], TypeError),
+        ({'homeworks': []}, exceptions.KeyNotFoundInResponseError),
+        ({'homeworks': None, 'current_date': 1},
+         exceptions.IncorrectTypeError),
+        ({'homeworks': {}, 'current_date': 1},
+         exceptions.IncorrectTypeError),
+    ])
+    def test_response_schema_errors(self, response, error):
+        with pytest.raises(error):
+            homework.validate_response(response)
+
+    def test_homework_schema_errors(self):
+        with pytest.raises(KeyError):
+            homework.validate_homework({'status': 'approved'})
+        with pytest.raises(exceptions.IncorrectStatusError):
+            homework.validate_homework(
+                {'homework_name': 'hw', 'status': 'unknown'}
+            )
+
+    def test_streamed_response(self):
+        data = {
+            'current_date': 5,
+            'homeworks': [{'id': i, 'status': 'approved'} for i in range(3)],
+        }
+        homeworks, streamed = streamed_homeworks(data)
+        assert homeworks == data['homeworks']
+        assert streamed.fields['current_date'] == 5
+
+    @pytest.mark.parametrize('data, error', [
+        ([], TypeError),
+        ({'homeworks': []}, exceptions.KeyNotFoundInResponseError),
+        ({'current_date': 1}, exceptions.KeyNotFoundInResponseError),
+        ({'homeworks': None, 'current_date': 1},
+         exceptions.IncorrectTypeError),
+    ])
+    def test_streamed_response_errors(self, data, error):
+        with pytest.raises(error):
+            streamed_homeworks(data)
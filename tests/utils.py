@@ -1,6 +1,50 @@
+import json
+from http import HTTPStatus
 from inspect import signature
 from types import ModuleType
 
+APPROVED = {
+    'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}],
+    'current_date': 1,
+}
+
+
+class FakeAnswer:
+    """Ответ API: data — тело как объект JSON или готовые байты."""
+
+    def __init__(self, data=APPROVED, status_code=HTTPStatus.OK,
+                 headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        if isinstance(data, bytes):
+            self.content = data
+        else:
+            self.content = json.dumps(data).encode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeBot:
+    """Бот, запоминающий отправленные сообщения."""
+
+    def __init__(self, updates=None):
+        self.updates = updates or []
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class FakeClock:
+    """Часы, которые двигает сам тест."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
 
 def check_function(scope: ModuleType, func_name: str, params_qty: int = 0):
     """Checks if scope has a function with specific name and params with qty"""
@@ -0,0 +1,221 @@
+import contextlib
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+
+SERVICE_NAME = 'homework_bot'
+BATCH_SIZE = 100
+STATUS_OK = 1
+STATUS_ERROR = 2
+KIND_INTERNAL = 1
+
+_current = contextvars.ContextVar('span', default=None)
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+class Span:
+    """Участок трассы; имена полей — как в OTLP."""
+
+    __slots__ = (
+        'trace_id', 'span_id', 'parent_id', 'name', 'start', 'end',
+        'attributes', 'status', 'message',
+    )
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes or {}
+        self.status = STATUS_OK
+        self.message = ''
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def fail(self, error):
+        self.status = STATUS_ERROR
+        self.message = str(error)
+        self.attributes['exception.type'] = type(error).__name__
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': [
+                _attribute(key, value)
+                for key, value in self.attributes.items()
+            ],
+            'status': {'code': self.status},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        if self.message:
+            span['status']['message'] = self.message
+        return span
+
+
+class NoopSpan:
+    """Заглушка для трасс, не попавших в выборку."""
+
+    def set(self, key, value):
+        pass
+
+    def fail(self, error):
+        pass
+
+
+NOOP = NoopSpan()
+
+
+class FileSpanExporter:
+    """Запись участков в файл построчно в формате OTLP/JSON.
+
+    Каждая строка — объект ExportTraceServiceRequest с пачкой
+    участков, как у file exporter в OpenTelemetry Collector.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.exported = 0
+        self._spans = []
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def export(self, span):
+        with self._lock:
+            self._spans.append(span)
+            if len(self._spans) >= self.batch_size:
+                self._write()
+
+    def _write(self):
+        spans, self._spans = self._spans, []
+        if not spans:
+            return
+        request = {'resourceSpans': [{
+            'resource': {'attributes': [
+                _attribute('service.name', SERVICE_NAME),
+            ]},
+            'scopeSpans': [{
+                'scope': {'name': SERVICE_NAME},
+                'spans': [span.to_otlp() for span in spans],
+            }],
+        }]}
+        self._file.write(json.dumps(request, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.exported += len(spans)
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def close(self):
+        with self._lock:
+            self._write()
+            self._file.close()
+
+
+class Tracer:
+    """Трассы с выборкой: в файл попадает доля ratio корневых участков."""
+
+    def __init__(self, exporter=None, ratio=0.0, rng=random.random):
+        self.exporter = exporter
+        self.ratio = ratio if exporter is not None else 0.0
+        self._rng = rng
+
+    @contextlib.contextmanager
+    def _record(self, span):
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as error:
+            span.fail(error)
+            raise
+        finally:
+            _current.reset(token)
+            span.end = time.time_ns()
+            self.exporter.export(span)
+
+    @contextlib.contextmanager
+    def trace(self, name, **attributes):
+        """Корневой участок новой трассы, если она попала в выборку."""
+        if not self.ratio or self._rng() >= self.ratio:
+            token = _current.set(None)
+            try:
+                yield NOOP
+            finally:
+                _current.reset(token)
+            return
+        span = Span(name, os.urandom(16).hex(), attributes=attributes)
+        with self._record(span):
+            yield span
+
+    @contextlib.contextmanager
+    def span(self, name, parent=None, **attributes):
+        """Вложенный участок текущей трассы или трассы parent."""
+        parent = parent or _current.get()
+        if parent is None:
+            yield NOOP
+            return
+        span = Span(name, parent.trace_id, parent.span_id, attributes)
+        with self._record(span):
+            yield span
+
+
+_tracer = Tracer()
+
+
+def configure(path=None, ratio=0.0):
+    """Включение трассировки с записью в файл path."""
+    global _tracer
+    exporter = FileSpanExporter(path) if path and ratio else None
+    _tracer = Tracer(exporter, ratio)
+
+
+def trace(name, **attributes):
+    return _tracer.trace(name, **attributes)
+
+
+def span(name, parent=None, **attributes):
+    return _tracer.span(name, parent, **attributes)
+
+
+def current():
+    """Текущий участок трассы или None."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def activate(span):
+    """Участок span становится текущим, например в другой задаче."""
+    token = _current.set(span if isinstance(span, Span) else None)
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+
+
+def close():
+    if _tracer.exporter is not None:
+        _tracer.exporter.close()
@@ -0,0 +1,172 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+STREAM_THRESHOLD = 256 * 1024
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+
+def decode(content):
+    """Декодирование JSON: orjson, если установлен, иначе stdlib."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _raise(error, value=None):
+    error_class, template = error
+    raise error_class(template.format(value=value))
+
+
+def _type_check(schema):
+    expected, error = schema['type'], schema['type_error']
+
+    def check(value):
+        if not isinstance(value, expected):
+            _raise(error, value)
+
+    return check
+
+
+def _required_check(schema):
+    required, error = tuple(schema['required']), schema['required_error']
+
+    def check(value):
+        for key in required:
+            if key not in value:
+                _raise(error, key)
+
+    return check
+
+
+def _enum_check(schema):
+    allowed, error = schema['enum'], schema['enum_error']
+
+    def check(value):
+        if value not in allowed:
+            _raise(error, value)
+
+    return check
+
+
+def _field_check(name, schema):
+    validate = compile_schema(schema)
+
+    def check(value):
+        if name in value:
+            validate(value[name])
+
+    return check
+
+
+CHECKS = (
+    ('type', _type_check),
+    ('required', _required_check),
+    ('enum', _enum_check),
+)
+
+
+def compile_schema(schema):
+    """Функция проверки значения по декларативной схеме.
+
+    Поддерживаемые ключи схемы: type/type_error, required/required_error,
+    enum/enum_error и fields — схемы вложенных полей. Проверки
+    собираются один раз, при вызове выполняются без разбора схемы.
+    """
+    checks = [factory(schema) for key, factory in CHECKS if key in schema]
+    checks.extend(
+        _field_check(name, field_schema)
+        for name, field_schema in schema.get('fields', {}).items()
+    )
+
+    def validate(value):
+        for check in checks:
+            check(value)
+        return value
+
+    return validate
+
+
+class StreamedResponse:
+    """Потоковый разбор ответа API с большим списком работ.
+
+    Работы из массива list_key декодируются по одной при итерации
+    по homeworks(), остальные поля верхнего уровня — целиком.
+    Ошибки те же, что у проверки по схеме schema.
+    """
+
+    def __init__(self, content, schema, list_key='homeworks'):
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        self._text = content
+        self._pos = 0
+        self.schema = schema
+        self.list_key = list_key
+        self.fields = {}
+
+    def _skip(self):
+        text, pos = self._text, self._pos
+        while pos < len(text) and text[pos] in WHITESPACE:
+            pos += 1
+        self._pos = pos
+
+    def _peek(self):
+        self._skip()
+        return self._text[self._pos:self._pos + 1]
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise json.JSONDecodeError(
+                f'Ожидался символ {char!r}', self._text, self._pos
+            )
+        self._pos += 1
+
+    def _value(self):
+        self._skip()
+        value, self._pos = _decoder.raw_decode(self._text, self._pos)
+        return value
+
+    def _items(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._peek() == ',':
+                self._pos += 1
+                continue
+            self._expect(']')
+            return
+
+    def homeworks(self):
+        """Работы по одной; после исчерпания заполнено self.fields."""
+        if self._peek() != '{':
+            _raise(self.schema['type_error'], None)
+        self._pos += 1
+        list_seen = False
+        while self._peek() != '}':
+            key = self._value()
+            self._expect(':')
+            if key == self.list_key:
+                if self._peek() != '[':
+                    _raise(
+                        self.schema['fields'][key]['type_error'], self._value()
+                    )
+                list_seen = True
+                yield from self._items()
+            else:
+                self.fields[key] = self._value()
+            if self._peek() == ',':
+                self._pos += 1
+        self._pos += 1
+        for key in self.schema.get('required', ()):
+            if key not in self.fields and not (
+                key == self.list_key and list_seen
+            ):
+                _raise(self.schema['required_error'], key)